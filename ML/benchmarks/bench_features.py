@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Feature preparation benchmark: legacy prepare_features vs FeaturePipeline
+
+The legacy path refits a LabelEncoder and pd.Categorical codes on every call
+and copies the whole DataFrame; the pipeline encodes with fixed vocabularies
+straight into a preallocated float32 matrix.
+
+Usage:
+    python benchmarks/bench_features.py --sizes 10 1000 1000000
+"""
+
+import sys
+import os
+import time
+import argparse
+import statistics
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_congestion_predictor import TrainCongestionPredictor
+from feature_pipeline import FeaturePipeline, FEATURE_NAMES
+
+def legacy_prepare_features(df, label_encoder):
+    """prepare_features as it was before the fitted pipeline"""
+    df_encoded = df.copy()
+    df_encoded['category_encoded'] = label_encoder.fit_transform(df_encoded['category'])
+    if 'station_type' not in df_encoded.columns:
+        df_encoded['station_type'] = 'major'
+    df_encoded['station_type_encoded'] = pd.Categorical(df_encoded['station_type']).codes
+    df_encoded['speed_occupancy_ratio'] = df_encoded['speed'] / (df_encoded['occupancy'] + 1)
+    df_encoded['delay_speed_ratio'] = df_encoded['delay'] / (df_encoded['speed'] + 1)
+    df_encoded['is_peak_hour'] = df_encoded['hour_of_day'].isin([7, 8, 9, 17, 18, 19]).astype(int)
+    df_encoded['is_weekend'] = df_encoded['day_of_week'].isin([5, 6]).astype(int)
+    return df_encoded[FEATURE_NAMES], df_encoded['congestion']
+
+def time_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark feature preparation paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 1000000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    predictor = TrainCongestionPredictor()
+    pipeline = FeaturePipeline()
+    label_encoder = LabelEncoder()
+
+    print("🧮 Feature preparation (median per call)")
+    print(f"  {'rows':>9}  {'legacy':>10}  {'pipeline':>10}  {'speedup':>8}  max |diff|")
+    for size in args.sizes:
+        df = predictor.fetch_simulated_data(size)
+        out = np.empty((size, len(FEATURE_NAMES)), dtype=np.float32, order='F')
+        repeats = args.repeats if size < 100000 else max(1, args.repeats // 2)
+
+        legacy = time_call(lambda: legacy_prepare_features(df, label_encoder), repeats)
+        fitted = time_call(lambda: pipeline.transform(df, out=out), repeats)
+
+        # Same values as the legacy path once every category is present in the
+        # batch; small batches differ because the legacy codes depend on the batch
+        expected = legacy_prepare_features(df, label_encoder)[0].to_numpy(dtype=np.float64)
+        diff = np.abs(pipeline.transform(df).astype(np.float64) - expected) / (np.abs(expected) + 1)
+
+        print(f"  {size:>9}  {legacy * 1000:>8.2f}ms  {fitted * 1000:>8.2f}ms  "
+              f"{legacy / fitted:>7.1f}x  {diff.max():.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Section occupancy throughput: incremental position updates per second
+
+Tracks a fleet of trains spread over the Howrah grid and applies batches of
+small position moves, as a live feed would, on a single core.
+
+Usage:
+    python benchmarks/bench_occupancy.py --trains 20000 --batches 100 1000 10000
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from section_occupancy import SectionOccupancy, count_occupancy, default_grid
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark incremental section occupancy updates')
+    parser.add_argument('--trains', type=int, default=20000)
+    parser.add_argument('--batches', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeats', type=int, default=100)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    grid = default_grid()
+    print(f"🗺️  Grid: {grid.n_lat}x{grid.n_lon} cells, {grid.n_sections} sections "
+          f"(built in {(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(21.5, 23.8, args.trains)
+    lon = rng.uniform(87.0, 89.5, args.trains)
+    occupancy = SectionOccupancy(grid, capacity=args.trains)
+    occupancy.update(np.arange(args.trains), lat, lon)
+
+    print(f"  {'batch':>7}  {'per batch':>10}  {'updates/s':>12}")
+    for batch in args.batches:
+        slots = rng.choice(args.trains, min(batch, args.trains), replace=False)
+        started = time.perf_counter()
+        for _ in range(args.repeats):
+            lat[slots] += rng.normal(0, 0.005, len(slots))
+            occupancy.update(slots, lat[slots], lon[slots])
+        elapsed = (time.perf_counter() - started) / args.repeats
+        print(f"  {len(slots):>7}  {elapsed * 1000:>8.3f}ms  {len(slots) / elapsed:>12,.0f}")
+
+    assert np.array_equal(occupancy.occupancy(np.arange(args.trains)), count_occupancy(lat, lon))
+    print("✅ Incremental counts match a full recount")
+
+if __name__ == "__main__":
+    main()
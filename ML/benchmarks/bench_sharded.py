@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Sharded vs in-process scoring of large fleets
+
+Scores simulated batches with the warm in-process predictor and with a
+ShardedPredictor over a persistent worker pool, and reports the crossover
+that --shard-min-rows should be set to on this machine.
+
+Usage:
+    python benchmarks/bench_sharded.py --workers 4 --sizes 10000 50000 200000
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_congestion_predictor import TrainCongestionPredictor
+from sharded_inference import ShardedPredictor
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(ML_DIR, 'trained_congestion_model.pkl')
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sharded inference against in-process scoring')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000, 200000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--model', default=MODEL_PATH)
+    args = parser.parse_args()
+
+    predictor = TrainCongestionPredictor().load_model(args.model)
+    sharded = ShardedPredictor(predictor, args.model, workers=max(2, args.workers), min_rows=0)
+    started = time.perf_counter()
+    sharded.start()
+    print(f"🧩 {sharded.workers} workers ready in {time.perf_counter() - started:.1f}s "
+          f"({os.cpu_count()} CPUs)")
+
+    try:
+        print(f"  {'rows':>8}  {'in-process':>11}  {'sharded':>9}  {'speedup':>7}")
+        for size in args.sizes:
+            X, _ = predictor.prepare_features(predictor.fetch_simulated_data(size, seed=size))
+            local = best_of(lambda: predictor.predict_features(X), args.repeats)
+            shard = best_of(lambda: sharded.predict_features(X), args.repeats)
+            assert np.array_equal(sharded.predict_features(X)[1], predictor.predict_features(X)[1])
+            print(f"  {size:>8}  {local * 1000:>9.1f}ms  {shard * 1000:>7.1f}ms  {local / shard:>6.2f}x")
+    finally:
+        sharded.close()
+    print("✅ Sharded probabilities match in-process scoring")
+
+if __name__ == "__main__":
+    main()
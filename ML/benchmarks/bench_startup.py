@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the prediction path
+
+Each run happens in a fresh interpreter (like the backend's spawned predictor)
+and reports how long it takes to import ml_server_integration, load the model
+and score a first batch.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+import sys
+import os
+import json
+import argparse
+import statistics
+import subprocess
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a child interpreter; prints one JSON line with stage timings
+PROBE = r'''
+import sys, os, time, json, warnings
+t0 = time.perf_counter()
+sys.path.insert(0, {ml_dir!r})
+import ml_server_integration
+from ml_server_integration import TrainCongestionPredictor, CongestionOptimizer, run_prediction
+t1 = time.perf_counter()
+sys.stdout, real_stdout = sys.stderr, sys.stdout
+predictor = TrainCongestionPredictor().load_trained_model({model!r})
+t2 = time.perf_counter()
+trains = [{{'id': 'T%05d' % i, 'category': 'express', 'speed': 40 + i % 50, 'delay': i % 30,
+           'lat': 22.5, 'lon': 88.3}} for i in range({batch})]
+run_prediction(predictor, CongestionOptimizer(predictor), trains)
+t3 = time.perf_counter()
+heavy = sorted(m for m in ('tensorflow', 'keras', 'requests', 'matplotlib') if m in sys.modules)
+real_stdout.write(json.dumps({{'import_s': t1 - t0, 'load_s': t2 - t1, 'first_predict_s': t3 - t2,
+                               'total_s': t3 - t0, 'training_modules_loaded': heavy}}) + '\n')
+'''
+
+def run_once(model, batch):
+    """Run the probe in a fresh interpreter and return its timings"""
+    code = PROBE.format(ml_dir=ML_DIR, model=model, batch=batch)
+    proc = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], cwd=ML_DIR,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark predictor import and model-load time')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start')
+    parser.add_argument('--batch', type=int, default=200, help='Trains in the first prediction')
+    parser.add_argument('--model', default='trained_congestion_model.pkl', help='Model path (relative to ML/)')
+    parser.add_argument('--json', action='store_true', help='Print raw JSON summary')
+    args = parser.parse_args()
+
+    runs = [run_once(args.model, args.batch) for _ in range(args.runs)]
+    summary = {}
+    for stage in ('import_s', 'load_s', 'first_predict_s', 'total_s'):
+        values = [r[stage] for r in runs]
+        summary[stage] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+    summary['training_modules_loaded'] = runs[-1]['training_modules_loaded']
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"⏱️  Predictor startup ({args.runs} fresh interpreters, batch={args.batch})")
+    for stage in ('import_s', 'load_s', 'first_predict_s', 'total_s'):
+        s = summary[stage]
+        print(f"  {stage:<16} median {s['median'] * 1000:8.1f} ms   "
+              f"min {s['min'] * 1000:8.1f} ms   max {s['max'] * 1000:8.1f} ms")
+    loaded = summary['training_modules_loaded']
+    print(f"  training-only modules imported: {', '.join(loaded) if loaded else 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the ML prediction path
+
+Times each stage of the prediction path on seeded simulated data at several
+batch sizes and reports p50/p99 latency, rows/sec and peak traced memory:
+
+    simulate      TrainCongestionPredictor.fetch_simulated_data
+    features      TrainCongestionPredictor.prepare_features
+    predict       TrainCongestionPredictor.predict_congestion
+    suggest       CongestionOptimizer.suggest_actions
+    convert       MLBackendIntegration.convert_to_ml_format
+    end_to_end    ml_server_integration.run_prediction (train dicts -> payload)
+
+Results can be saved as a JSON baseline and later runs compared against it;
+a p50 slower than the baseline by more than --tolerance is a regression and
+makes the script exit with status 1.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 10 1000 --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --tolerance 0.25
+"""
+
+import sys
+import os
+import gc
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_congestion_predictor import TrainCongestionPredictor, CongestionOptimizer
+from ml_backend_integration import MLBackendIntegration
+from ml_server_integration import run_prediction
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(ML_DIR, 'trained_congestion_model.pkl')
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+# Minimum timed calls per case: enough for a stable p50 and a p99 that isn't
+# just the slowest call; the largest batches take seconds per call
+MIN_REPEATS = 30
+MIN_REPEATS_LARGE = 10
+LARGE_BATCH_ROWS = 100000
+CASES = ['simulate', 'features', 'predict', 'suggest', 'convert', 'end_to_end']
+SEED = 7
+
+def train_dicts(df):
+    """Backend-style train records for a simulated batch"""
+    trains = df[['train_id', 'category', 'speed', 'delay', 'lat', 'lon']].rename(columns={'train_id': 'id'})
+    trains['id'] = [f'T{i}' for i in range(len(trains))]  # unique ids
+    return trains.to_dict('records')
+
+def build_cases(predictor, optimizer, integration, size):
+    """Zero-argument callables for every case at one batch size"""
+    df = predictor.fetch_simulated_data(size, seed=SEED)
+    predictions, _ = predictor.predict_congestion(df)
+    trains = train_dicts(df)
+    return {
+        'simulate': lambda: predictor.fetch_simulated_data(size, seed=SEED),
+        'features': lambda: predictor.prepare_features(df),
+        'predict': lambda: predictor.predict_congestion(df),
+        'suggest': lambda: optimizer.suggest_actions(df, predictions, limit=10),
+        'convert': lambda: integration.convert_to_ml_format(trains),
+        'end_to_end': lambda: run_prediction(predictor, optimizer, trains)
+    }
+
+def measure(fn, rows, min_time, max_repeats, min_repeats=None):
+    """Latency percentiles, throughput and peak traced memory for one case"""
+    if min_repeats is None:
+        min_repeats = MIN_REPEATS_LARGE if rows >= LARGE_BATCH_ROWS else MIN_REPEATS
+    fn()  # warm-up
+    timings = []
+    # Collect once up front and keep the collector out of the timed calls, so
+    # neither collection time nor --min-time spent collecting skews the samples
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        while len(timings) < min_repeats or (time.perf_counter() - started < min_time
+                                             and len(timings) < max_repeats):
+            t0 = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - t0)
+    finally:
+        gc.enable()
+
+    # Memory is traced in a separate run so tracing doesn't skew the timings
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p99 = np.percentile(timings, [50, 99])
+    return {
+        'rows': rows,
+        'repeats': len(timings),
+        'p50_ms': float(p50 * 1000),
+        'p99_ms': float(p99 * 1000),
+        'rows_per_s': float(rows / p50) if p50 > 0 else float('inf'),
+        'peak_mb': peak / 1e6
+    }
+
+def run_suite(sizes, cases, min_time, max_repeats, model_path=MODEL_PATH):
+    predictor = TrainCongestionPredictor().load_model(model_path)
+    optimizer = CongestionOptimizer(predictor)
+    integration = MLBackendIntegration(seed=SEED)
+    integration.predictor = predictor
+    integration.optimizer = optimizer
+
+    results = {}
+    for size in sizes:
+        callables = build_cases(predictor, optimizer, integration, size)
+        for case in cases:
+            results[f'{case}/{size}'] = measure(callables[case], size, min_time, max_repeats)
+            r = results[f'{case}/{size}']
+            print(f"  {case:<11} {size:>7}  p50 {r['p50_ms']:>9.2f}ms  p99 {r['p99_ms']:>9.2f}ms  "
+                  f"{r['rows_per_s']:>12,.0f} rows/s  peak {r['peak_mb']:>8.2f}MB")
+    return results
+
+def compare(results, baseline, tolerance):
+    """Entries whose p50 regressed beyond the tolerance"""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get('results', {}).get(key)
+        if reference is None:
+            continue
+        ratio = result['p50_ms'] / reference['p50_ms'] if reference['p50_ms'] > 0 else 1.0
+        status = 'REGRESSION' if ratio > 1 + tolerance else ('faster' if ratio < 1 - tolerance else 'ok')
+        print(f"  {key:<22} {reference['p50_ms']:>9.2f}ms -> {result['p50_ms']:>9.2f}ms  "
+              f"({ratio:>5.2f}x)  {status}")
+        if status == 'REGRESSION':
+            regressions.append(key)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ML prediction path')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+    parser.add_argument('--min-time', type=float, default=0.5, help='Seconds of timing per case')
+    parser.add_argument('--max-repeats', type=int, default=500)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--save-baseline', help='Write results as the new baseline JSON')
+    parser.add_argument('--compare', help='Baseline JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed p50 slowdown vs the baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    print(f"⏱️  ML prediction path benchmarks (sizes: {', '.join(map(str, args.sizes))})")
+    results = run_suite(args.sizes, args.cases, args.min_time, args.max_repeats, args.model)
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'seed': SEED,
+        'results': results
+    }
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\n📊 Comparison with {args.compare} (tolerance {args.tolerance:.0%})")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Compiled tree-ensemble inference backend
+
+Flattens a trained RandomForest, GradientBoosting or HistGradientBoosting
+classifier into contiguous node arrays (feature, threshold, children, leaf
+value) and scores a batch in vectorized NumPy: every (sample, tree) pair walks
+its tree in lock-step, one level per step, and the congestion probability comes
+out of a single pass. Leaf values are accumulated tree by tree in the same
+order as scikit-learn, so probabilities match the original model exactly.
+"""
+
+import numpy as np
+from scipy.special import expit
+
+FORMAT_VERSION = 1
+CHUNK_ELEMENTS = 50_000
+
+# Array fields making up a compiled ensemble
+ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'value', 'missing_left', 'roots')
+
+class CompiledEnsemble:
+    """Flattened binary-classification tree ensemble"""
+
+    def __init__(self, kind, feature, threshold, left, right, value, missing_left, roots,
+                 max_depth, baseline=0.0, input_dtype='float32', scale=1.0, children=None, model_class=None):
+        self.kind = kind                    # 'forest' (mean of leaf probabilities) or 'boosting'
+        self.feature = feature              # int32, split feature per node (0 for leaves)
+        self.threshold = threshold          # float64, go left when x <= threshold
+        self.left = left                    # int32, global child index; leaves point to themselves
+        self.right = right
+        self.value = value                  # float64, leaf output (probability or raw score)
+        self.missing_left = missing_left    # uint8, NaN goes left
+        self.roots = roots                  # int32, root node of each tree
+        self.max_depth = int(max_depth)
+        self.baseline = float(baseline)     # boosting: initial raw prediction
+        self.input_dtype = input_dtype      # dtype scikit-learn compares thresholds against
+        self.scale = float(scale)           # boosting: learning rate applied to leaf values
+        self.model_class = model_class      # estimator class compiled from (see model_fingerprint)
+        # Interleaved (left, right) pairs so one gather picks the next node
+        self.children = np.column_stack((left, right)).ravel() if children is None else children
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def fingerprint(self):
+        return {'model_class': self.model_class, 'n_trees': self.n_trees, 'n_nodes': self.n_nodes}
+
+    def matches(self, model):
+        """Whether this ensemble was compiled from `model` (same class, tree and node counts)"""
+        expected = model_fingerprint(model)
+        if expected is None:
+            return False
+        if self.model_class is None:  # exported before the class was recorded
+            expected['model_class'] = None
+        return self.fingerprint() == expected
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Compile a fitted scikit-learn binary classifier"""
+        compiled = cls._from_sklearn(model)
+        compiled.model_class = type(model).__name__
+        return compiled
+
+    @classmethod
+    def _from_sklearn(cls, model):
+        name = type(model).__name__
+        if list(getattr(model, 'classes_', [0, 1])) != [0, 1]:
+            raise ValueError("Only binary 0/1 classifiers can be compiled")
+
+        if name == 'RandomForestClassifier':
+            trees = [_sklearn_tree_nodes(est.tree_, leaf_probability=True) for est in model.estimators_]
+            return cls._build('forest', trees, input_dtype='float32')
+
+        if name == 'GradientBoostingClassifier':
+            if model.estimators_.shape[1] != 1:
+                raise ValueError("Only binary gradient boosting can be compiled")
+            trees = [_sklearn_tree_nodes(est.tree_, leaf_probability=False) for est in model.estimators_[:, 0]]
+            baseline = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0, 0]
+            return cls._build('boosting', trees, baseline=baseline, input_dtype='float32',
+                              scale=model.learning_rate)
+
+        if name == 'HistGradientBoostingClassifier':
+            if getattr(model, 'is_categorical_', None) is not None and np.any(model.is_categorical_):
+                raise ValueError("Categorical splits are not supported")
+            trees = [_hist_tree_nodes(predictors[0]) for predictors in model._predictors]
+            baseline = np.ravel(model._baseline_prediction)[0]
+            return cls._build('boosting', trees, baseline=baseline, input_dtype='float64')
+
+        raise ValueError(f"Cannot compile {name}")
+
+    @classmethod
+    def _build(cls, kind, trees, baseline=0.0, input_dtype='float32', scale=1.0):
+        """Concatenate per-tree node arrays, offsetting child indices"""
+        sizes = np.array([len(t['feature']) for t in trees])
+        roots = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int32)
+
+        def concat(field, dtype, offset=False):
+            parts = [t[field] + (root if offset else 0) for t, root in zip(trees, roots)]
+            return np.ascontiguousarray(np.concatenate(parts), dtype=dtype)
+
+        return cls(
+            kind,
+            feature=concat('feature', np.int32),
+            threshold=concat('threshold', np.float64),
+            left=concat('left', np.int32, offset=True),
+            right=concat('right', np.int32, offset=True),
+            value=concat('value', np.float64),
+            missing_left=concat('missing_left', np.uint8),
+            roots=roots,
+            max_depth=max(t['depth'] for t in trees),
+            baseline=baseline,
+            input_dtype=input_dtype,
+            scale=scale
+        )
+
+    def leaf_values(self, X):
+        """Leaf output of every tree for every sample, shape (n_trees, n_samples)"""
+        X = np.asarray(X, dtype=self.input_dtype, order='F')
+        n = X.shape[0]
+        flat = X.ravel(order='F')  # column-major: feature f of row i is at f * n + i
+        rows = np.arange(n, dtype=np.int64)
+
+        node = np.repeat(self.roots[:, None], n, axis=1)
+        for _ in range(self.max_depth):
+            x = flat[self.feature[node] * n + rows]
+            go_right = ~(x <= self.threshold[node])
+            nan = np.isnan(x)
+            if nan.any():
+                go_right[nan] = self.missing_left[node[nan]] == 0
+            node = self.children[2 * node + go_right]
+        return self.value[node]
+
+    def predict_proba(self, X, chunk_size=None):
+        """Probability of congestion for each sample"""
+        X = np.asarray(X)
+        n = X.shape[0]
+        # Small chunks keep the (trees x rows) working set cache-resident
+        chunk_size = chunk_size or max(1, CHUNK_ELEMENTS // max(1, self.n_trees))
+        out = np.empty(n, dtype=np.float64)
+        for start in range(0, n, chunk_size):
+            out[start:start + chunk_size] = self._predict_chunk(X[start:start + chunk_size])
+        return out
+
+    def _predict_chunk(self, X):
+        leaves = self.leaf_values(X)
+        if self.kind == 'forest':
+            # Same accumulation order as RandomForestClassifier.predict_proba
+            acc = np.zeros(leaves.shape[1], dtype=np.float64)
+            for tree_values in leaves:
+                acc += tree_values
+            return acc / self.n_trees
+
+        acc = np.full(leaves.shape[1], self.baseline, dtype=np.float64)
+        if self.scale == 1.0:
+            for tree_values in leaves:
+                acc += tree_values
+        else:
+            for tree_values in leaves:
+                acc += self.scale * tree_values
+        return expit(acc)
+
+    def predict(self, X):
+        """Labels derived from the probabilities (no second pass)"""
+        return (self.predict_proba(X) > 0.5).astype(int)
+
+    def validate(self, model, X):
+        """Compare against the scikit-learn model on a holdout set"""
+        expected = model.predict_proba(X)[:, 1]
+        actual = self.predict_proba(X)
+        return {
+            'identical': bool(np.array_equal(expected, actual)),
+            'max_abs_diff': float(np.max(np.abs(expected - actual))) if len(X) else 0.0,
+            'label_agreement': float(np.mean((expected > 0.5) == (actual > 0.5))) if len(X) else 1.0,
+            'holdout_rows': int(len(X))
+        }
+
+    def to_arrays(self):
+        """Numeric arrays plus JSON-serialisable metadata"""
+        arrays = {field: getattr(self, field) for field in ARRAY_FIELDS}
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'kind': self.kind,
+            'max_depth': self.max_depth,
+            'baseline': self.baseline,
+            'input_dtype': self.input_dtype,
+            'scale': self.scale,
+            'n_trees': self.n_trees,
+            'n_nodes': self.n_nodes
+        }
+        if self.model_class is not None:
+            meta['model_class'] = self.model_class
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(meta['kind'], *(arrays[field] for field in ARRAY_FIELDS),
+                   max_depth=meta['max_depth'], baseline=meta['baseline'],
+                   input_dtype=meta['input_dtype'], scale=meta.get('scale', 1.0),
+                   children=arrays.get('children'), model_class=meta.get('model_class'))
+
+    def save(self, filepath):
+        """Export next to the model pickle as a .npz file"""
+        arrays, meta = self.to_arrays()
+        meta_arrays = {f'meta_{k}': np.asarray(v) for k, v in meta.items()}
+        np.savez(filepath, **arrays, **meta_arrays)
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as data:
+            arrays = {field: data[field] for field in ARRAY_FIELDS}
+            meta = {k[len('meta_'):]: data[k].item() for k in data.files if k.startswith('meta_')}
+        return cls.from_arrays(arrays, meta)
+
+def model_fingerprint(model):
+    """Class, tree count and node count of a fitted ensemble; None if it has no compiled form"""
+    name = type(model).__name__
+    if name == 'RandomForestClassifier':
+        sizes = [est.tree_.node_count for est in model.estimators_]
+    elif name == 'GradientBoostingClassifier':
+        sizes = [est.tree_.node_count for est in np.ravel(model.estimators_)]
+    elif name == 'HistGradientBoostingClassifier':
+        sizes = [len(predictors[0].nodes) for predictors in model._predictors]
+    else:
+        return None
+    return {'model_class': name, 'n_trees': len(sizes), 'n_nodes': int(sum(sizes))}
+
+def compiled_path(model_path):
+    """Where the compiled ensemble lives for a given model pickle"""
+    base = model_path[:-len('.pkl')] if model_path.endswith('.pkl') else model_path
+    return base + '.compiled.npz'
+
+def _sklearn_tree_nodes(tree, leaf_probability):
+    """Node arrays for a sklearn.tree Tree (leaf children point to themselves)"""
+    n = tree.node_count
+    index = np.arange(n)
+    is_leaf = tree.children_left == -1
+    if leaf_probability:
+        counts = tree.value[:, 0, :]
+        # Same normalisation as DecisionTreeClassifier.predict_proba
+        normalizer = counts.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+        value = counts[:, 1] / normalizer
+    else:
+        value = tree.value[:, 0, 0]
+    missing_left = getattr(tree, 'missing_go_to_left', np.zeros(n, dtype=np.uint8))
+    return {
+        'feature': np.where(is_leaf, 0, tree.feature),
+        'threshold': np.where(is_leaf, np.inf, tree.threshold),
+        'left': np.where(is_leaf, index, tree.children_left),
+        'right': np.where(is_leaf, index, tree.children_right),
+        'value': np.where(is_leaf, value, 0.0),
+        'missing_left': np.asarray(missing_left, dtype=np.uint8),
+        'depth': tree.max_depth
+    }
+
+def _hist_tree_nodes(predictor):
+    """Node arrays for a HistGradientBoosting TreePredictor"""
+    nodes = predictor.nodes
+    index = np.arange(len(nodes))
+    is_leaf = nodes['is_leaf'].astype(bool)
+    return {
+        'feature': np.where(is_leaf, 0, nodes['feature_idx']),
+        'threshold': np.where(is_leaf, np.inf, nodes['num_threshold']),
+        'left': np.where(is_leaf, index, nodes['left'].astype(np.int64)),
+        'right': np.where(is_leaf, index, nodes['right'].astype(np.int64)),
+        'value': np.where(is_leaf, nodes['value'], 0.0),
+        'missing_left': nodes['missing_go_to_left'].astype(np.uint8),
+        'depth': int(nodes['depth'].max())
+    }
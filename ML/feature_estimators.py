@@ -0,0 +1,39 @@
+"""
+Batch estimators for model inputs the backend doesn't report
+
+Each estimator works on whole columns (speed/delay arrays, nearest-station
+indices) so filling a batch costs a handful of NumPy calls regardless of the
+number of trains.
+"""
+
+import numpy as np
+
+MAX_SECTION_OCCUPANCY = 5       # Same cap as the simulated training data
+STOPPED_DISTANCE_TO_NEXT = 10000
+MEAN_DISTANCE_TO_NEXT = 5000
+MEAN_DISTANCE_TO_DESTINATION = 25000
+# Station features for trains without a reported position
+DEFAULT_STATION = 'HWH'
+DEFAULT_STATION_TYPE = 'major'
+
+def estimate_signal_status(speed, delay):
+    """Red (0) when stopped or badly late, yellow (1) when slow or late, else green (2)"""
+    speed = np.asarray(speed)
+    delay = np.asarray(delay)
+    return np.select(
+        [(speed < 10) | (delay > 20), (speed < 30) | (delay > 10)],
+        [0, 1],
+        default=2
+    )
+
+def estimate_distance_to_next(speed, rng=None):
+    """Distance (m) to the next station, drawn from rng or its expected value; large when stopped"""
+    speed = np.asarray(speed)
+    moving = MEAN_DISTANCE_TO_NEXT if rng is None else rng.exponential(MEAN_DISTANCE_TO_NEXT, len(speed))
+    return np.where(speed > 0, moving, STOPPED_DISTANCE_TO_NEXT)
+
+def estimate_distance_to_destination(n, rng=None):
+    """Distance (m) to the final destination, drawn from rng or its expected value"""
+    if rng is None:
+        return np.full(n, float(MEAN_DISTANCE_TO_DESTINATION))
+    return rng.exponential(MEAN_DISTANCE_TO_DESTINATION, n)
@@ -0,0 +1,95 @@
+"""
+Fitted feature pipeline for the congestion model
+
+Categorical columns are mapped through vocabularies fixed at fit time, so a
+prediction batch is encoded the same way regardless of which categories it
+happens to contain. Unseen categories fall into an unknown bucket (-1).
+"""
+
+import numpy as np
+import pandas as pd
+
+FEATURE_NAMES = [
+    'speed', 'occupancy', 'signal_status', 'delay', 'time_to_clear',
+    'distance_to_next', 'distance_to_destination', 'hour_of_day', 'day_of_week',
+    'category_encoded', 'station_type_encoded', 'speed_occupancy_ratio',
+    'delay_speed_ratio', 'is_peak_hour', 'is_weekend'
+]
+
+# Numeric inputs copied straight into the first columns of the matrix
+NUMERIC_COLUMNS = FEATURE_NAMES[:9]
+
+CATEGORY_VOCAB = ['express', 'freight', 'passenger', 'vande']
+STATION_TYPE_VOCAB = ['freight', 'junction', 'major', 'suburban', 'yard']
+PEAK_HOURS = [7, 8, 9, 17, 18, 19]
+WEEKEND_DAYS = [5, 6]
+UNKNOWN_CODE = -1
+
+class FeaturePipeline:
+    """Fit/transform feature builder persisted alongside the model"""
+
+    def __init__(self, category_vocab=None, station_type_vocab=None,
+                 default_station_type='major'):
+        self.category_vocab = list(category_vocab or CATEGORY_VOCAB)
+        self.station_type_vocab = list(station_type_vocab or STATION_TYPE_VOCAB)
+        self.default_station_type = default_station_type
+        self.feature_names = list(FEATURE_NAMES)
+
+    def fit(self, data):
+        """Fix the category vocabularies from training data"""
+        self.category_vocab = sorted(pd.unique(np.asarray(data['category'])).tolist())
+        if 'station_type' in data:
+            self.station_type_vocab = sorted(pd.unique(np.asarray(data['station_type'])).tolist())
+        return self
+
+    def transform(self, data, out=None):
+        """Build the float32 feature matrix for a DataFrame or mapping of column arrays"""
+        n = len(data['speed'])
+        if out is None:
+            # Column-major so each feature is written contiguously
+            out = np.empty((n, len(self.feature_names)), dtype=np.float32, order='F')
+
+        for j, column in enumerate(NUMERIC_COLUMNS):
+            out[:, j] = data[column]
+
+        out[:, 9] = self.encode(data['category'], self.category_vocab)
+        if 'station_type' in data:
+            out[:, 10] = self.encode(data['station_type'], self.station_type_vocab)
+        else:
+            out[:, 10] = self.encode([self.default_station_type], self.station_type_vocab)[0]
+
+        # Derived features
+        speed, occupancy, delay = out[:, 0], out[:, 1], out[:, 3]
+        np.divide(speed, occupancy + 1, out=out[:, 11])
+        np.divide(delay, speed + 1, out=out[:, 12])
+        out[:, 13] = np.isin(out[:, 7], PEAK_HOURS)
+        out[:, 14] = np.isin(out[:, 8], WEEKEND_DAYS)
+        return out
+
+    def fit_transform(self, data):
+        return self.fit(data).transform(data)
+
+    @staticmethod
+    def encode(values, vocab):
+        """Map values to vocabulary indices, unknown values to UNKNOWN_CODE"""
+        return pd.Index(vocab).get_indexer(np.asarray(values))
+
+    def to_dict(self):
+        return {
+            'category_vocab': self.category_vocab,
+            'station_type_vocab': self.station_type_vocab,
+            'default_station_type': self.default_station_type,
+            'feature_names': self.feature_names
+        }
+
+    @classmethod
+    def from_dict(cls, config):
+        pipeline = cls(config['category_vocab'], config['station_type_vocab'],
+                       config.get('default_station_type', 'major'))
+        pipeline.feature_names = list(config.get('feature_names', FEATURE_NAMES))
+        return pipeline
+
+    @classmethod
+    def from_label_encoder(cls, label_encoder):
+        """Rebuild the pipeline for models saved before it was persisted"""
+        return cls(category_vocab=[str(c) for c in label_encoder.classes_])
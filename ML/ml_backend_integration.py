@@ -1,26 +1,85 @@
 import json
+import asyncio
 import requests
 import numpy as np
 import pandas as pd
 from train_congestion_predictor import TrainCongestionPredictor, CongestionOptimizer
+from ml_results import build_results
+from prediction_cache import PredictionCache
+from station_registry import default_registry
+from model_artifact import DEFAULT_MODEL_PATH, resolve_model_path
+from train_stream import TrainStream
+from train_state_store import TrainStateStore, train_id_of
+from feature_estimators import (MAX_SECTION_OCCUPANCY, DEFAULT_STATION, DEFAULT_STATION_TYPE,
+                                estimate_signal_status, estimate_distance_to_next,
+                                estimate_distance_to_destination)
+from section_occupancy import SectionOccupancy
+from section_forecaster import section_features
+from stage_metrics import METRICS, to_ms
+from prediction_service import PredictionService, DEFAULT_MAX_PENDING
+from ml_server_integration import snapshot_key, FILL_MODES
 import time
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Columns of the DataFrame returned by convert_to_ml_format
+ML_COLUMNS = [
+    'train_id', 'category', 'station', 'station_type', 'station_distance_km', 'speed',
+    'occupancy', 'signal_status', 'delay', 'distance_to_next', 'distance_to_destination',
+    'time_to_clear', 'hour_of_day', 'day_of_week', 'lat', 'lon'
+]
+
+# Stages timed on every monitoring tick
+MONITOR_STAGES = ('fetch', 'convert', 'predict', 'optimize', 'build', 'total')
+
 class MLBackendIntegration:
     """Integrates ML model with the train simulation backend"""
     
-    def __init__(self, backend_url="http://localhost:5055"):
+    def __init__(self, backend_url="http://localhost:5055", use_prediction_cache=True, cache_tolerance=None,
+                 station_registry=None, seed=None, snapshot_store=None, max_pending=DEFAULT_MAX_PENDING,
+                 forecaster=None, fill_mode='deterministic'):
+        if fill_mode not in FILL_MODES:
+            raise ValueError(f"Unknown fill mode: {fill_mode}")
         self.backend_url = backend_url
+        self.stations = station_registry or default_registry()
+        self.use_prediction_cache = use_prediction_cache
+        self.cache_tolerance = cache_tolerance
         self.predictor = None
         self.optimizer = None
+        self.prediction_cache = None
         self.is_running = False
+        # Keep-alive connection pool shared by every fetch
+        self.session = requests.Session()
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.stream = None
+        self.state_store = TrainStateStore()
+        self.section_occupancy = SectionOccupancy()
+        self.state_store.listeners.append(self.section_occupancy)
+        # Unreported distances use expected values in 'deterministic' mode, so a
+        # train that hasn't moved keeps its features (and its cached prediction);
+        # 'random' draws them like the simulator
+        self.fill_mode = fill_mode
+        self.rng = np.random.default_rng(seed) if fill_mode == 'random' else None
+        self.tick_timings = deque(maxlen=200)
+        self.monitor_stats = {'ticks': 0, 'missed_ticks': 0, 'dropped_ticks': 0, 'max_drift_s': 0.0}
+        # Optional SnapshotStore logging every scored tick for retraining
+        self.snapshot_store = snapshot_store
+        # Optional SectionForecaster fed one tick of section features per tick_seconds
+        self.forecaster = forecaster
+        # Every caller scores through the service: one pass at a time, shared by
+        # concurrent requests for the same snapshot
+        self.service = PredictionService(self.analyze_trains, max_pending=max_pending, name='ml-integration')
         
-    def load_trained_model(self, model_path="trained_congestion_model.pkl"):
+    def load_trained_model(self, model_path=DEFAULT_MODEL_PATH):
         """Load the pre-trained model"""
         try:
-            self.predictor = TrainCongestionPredictor().load_model(model_path)
+            self.predictor = TrainCongestionPredictor().load_model(resolve_model_path(model_path))
             self.optimizer = CongestionOptimizer(self.predictor)
+            if self.use_prediction_cache:
+                self.prediction_cache = PredictionCache(self.predictor, tolerance=self.cache_tolerance)
             print("✅ ML model loaded successfully")
             return True
         except Exception as e:
@@ -30,7 +89,7 @@ class MLBackendIntegration:
     def fetch_live_trains(self):
         """Fetch live train data from backend"""
         try:
-            response = requests.get(f"{self.backend_url}/api/health", timeout=5)
+            response = self.session.get(f"{self.backend_url}/api/health", timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 trains = data.get('trains', [])
@@ -85,149 +144,148 @@ class MLBackendIntegration:
         
         return sample_trains
     
+    def update_state(self, trains):
+        """Sync the columnar state store with a snapshot and fill derived features in place"""
+        view = self.state_store.sync(trains)
+        if not len(view):
+            return view
+        
+        # Nearest station for every positioned train in one batched spatial query;
+        # trains without a position get the same defaults as the server path
+        has_position = np.isfinite(view['lat']) & np.isfinite(view['lon'])
+        view['station'][:] = DEFAULT_STATION
+        view['station_type'][:] = DEFAULT_STATION_TYPE
+        view['station_distance_km'][:] = np.nan
+        if has_position.any():
+            index, distance_km = self.stations.nearest(view['lat'][has_position], view['lon'][has_position])
+            view['station'][has_position] = self.stations.codes[index]
+            view['station_type'][has_position] = self.stations.types[index]
+            view['station_distance_km'][has_position] = distance_km
+        
+        # Occupancy is the number of trains in the same track section, updated
+        # incrementally for the trains that changed section
+        slots = np.arange(len(view))
+        self.section_occupancy.update(slots, view['lat'], view['lon'])
+        view['occupancy'][:] = self.section_occupancy.occupancy(slots, cap=MAX_SECTION_OCCUPANCY)
+        
+        # Calculate additional features for the whole batch
+        speed, delay = view['speed'], view['delay']
+        view['signal_status'][:] = estimate_signal_status(speed, delay)
+        view['distance_to_next'][:] = estimate_distance_to_next(speed, self.rng)
+        view['distance_to_destination'][:] = estimate_distance_to_destination(len(view), self.rng)
+        np.divide(view['distance_to_next'], speed + 1, out=view['time_to_clear'])
+        
+        # One timestamp for the whole batch
+        now = datetime.now()
+        view['hour_of_day'][:] = now.hour
+        view['day_of_week'][:] = now.weekday()
+        return view
+    
     def convert_to_ml_format(self, trains):
         """Convert backend train data to ML model format"""
         if not trains:
             return pd.DataFrame()
         
-        ml_data = []
-        for train in trains:
-            # Calculate additional features
-            occupancy = self._estimate_occupancy(train)
-            signal_status = self._estimate_signal_status(train)
-            distance_to_next = self._estimate_distance_to_next(train)
-            distance_to_destination = self._estimate_distance_to_destination(train)
-            time_to_clear = distance_to_next / (train.get('speed', 1) + 1)
-            
-            ml_data.append({
-                'train_id': train.get('id', train.get('number', 'UNKNOWN')),
-                'category': train.get('category', 'passenger'),
-                'station': self._get_nearest_station(train),
-                'station_type': 'major',  # Simplified for now
-                'speed': train.get('speed', 0),
-                'occupancy': occupancy,
-                'signal_status': signal_status,
-                'delay': train.get('delay', 0),
-                'distance_to_next': distance_to_next,
-                'distance_to_destination': distance_to_destination,
-                'time_to_clear': time_to_clear,
-                'hour_of_day': datetime.now().hour,
-                'day_of_week': datetime.now().weekday(),
-                'lat': train.get('lat', 0),
-                'lon': train.get('lon', 0)
-            })
-        
-        return pd.DataFrame(ml_data)
+        view = self.update_state(trains)
+        order = self.state_store.slots_of([train_id_of(train) for train in trains])
+        return pd.DataFrame(view.to_dict(ML_COLUMNS)).iloc[order].reset_index(drop=True)
     
-    def _estimate_occupancy(self, train):
-        """Estimate section occupancy based on train data"""
-        # Simplified estimation - in real implementation, this would be more sophisticated
-        speed = train.get('speed', 0)
-        delay = train.get('delay', 0)
+    def predict_and_optimize(self):
+        """Main prediction and optimization loop"""
+        if not self.predictor or not self.optimizer:
+            print("❌ Model not loaded")
+            return None
         
-        if speed < 20:
-            return 3  # High occupancy
-        elif speed < 40:
-            return 2  # Medium occupancy
-        else:
-            return 1  # Low occupancy
+        # Fetch live train data
+        return self.analyze(self.fetch_live_trains())
     
-    def _estimate_signal_status(self, train):
-        """Estimate signal status based on train data"""
-        speed = train.get('speed', 0)
-        delay = train.get('delay', 0)
+    def analyze(self, trains, timings=None, block=None):
+        """Thread-safe analyze_trains; raises ServiceOverloaded when scoring falls behind
         
-        if speed < 10 or delay > 20:
-            return 0  # Red signal
-        elif speed < 30 or delay > 10:
-            return 1  # Yellow signal
-        else:
-            return 2  # Green signal
-    
-    def _estimate_distance_to_next(self, train):
-        """Estimate distance to next station"""
-        # Simplified estimation
-        speed = train.get('speed', 0)
-        if speed > 0:
-            return np.random.exponential(5000)  # Random realistic distance
-        return 10000  # Large distance if stopped
-    
-    def _estimate_distance_to_destination(self, train):
-        """Estimate distance to final destination"""
-        return np.random.exponential(25000)  # Random realistic distance
-    
-    def _get_nearest_station(self, train):
-        """Get nearest station code"""
-        # Simplified - return a random station
-        stations = ['HWH', 'SDAH', 'SHM', 'SRC', 'BWN', 'BDC', 'NH', 'DKAE', 'KGP']
-        return np.random.choice(stations)
+        Coalesced callers share one result, so every caller's timings dict is
+        filled from the timings_ms of the pass that produced it.
+        """
+        results = self.service.predict(snapshot_key(trains), trains, block=block)
+        if timings is not None and results:
+            timings.update({stage: ms / 1000 for stage, ms in results['timings_ms'].items()})
+        return results
     
-    def predict_and_optimize(self):
-        """Main prediction and optimization loop"""
+    def analyze_trains(self, trains, timings=None):
+        """Predict and optimize for an already fetched batch, recording stage timings"""
         if not self.predictor or not self.optimizer:
             print("❌ Model not loaded")
             return None
         
-        # Fetch live train data
-        trains = self.fetch_live_trains()
+        timings = {} if timings is None else timings
         if not trains:
             print("⚠️  No train data available, generating sample data for testing...")
             trains = self._generate_sample_trains(20)  # Generate 20 sample trains
         
-        # Convert to ML format
-        ml_data = self.convert_to_ml_format(trains)
-        if ml_data.empty:
-            print("⚠️  No valid train data for prediction")
-            return None
-        
-        # Predict congestion
-        predictions, probabilities = self.predictor.predict_congestion(ml_data)
-        
-        # Get optimization suggestions
-        suggestions = self.optimizer.suggest_actions(ml_data, predictions)
-        
-        # Prepare results
-        results = {
-            'timestamp': datetime.now().isoformat(),
-            'total_trains': len(trains),
-            'congestion_predictions': int(np.sum(predictions)),
-            'congestion_rate': float(np.mean(predictions)),
-            'high_risk_trains': [],
-            'optimization_suggestions': suggestions[:10],  # Top 10 suggestions
-            'summary': {
-                'total_trains': len(trains),
-                'congested_trains': int(np.sum(predictions)),
-                'congestion_rate': f"{np.mean(predictions) * 100:.1f}%",
-                'top_action': suggestions[0]['action'] if suggestions else 'monitor'
-            }
-        }
-        
-        # Identify high-risk trains
-        for i, (train, pred, prob) in enumerate(zip(trains, predictions, probabilities)):
-            if pred == 1 and prob > 0.7:  # High probability of congestion
-                results['high_risk_trains'].append({
-                    'train_id': train.get('id', train.get('number', 'UNKNOWN')),
-                    'name': train.get('name', 'Unknown'),
-                    'category': train.get('category', 'passenger'),
-                    'speed': train.get('speed', 0),
-                    'delay': train.get('delay', 0),
-                    'congestion_probability': float(prob),
-                    'location': {
-                        'lat': train.get('lat', 0),
-                        'lon': train.get('lon', 0)
-                    }
-                })
+        with METRICS.trace() as trace:
+            # Update the columnar train state in place
+            with METRICS.stage('convert'):
+                state = self.update_state(trains)
+            if not len(state):
+                print("⚠️  No valid train data for prediction")
+                return None
+            
+            # Predict congestion on the store's feature buffer (steady trains are
+            # served from the prediction cache)
+            with METRICS.stage('predict'):
+                X = self.state_store.feature_matrix(self.predictor.feature_pipeline)
+                if self.prediction_cache is not None:
+                    predictions, probabilities = self.prediction_cache.predict_features(state['train_id'], X)
+                else:
+                    predictions, probabilities = self.predictor.predict_features(X)
+            
+            # Queue the tick for the snapshot log (written by its background thread)
+            if self.snapshot_store is not None:
+                with METRICS.stage('log'):
+                    self.snapshot_store.append(X, state['train_id'], predictions, probabilities)
+            
+            # Get optimization suggestions
+            with METRICS.stage('optimize'):
+                suggestions = self.optimizer.suggest_actions(state, predictions, limit=10)
+            
+            with METRICS.stage('build'):
+                results = build_results(state['record'], predictions, probabilities, suggestions)
+            
+            if self.forecaster is not None:
+                with METRICS.stage('forecast'):
+                    results['section_forecast'] = self.forecast_sections(state, probabilities)
         
+        METRICS.count('rows_analyzed', len(state))
+        timings.update(trace)
+        results['timings_ms'] = to_ms(trace)
         return results
     
-    def start_monitoring(self, interval=30):
-        """Start continuous monitoring"""
+    def forecast_sections(self, state, probabilities, k=10):
+        """Feed this tick to the section forecaster; its top sections once the window is full"""
+        grid = self.section_occupancy.grid
+        sections = self.section_occupancy.slot_section[:len(state)]
+        frame = section_features(sections, state['speed'], state['delay'], probabilities,
+                                 grid.n_sections, datetime.now())
+        self.forecaster.observe(frame)
+        return self.forecaster.top_sections(k, section_name=grid.section_name)
+    
+    def start_monitoring(self, interval=30, use_asyncio=False):
+        """Start continuous monitoring
+        
+        use_asyncio=True runs the fixed-rate pipelined loop (monitor_async) instead
+        of fetch/predict/sleep, keeping a stable cadence at sub-second intervals.
+        """
         if not self.predictor:
             print("❌ Model not loaded. Please load model first.")
             return
         
         self.is_running = True
-        print(f"🚀 Starting ML monitoring (interval: {interval}s)")
+        print(f"🚀 Starting ML monitoring (interval: {interval}s{', asyncio' if use_asyncio else ''})")
+        
+        if use_asyncio:
+            monitor_thread = threading.Thread(target=asyncio.run, args=(self.monitor_async(interval),),
+                                              daemon=True)
+            monitor_thread.start()
+            return
         
         def monitor_loop():
             while self.is_running:
@@ -245,11 +303,130 @@ class MLBackendIntegration:
         monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
         monitor_thread.start()
     
+    async def monitor_async(self, interval=1.0, max_ticks=None):
+        """Fixed-rate monitoring loop with fetch and scoring overlapped
+        
+        A fetcher task starts tick N+1 on schedule while a scorer task is still
+        working on tick N. Blocking HTTP (pooled session) and inference run in
+        their own executor threads so the event loop only keeps time. Ticks are
+        scheduled from the start time, not from when the last one finished, so a
+        slow backend skips slots instead of accumulating drift; if scoring falls
+        behind, the stale snapshot is dropped in favour of the newest one.
+        """
+        if not self.predictor:
+            print("❌ Model not loaded. Please load model first.")
+            return
+        
+        self.is_running = True
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+        fetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ml-fetch')
+        score_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ml-score')
+        
+        async def fetcher():
+            tick = 0
+            next_tick = loop.time()
+            while self.is_running and (max_ticks is None or tick < max_ticks):
+                timings = {'drift': loop.time() - next_tick}
+                started = time.perf_counter()
+                trains = await loop.run_in_executor(fetch_pool, self.fetch_live_trains)
+                timings['fetch'] = time.perf_counter() - started
+                
+                if queue.full():
+                    queue.get_nowait()
+                    self.monitor_stats['dropped_ticks'] += 1
+                queue.put_nowait((tick, started, trains, timings))
+                tick += 1
+                
+                next_tick += interval
+                if next_tick < loop.time():
+                    missed = int((loop.time() - next_tick) // interval) + 1
+                    next_tick += missed * interval
+                    self.monitor_stats['missed_ticks'] += missed
+                await asyncio.sleep(next_tick - loop.time())
+            await queue.put(None)
+        
+        async def scorer():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                tick, started, trains, timings = item
+                try:
+                    results = await loop.run_in_executor(score_pool, self.analyze, trains, timings)
+                    if results:
+                        self._log_results(results)
+                        self._send_to_frontend(results)
+                except Exception as e:
+                    print(f"❌ Monitoring error: {e}")
+                timings['total'] = time.perf_counter() - started
+                self._record_tick(tick, timings)
+        
+        try:
+            await asyncio.gather(fetcher(), scorer())
+        finally:
+            fetch_pool.shutdown(wait=False)
+            score_pool.shutdown(wait=False)
+    
+    async def stream_async(self, batch_window=0.25, ws_url=None, messages=None, max_batches=None):
+        """Consume the WebSocket train feed and predict on change
+        
+        Updates are diffed into an in-memory state table and scored in micro
+        batches, so an alert follows a position update within batch_window plus
+        scoring time instead of waiting for the next poll.
+        """
+        if not self.predictor:
+            print("❌ Model not loaded. Please load model first.")
+            return
+        
+        def on_result(results):
+            self._log_results(results)
+            self._send_to_frontend(results)
+        
+        self.is_running = True
+        self.stream = TrainStream(self, ws_url=ws_url, batch_window=batch_window, on_result=on_result)
+        await self.stream.run(messages=messages, max_batches=max_batches)
+    
+    def start_streaming(self, batch_window=0.25, ws_url=None):
+        """Start streaming mode in a background thread"""
+        if not self.predictor:
+            print("❌ Model not loaded. Please load model first.")
+            return
+        
+        print(f"📡 Streaming train feed (batch window: {batch_window * 1000:.0f}ms)")
+        stream_thread = threading.Thread(target=asyncio.run,
+                                         args=(self.stream_async(batch_window, ws_url),), daemon=True)
+        stream_thread.start()
+    
+    def _record_tick(self, tick, timings):
+        self.tick_timings.append({'tick': tick, **timings})
+        self.monitor_stats['ticks'] += 1
+        self.monitor_stats['max_drift_s'] = max(self.monitor_stats['max_drift_s'], timings.get('drift', 0.0))
+    
+    def monitoring_stats(self):
+        """Tick counters plus median/max per-stage timings (seconds) over recent ticks"""
+        stages = {}
+        for stage in MONITOR_STAGES:
+            values = [t[stage] for t in self.tick_timings if stage in t]
+            if values:
+                stages[stage] = {'median_s': float(np.median(values)), 'max_s': float(np.max(values))}
+        return {**self.monitor_stats, 'stages': stages}
+    
     def stop_monitoring(self):
         """Stop continuous monitoring"""
         self.is_running = False
+        if self.stream:
+            self.stream.stop()
+        if self.snapshot_store is not None:
+            self.snapshot_store.flush()
         print("🛑 ML monitoring stopped")
     
+    def close(self):
+        """Stop monitoring and release the prediction service thread and HTTP pool"""
+        self.stop_monitoring()
+        self.service.close()
+        self.session.close()
+    
     def _log_results(self, results):
         """Log results to console"""
         print(f"\n📊 ML Analysis Results ({results['timestamp']})")
@@ -302,7 +479,7 @@ def main():
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        ml_integration.stop_monitoring()
+        ml_integration.close()
         print("\n👋 ML monitoring stopped")
 
 if __name__ == "__main__":
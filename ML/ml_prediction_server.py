@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Persistent ML prediction server for the backend
+
+Loads the congestion model once and keeps it warm, answering newline-delimited
+JSON frames on stdin/stdout so the Node server doesn't pay interpreter start-up,
+library imports and model unpickling on every tick.
+
+Request frames (one JSON object per line):
+    {"id": 1, "type": "predict", "trains": [...]}
+    {"id": 2, "type": "health"}
+    {"id": 3, "type": "metrics"}
+
+Predict frames may add "encoding": "binary" (base64 uint8 labels / float32
+probabilities instead of JSON lists) and "top_k" to cap high-risk trains.
+
+Response frames carry the request id, so several requests can be in flight at
+once and answers may come back out of order. Predict frames for a snapshot that
+is already being scored share that scoring pass; when too many distinct
+snapshots are waiting the server answers busy instead of queueing more:
+    {"id": 1, "ok": true, "result": {...}}
+    {"id": 4, "ok": false, "error": "ML server busy", "retry": true, ...}
+    {"id": 2, "ok": true, "result": {"status": "ready", ...}}
+    {"id": 3, "ok": true, "result": {"stages": {...}, "counters": {...}, ...}}
+
+Predict results carry a per-request "timings_ms" breakdown; the metrics frame
+returns the process-wide stage aggregates (disable with ML_METRICS=0).
+
+On start-up the server emits {"event": "ready", ...} once the model is loaded.
+"""
+
+import sys
+import os
+import json
+import time
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_STARTED = time.perf_counter()
+from stage_metrics import METRICS
+from train_congestion_predictor import TrainCongestionPredictor, CongestionOptimizer
+from ml_server_integration import run_prediction, snapshot_key, SnapshotMemo
+from prediction_service import PredictionService, ServiceOverloaded, DEFAULT_MAX_PENDING
+from prediction_cache import PredictionCache
+from snapshot_store import SnapshotStore
+from sharded_inference import ShardedPredictor, DEFAULT_MIN_ROWS
+from model_artifact import DEFAULT_MODEL_PATH, resolve_model_path
+METRICS.gauge('import_s', time.perf_counter() - _IMPORT_STARTED)
+
+class PredictionServer:
+    """Line-protocol prediction server holding a warm TrainCongestionPredictor"""
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, workers=2, out=None,
+                 use_cache=True, cache_tolerance=None, fill_mode='deterministic', memo_size=32,
+                 snapshot_dir=None, shard_workers=0, shard_min_rows=DEFAULT_MIN_ROWS,
+                 max_pending=DEFAULT_MAX_PENDING):
+        self.model_path = model_path
+        self.out = out or sys.stdout
+        self.use_cache = use_cache
+        self.cache_tolerance = cache_tolerance
+        self.predictor = None
+        self.optimizer = None
+        self.cache = None
+        self.fill_mode = fill_mode
+        # Identical snapshots are answered from the memo in deterministic mode
+        self.memo = SnapshotMemo(memo_size) if memo_size and fill_mode == 'deterministic' else None
+        self.snapshot_dir = snapshot_dir
+        self.store = None
+        # Large batches are split across a process pool when shard_workers > 1
+        self.shard_workers = shard_workers
+        self.shard_min_rows = shard_min_rows
+        self.scorer = None
+        self.started_at = time.time()
+        self.loaded_at = None
+        self.requests_served = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._write_lock = threading.Lock()
+        # Scoring is serialised and coalesced here; framing/encoding of other
+        # requests overlaps it on the executor threads
+        self.service = PredictionService(self._score, max_pending=max_pending)
+        self._state_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    def load(self):
+        """Load the model once and keep it warm for later requests"""
+        started = time.perf_counter()
+        self.model_path = resolve_model_path(self.model_path)
+        self.predictor = TrainCongestionPredictor().load_trained_model(self.model_path)
+        self.optimizer = CongestionOptimizer(self.predictor)
+        self.scorer = self.predictor
+        if self.shard_workers > 1:
+            self.scorer = ShardedPredictor(self.predictor, self.model_path, workers=self.shard_workers,
+                                           min_rows=self.shard_min_rows).start()
+        if self.use_cache:
+            self.cache = PredictionCache(self.scorer, tolerance=self.cache_tolerance)
+        if self.snapshot_dir:
+            self.store = SnapshotStore(self.snapshot_dir, self.predictor.feature_pipeline)
+        self.loaded_at = time.time()
+        load_time = time.perf_counter() - started
+        METRICS.gauge('model_load_s', load_time)
+        return load_time
+
+    @property
+    def is_ready(self):
+        return self.predictor is not None and self.predictor.is_trained
+
+    def health(self):
+        """Health/readiness probe payload"""
+        with self._state_lock:
+            in_flight = self.in_flight
+            served = self.requests_served
+            errors = self.errors
+        return {
+            'status': 'ready' if self.is_ready else 'loading',
+            'model_loaded': self.is_ready,
+            'model_path': self.model_path,
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self.started_at, 3),
+            'requests_served': served,
+            'errors': errors,
+            'in_flight': in_flight,
+            'service': self.service.stats(),
+            'prediction_cache': self.cache.stats() if self.cache is not None else None,
+            'fill_mode': self.fill_mode,
+            'snapshot_memo': self.memo.stats() if self.memo else None,
+            'snapshot_store': self.store.stats() if self.store else None,
+            'sharding': self.scorer.stats() if isinstance(self.scorer, ShardedPredictor) else None
+        }
+
+    def metrics(self):
+        """Stage timings and counters since start-up, plus the health payload"""
+        return {**METRICS.snapshot(), 'server': self.health()}
+
+    def _send(self, frame):
+        with METRICS.stage('encode'):
+            line = json.dumps(frame)
+        with self._write_lock:
+            self.out.write(line + '\n')
+            self.out.flush()
+
+    def _score(self, trains, encoding, top_k, key):
+        """Scoring pass run by the prediction service (one at a time)"""
+        if not self.is_ready:
+            raise RuntimeError('Model not loaded')
+        if not trains:
+            raise ValueError('Empty train data')
+        return run_prediction(self.scorer, self.optimizer, trains,
+                              encoding=encoding, top_k=top_k, cache=self.cache,
+                              mode=self.fill_mode, memo=self.memo, store=self.store, key=key)
+
+    def _predict(self, request_id, trains, encoding='json', top_k=None):
+        """Queue a predict frame; identical snapshots in flight share one scoring pass"""
+        try:
+            key = snapshot_key(trains, encoding=encoding, top_k=top_k)
+            future = self.service.submit(key, trains, encoding, top_k, key)
+        except Exception as e:
+            # ServiceOverloaded: the caller should retry once scoring catches up
+            self._respond(request_id, None, error=e)
+            return
+        future.add_done_callback(lambda f: self._executor.submit(self._respond, request_id, f))
+
+    def _respond(self, request_id, future, error=None):
+        try:
+            if error is None:
+                error = future.exception()
+            if error is None:
+                self._send({'id': request_id, 'ok': True, 'result': future.result()})
+            elif isinstance(error, ServiceOverloaded):
+                self._send({'id': request_id, 'ok': False, 'error': 'ML server busy',
+                            'details': str(error), 'retry': True})
+            else:
+                self._send({'id': request_id, 'ok': False,
+                            'error': 'ML prediction failed', 'details': str(error)})
+        finally:
+            with self._state_lock:
+                self.in_flight -= 1
+                if error is None:
+                    self.requests_served += 1
+                else:
+                    self.errors += 1
+
+    def handle_line(self, line):
+        """Dispatch a single request frame"""
+        line = line.strip()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            self._send({'id': None, 'ok': False, 'error': 'Invalid frame', 'details': str(e)})
+            return
+        if not isinstance(request, dict):
+            self._send({'id': None, 'ok': False, 'error': 'Invalid frame',
+                        'details': f'expected a JSON object, got {type(request).__name__}'})
+            return
+
+        request_id = request.get('id')
+        request_type = request.get('type', 'predict')
+
+        if request_type in ('health', 'ready'):
+            # Answered inline so probes never queue behind predictions
+            self._send({'id': request_id, 'ok': True, 'result': self.health()})
+        elif request_type == 'metrics':
+            self._send({'id': request_id, 'ok': True, 'result': self.metrics()})
+        elif request_type == 'predict':
+            with self._state_lock:
+                self.in_flight += 1
+            self._executor.submit(self._predict, request_id, request.get('trains'),
+                                  request.get('encoding', 'json'), request.get('top_k'))
+        else:
+            self._send({'id': request_id, 'ok': False,
+                        'error': f"Unknown request type: {request_type}"})
+
+    def serve(self, stream=None):
+        """Read request frames until stdin closes"""
+        stream = stream or sys.stdin
+        for line in stream:
+            self.handle_line(line)
+        self.service.close(wait=True)
+        self._executor.shutdown(wait=True)
+        if self.store:
+            self.store.close()
+        if isinstance(self.scorer, ShardedPredictor):
+            self.scorer.close()
+
+def main():
+    """Start the persistent prediction server"""
+    parser = argparse.ArgumentParser(description='Persistent train congestion prediction server')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH,
+                        help='Model pickle or artifact directory (an exported artifact next to the pickle is preferred)')
+    parser.add_argument('--workers', type=int, default=2, help='Request worker threads')
+    parser.add_argument('--no-cache', action='store_true', help='Re-score every train on every request')
+    parser.add_argument('--fill-mode', choices=['deterministic', 'random'], default='deterministic',
+                        help='How columns missing from train data are filled')
+    parser.add_argument('--memo-size', type=int, default=32,
+                        help='Snapshots whose results are memoized (0 disables)')
+    parser.add_argument('--shard-workers', type=int, default=0,
+                        help='Score large batches across this many worker processes (0/1 = in-process)')
+    parser.add_argument('--shard-min-rows', type=int, default=DEFAULT_MIN_ROWS,
+                        help='Smallest batch worth sharding')
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help='Distinct snapshots allowed to wait for scoring before answering busy')
+    parser.add_argument('--snapshot-dir', help='Log scored snapshots to this SnapshotStore for retraining')
+    args = parser.parse_args()
+
+    # stdout carries the protocol; route library/model prints to stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    server = PredictionServer(args.model, workers=args.workers, out=protocol_out,
+                              use_cache=not args.no_cache, fill_mode=args.fill_mode,
+                              memo_size=args.memo_size, snapshot_dir=args.snapshot_dir,
+                              shard_workers=args.shard_workers, shard_min_rows=args.shard_min_rows,
+                              max_pending=args.max_pending)
+    try:
+        load_time = server.load()
+    except Exception as e:
+        server._send({'event': 'error', 'error': 'Failed to load model', 'details': str(e)})
+        sys.exit(1)
+
+    server._send({'event': 'ready', 'load_time_s': round(load_time, 3), **server.health()})
+    server.serve()
+
+if __name__ == "__main__":
+    main()
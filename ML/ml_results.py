@@ -0,0 +1,96 @@
+"""
+Result payload builder shared by the backend integrations
+
+High-risk trains are selected with numpy masks and ranked by congestion
+probability, and the per-train arrays can be sent either as plain JSON lists
+or as a compact binary payload (base64 uint8 labels / float32 probabilities).
+"""
+
+import base64
+from datetime import datetime
+import numpy as np
+
+HIGH_RISK_THRESHOLD = 0.7
+ENCODINGS = ('json', 'binary')
+
+def select_high_risk(predictions, probabilities, threshold=HIGH_RISK_THRESHOLD, top_k=None):
+    """Indices of congested trains above the risk threshold, most likely first"""
+    index = np.flatnonzero((predictions == 1) & (probabilities > threshold))
+    if top_k is not None and top_k < len(index):
+        # Only the k most likely trains need a full sort
+        index = index[np.argpartition(-probabilities[index], top_k - 1)[:top_k]]
+    order = np.argsort(-probabilities[index], kind='stable')
+    return index[order]
+
+def encode_array(values, dtype):
+    """Encode a numeric array as base64 little-endian bytes"""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<')).tobytes()).decode('ascii')
+
+def decode_array(payload, dtype):
+    """Inverse of encode_array"""
+    return np.frombuffer(base64.b64decode(payload), dtype=np.dtype(dtype).newbyteorder('<'))
+
+def high_risk_records(trains, index, probabilities):
+    """Build high-risk train records for the selected rows only"""
+    records = []
+    for i in index.tolist():
+        train = trains.iloc[i] if hasattr(trains, 'iloc') else trains[i]
+        records.append({
+            'train_id': _py(train.get('id', train.get('number', 'UNKNOWN'))),
+            'name': _py(train.get('name', 'Unknown')),
+            'category': _py(train.get('category', 'passenger')),
+            'speed': _py(train.get('speed', 0)),
+            'delay': _py(train.get('delay', 0)),
+            'congestion_probability': float(probabilities[i]),
+            'location': {
+                'lat': _py(train.get('lat', 0)),
+                'lon': _py(train.get('lon', 0))
+            }
+        })
+    return records
+
+def build_results(trains, predictions, probabilities, suggestions, encoding='json',
+                  top_k=None, threshold=HIGH_RISK_THRESHOLD):
+    """Assemble the prediction payload returned to the backend"""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding: {encoding}")
+
+    predictions = np.asarray(predictions)
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    total = len(predictions)
+    congested = int(np.count_nonzero(predictions == 1))
+    congestion_rate = congested / total if total else 0.0
+
+    high_risk = select_high_risk(predictions, probabilities, threshold, top_k)
+    high_risk_count = int(np.count_nonzero((predictions == 1) & (probabilities > threshold)))
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'total_trains': total,
+        'encoding': encoding,
+        'congestion_rate': float(congestion_rate),
+        'congested_trains': congested,
+        'high_risk_trains': high_risk_records(trains, high_risk, probabilities),
+        'high_risk_count': high_risk_count,
+        'optimization_suggestions': suggestions[:10],  # Top 10 suggestions
+        'summary': {
+            'total_trains': total,
+            'congested_trains': congested,
+            'congestion_rate': f"{congestion_rate * 100:.1f}%",
+            'top_action': suggestions[0]['action'] if suggestions else 'monitor',
+            'average_risk': float(probabilities.mean()) if total else 0.0
+        }
+    }
+
+    if encoding == 'binary':
+        results['congestion_predictions_b64'] = encode_array(predictions, np.uint8)
+        results['congestion_probabilities_b64'] = encode_array(probabilities, np.float32)
+    else:
+        results['congestion_predictions'] = predictions.tolist()
+        results['congestion_probabilities'] = probabilities.tolist()
+
+    return results
+
+def _py(value):
+    """Convert numpy scalars to plain Python values for JSON encoding"""
+    return value.item() if isinstance(value, np.generic) else value
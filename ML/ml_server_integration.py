@@ -6,18 +6,198 @@ Simplified ML integration for the backend server
 import sys
 import os
 import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
 import numpy as np
 import pandas as pd
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from train_congestion_predictor import TrainCongestionPredictor, CongestionOptimizer
+from ml_results import build_results
+from prediction_cache import PredictionCache
+from station_registry import default_registry
+from section_occupancy import count_occupancy
+from feature_estimators import (MAX_SECTION_OCCUPANCY, DEFAULT_STATION, DEFAULT_STATION_TYPE,
+                                estimate_signal_status, estimate_distance_to_next,
+                                estimate_distance_to_destination)
+from model_artifact import DEFAULT_MODEL_PATH, resolve_model_path
+from stage_metrics import METRICS, to_ms
+
+# Raw inputs read from the backend train dicts: column -> (dtype, default)
+INPUT_COLUMNS = {
+    'speed': (np.float32, 0.0),
+    'delay': (np.float32, 0.0),
+    'lat': (np.float64, 0.0),
+    'lon': (np.float64, 0.0),
+    'category': (object, 'passenger')
+}
+
+# Columns the model needs but the backend may omit, derived in this order:
+# column -> (dtype, rule). A value supplied by the backend always wins.
+DERIVED_COLUMNS = {
+    'station': (object, lambda cols, ctx: np.where(ctx['has_position'], ctx['nearest']['station'], DEFAULT_STATION)),
+    'station_type': (object, lambda cols, ctx: np.where(ctx['has_position'], ctx['nearest']['station_type'],
+                                                       DEFAULT_STATION_TYPE)),
+    # Trains sharing each train's track section (1 when the position is unknown)
+    'occupancy': (np.float32, lambda cols, ctx: np.where(
+        ctx['has_position'], count_occupancy(cols['lat'], cols['lon'], cap=MAX_SECTION_OCCUPANCY), 1)),
+    'signal_status': (np.float32, lambda cols, ctx: estimate_signal_status(cols['speed'], cols['delay'])),
+    # Expected values when ctx['rng'] is None (deterministic mode)
+    'distance_to_next': (np.float32, lambda cols, ctx: estimate_distance_to_next(cols['speed'], ctx['rng'])),
+    'distance_to_destination': (np.float32, lambda cols, ctx: estimate_distance_to_destination(ctx['n'], ctx['rng'])),
+    'time_to_clear': (np.float32, lambda cols, ctx: cols['distance_to_next'] / (cols['speed'] + 1)),
+    'hour_of_day': (np.float32, lambda cols, ctx: np.full(ctx['n'], ctx['now'].hour)),
+    'day_of_week': (np.float32, lambda cols, ctx: np.full(ctx['n'], ctx['now'].weekday()))
+}
+
+# 'deterministic' uses expected values for unknown distances, so identical
+# snapshots give identical outputs; 'random' draws them like the simulator
+FILL_MODES = ('deterministic', 'random')
+
+def _read_column(trains, name):
+    """Values of one field for every train and a mask of where it was supplied"""
+    values = [train.get(name) for train in trains]
+    present = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+    return values, present
+
+def _typed(values, present, dtype, fallback):
+    """Fill unsupplied entries from fallback and convert to the schema dtype once"""
+    if present.all():
+        return np.asarray(values, dtype=dtype)
+    out = np.array(fallback, dtype=dtype, copy=True) if np.ndim(fallback) else np.full(len(values), fallback, dtype=dtype)
+    index = np.flatnonzero(present)
+    if len(index):
+        out[index] = np.asarray([values[i] for i in index], dtype=dtype)
+    return out
+
+def prepare_train_frame(trains, mode='deterministic', now=None, rng=None):
+    """Convert backend train dicts to a DataFrame with the columns the model expects"""
+    if mode not in FILL_MODES:
+        raise ValueError(f"Unknown fill mode: {mode}")
+    n = len(trains)
+    columns, supplied = {}, {}
+    for name, (dtype, default) in INPUT_COLUMNS.items():
+        values, supplied[name] = _read_column(trains, name)
+        columns[name] = _typed(values, supplied[name], dtype, default)
+    
+    ctx = {
+        'n': n,
+        'now': now or datetime.now(),
+        'rng': (rng or np.random.default_rng()) if mode == 'random' else None,
+        'has_position': supplied['lat'] & supplied['lon'],
+        # Nearest station for every train in one batched spatial query
+        'nearest': default_registry().lookup(columns['lat'], columns['lon'])
+    }
+    
+    for name, (dtype, rule) in DERIVED_COLUMNS.items():
+        values, present = _read_column(trains, name)
+        fallback = rule(columns, ctx) if not present.all() else None
+        columns[name] = _typed(values, present, dtype, fallback)
+    
+    # Identifiers used by the optimizer and prediction cache
+    for name in ('id', 'number', 'name'):
+        values, present = _read_column(trains, name)
+        if present.any():
+            columns[name] = _typed(values, present, object, 'UNKNOWN')
+    
+    return pd.DataFrame(columns, copy=False)
+
+def snapshot_key(trains, now=None, **options):
+    """Stable hash of a train snapshot plus everything else the output depends on"""
+    now = now or datetime.now()
+    payload = json.dumps([trains, now.hour, now.weekday(), options], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+class SnapshotMemo:
+    """Small LRU of results keyed by snapshot hash (deterministic mode only)"""
+    
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+        # Same predictions, fresh timestamp
+        return {**result, 'timestamp': datetime.now().isoformat()}
+    
+    def put(self, key, result):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._results)
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+def run_prediction(predictor, optimizer, trains, encoding='json', top_k=None, cache=None,
+                   mode='deterministic', memo=None, store=None, key=None):
+    """Score a batch of backend trains and build the result payload (with per-stage timings_ms)"""
+    now = datetime.now()
+    with METRICS.trace() as trace:
+        if memo is None or mode != 'deterministic':
+            key = None
+        else:
+            with METRICS.stage('memo'):
+                key = key or snapshot_key(trains, now, encoding=encoding, top_k=top_k)
+                result = memo.get(key)
+            if result is not None:
+                result['timings_ms'] = to_ms(trace)
+                return result
+        
+        with METRICS.stage('prepare'):
+            df = prepare_train_frame(trains, mode=mode, now=now)
+        
+        # Predict congestion (only changed trains are re-scored when a cache is given)
+        with METRICS.stage('predict'):
+            with METRICS.stage('features'):
+                X, _ = predictor.prepare_features(df)
+            if cache is not None:
+                predictions, probabilities = cache.predict_features(cache.train_ids(df), X)
+            else:
+                predictions, probabilities = predictor.predict_features(X)
+        
+        # Queue the snapshot for the training log (written off the hot path)
+        if store is not None:
+            with METRICS.stage('log'):
+                store.append(X, PredictionCache.train_ids(df), predictions, probabilities, timestamp=now)
+        
+        # Get optimization suggestions
+        with METRICS.stage('optimize'):
+            suggestions = optimizer.suggest_actions(df, predictions, limit=10)
+        
+        with METRICS.stage('build'):
+            result = build_results(trains, predictions, probabilities, suggestions,
+                                   encoding=encoding, top_k=top_k)
+    
+    METRICS.count('rows_predicted', len(df))
+    result['timings_ms'] = to_ms(trace)
+    if key is not None:
+        memo.put(key, result)
+    return result
 
 def main():
     """Main function for ML prediction"""
     try:
         # Load trained model
         predictor = TrainCongestionPredictor()
-        predictor.load_trained_model('trained_congestion_model.pkl')
+        predictor.load_trained_model(resolve_model_path(DEFAULT_MODEL_PATH))
         
         # Read train data from stdin
         train_data_json = sys.stdin.read()
@@ -30,73 +210,7 @@ def main():
             print(json.dumps({"error": "Empty train data"}))
             return
         
-        # Convert to DataFrame and add missing columns
-        df = pd.DataFrame(trains)
-        
-        # Add missing columns that the ML model expects
-        if 'station' not in df.columns:
-            df['station'] = 'HWH'  # Default station
-        if 'station_type' not in df.columns:
-            df['station_type'] = 'major'  # Default station type
-        if 'occupancy' not in df.columns:
-            df['occupancy'] = np.random.randint(0, 4, len(df))  # Random occupancy
-        if 'signal_status' not in df.columns:
-            df['signal_status'] = np.random.choice([0, 1, 2], len(df))  # Random signal status
-        if 'distance_to_next' not in df.columns:
-            df['distance_to_next'] = np.random.exponential(5000, len(df))  # Random distance
-        if 'distance_to_destination' not in df.columns:
-            df['distance_to_destination'] = np.random.exponential(25000, len(df))  # Random distance
-        if 'time_to_clear' not in df.columns:
-            df['time_to_clear'] = df['distance_to_next'] / (df['speed'] + 1)  # Calculate time to clear
-        if 'hour_of_day' not in df.columns:
-            df['hour_of_day'] = np.random.randint(0, 24, len(df))  # Random hour
-        if 'day_of_week' not in df.columns:
-            df['day_of_week'] = np.random.randint(0, 7, len(df))  # Random day
-        
-        # Add required columns for ML model
-        df['congestion'] = 0  # Placeholder for prepare_features
-        
-        # Predict congestion
-        predictions, probabilities = predictor.predict_congestion(df)
-        
-        # Get optimization suggestions
-        optimizer = CongestionOptimizer(predictor)
-        suggestions = optimizer.suggest_actions(df, predictions)
-        
-        # Prepare results
-        results = {
-            'timestamp': pd.Timestamp.now().isoformat(),
-            'total_trains': len(trains),
-            'congestion_predictions': predictions.tolist(),
-            'congestion_probabilities': probabilities.tolist(),
-            'congestion_rate': float(np.mean(predictions)),
-            'congested_trains': int(np.sum(predictions)),
-            'high_risk_trains': [],
-            'optimization_suggestions': suggestions[:10],  # Top 10 suggestions
-            'summary': {
-                'total_trains': len(trains),
-                'congested_trains': int(np.sum(predictions)),
-                'congestion_rate': f"{np.mean(predictions) * 100:.1f}%",
-                'top_action': suggestions[0]['action'] if suggestions else 'monitor',
-                'average_risk': float(np.mean(probabilities))
-            }
-        }
-        
-        # Identify high-risk trains
-        for i, (train, pred, prob) in enumerate(zip(trains, predictions, probabilities)):
-            if pred == 1 and prob > 0.7:  # High probability of congestion
-                results['high_risk_trains'].append({
-                    'train_id': train.get('id', train.get('number', 'UNKNOWN')),
-                    'name': train.get('name', 'Unknown'),
-                    'category': train.get('category', 'passenger'),
-                    'speed': train.get('speed', 0),
-                    'delay': train.get('delay', 0),
-                    'congestion_probability': float(prob),
-                    'location': {
-                        'lat': train.get('lat', 0),
-                        'lon': train.get('lon', 0)
-                    }
-                })
+        results = run_prediction(predictor, CongestionOptimizer(predictor), trains)
         
         # Output results as JSON
         print(json.dumps(results))
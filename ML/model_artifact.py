@@ -0,0 +1,167 @@
+"""
+Versioned, memory-mapped model artifact
+
+Instead of one joblib pickle that every process must fully unpickle, a model is
+saved as a directory:
+
+    trained_congestion_model/
+        metadata.json          format version, feature pipeline, label classes,
+                               scaler settings, training metadata
+        scaler_mean.npy        StandardScaler parameters
+        scaler_scale.npy
+        scaler_var.npy
+        compiled/*.npy         flattened tree-ensemble node arrays
+        model.joblib           scikit-learn estimator, loaded lazily
+
+Numeric arrays are loaded with np.load(mmap_mode='r'), so predictor processes
+share the same read-only pages and loading takes milliseconds. The estimator
+itself is only unpickled (also memory-mapped) when a batch is too large for the
+compiled backend or the ensemble has no compiled form.
+"""
+
+import json
+import os
+import shutil
+import numpy as np
+import joblib
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+
+from compiled_ensemble import CompiledEnsemble, ARRAY_FIELDS
+from feature_pipeline import FeaturePipeline
+
+ARTIFACT_VERSION = 1
+METADATA_FILE = 'metadata.json'
+MODEL_FILE = 'model.joblib'
+COMPILED_DIR = 'compiled'
+SCALER_ARRAYS = ('mean', 'scale', 'var')
+
+DEFAULT_MODEL_PATH = 'trained_congestion_model.pkl'
+DEFAULT_ARTIFACT_DIR = 'trained_congestion_model'
+
+def is_artifact(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, METADATA_FILE))
+
+def resolve_model_path(path=None):
+    """Prefer the artifact directory next to a pickle when one has been exported
+    
+    The directory is only used if it is at least as new as the pickle, so a
+    model saved as a pickle alone (e.g. by TrainCongestionPredictor.main) is
+    not shadowed by an older export.
+    """
+    path = path or DEFAULT_MODEL_PATH
+    if path.endswith('.pkl') and is_artifact(path[:-len('.pkl')]):
+        directory = path[:-len('.pkl')]
+        if not os.path.exists(path) or (os.path.getmtime(os.path.join(directory, METADATA_FILE))
+                                        >= os.path.getmtime(path)):
+            return directory
+    return path
+
+def save_artifact(predictor, directory):
+    """Write the predictor as an artifact directory (replacing any existing one)"""
+    staging = directory.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, COMPILED_DIR))
+
+    scaler = predictor.scaler
+    for name in SCALER_ARRAYS:
+        value = getattr(scaler, name + '_', None)
+        if value is not None:
+            np.save(os.path.join(staging, f'scaler_{name}.npy'), np.asarray(value, dtype=np.float64))
+
+    compiled_meta = None
+    if predictor.compiled is not None:
+        arrays, compiled_meta = predictor.compiled.to_arrays()
+        arrays['children'] = predictor.compiled.children
+        for name, values in arrays.items():
+            np.save(os.path.join(staging, COMPILED_DIR, f'{name}.npy'), np.ascontiguousarray(values))
+
+    joblib.dump(predictor.model, os.path.join(staging, MODEL_FILE))
+
+    metadata = {
+        'format_version': ARTIFACT_VERSION,
+        'model_class': type(predictor.model).__name__,
+        'feature_names': list(predictor.feature_names),
+        'feature_pipeline': predictor.feature_pipeline.to_dict(),
+        'label_classes': [str(c) for c in predictor.label_encoder.classes_],
+        'scaler': {
+            'with_mean': scaler.with_mean,
+            'with_std': scaler.with_std,
+            'n_features_in': int(scaler.n_features_in_),
+            'n_samples_seen': int(np.max(scaler.n_samples_seen_)),
+            'arrays': [name for name in SCALER_ARRAYS if getattr(scaler, name + '_', None) is not None]
+        },
+        'compiled': compiled_meta,
+        'metadata': predictor.metadata
+    }
+    with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2, default=_json_default)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+    return directory
+
+def load_artifact(predictor, directory, backend='auto', mmap=True):
+    """Populate a TrainCongestionPredictor from an artifact directory"""
+    with open(os.path.join(directory, METADATA_FILE)) as f:
+        metadata = json.load(f)
+    if metadata.get('format_version', 0) > ARTIFACT_VERSION:
+        raise ValueError(f"Artifact format {metadata['format_version']} is newer than "
+                         f"supported version {ARTIFACT_VERSION}")
+
+    mmap_mode = 'r' if mmap else None
+
+    def load_array(*parts):
+        return np.load(os.path.join(directory, *parts), mmap_mode=mmap_mode)
+
+    config = metadata['scaler']
+    scaler = StandardScaler(with_mean=config['with_mean'], with_std=config['with_std'])
+    for name in SCALER_ARRAYS:
+        setattr(scaler, name + '_', load_array(f'scaler_{name}.npy') if name in config['arrays'] else None)
+    scaler.n_features_in_ = config['n_features_in']
+    scaler.n_samples_seen_ = config['n_samples_seen']
+
+    label_encoder = LabelEncoder()
+    label_encoder.classes_ = np.array(metadata['label_classes'], dtype=object)
+
+    compiled = None
+    if metadata.get('compiled') and backend != 'sklearn':
+        arrays = {name: load_array(COMPILED_DIR, f'{name}.npy') for name in ARRAY_FIELDS + ('children',)}
+        compiled = CompiledEnsemble.from_arrays(arrays, metadata['compiled'])
+
+    model_file = os.path.join(directory, MODEL_FILE)
+    predictor.scaler = scaler
+    predictor.label_encoder = label_encoder
+    predictor.feature_pipeline = FeaturePipeline.from_dict(metadata['feature_pipeline'])
+    predictor.feature_names = metadata['feature_names']
+    predictor.metadata = metadata.get('metadata', {})
+    predictor.set_model_loader(lambda: joblib.load(model_file, mmap_mode=mmap_mode))
+    predictor.compiled = compiled
+    predictor.is_trained = True
+    return predictor
+
+def _json_default(value):
+    """JSON encoder hook for numpy scalars and arrays in the training metadata"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def main():
+    """Convert a legacy pickle into an artifact directory"""
+    import argparse
+    from train_congestion_predictor import TrainCongestionPredictor
+
+    parser = argparse.ArgumentParser(description='Export a model pickle as a memory-mapped artifact')
+    parser.add_argument('pickle', nargs='?', default=DEFAULT_MODEL_PATH, help='Model pickle to convert')
+    parser.add_argument('directory', nargs='?', default=None, help='Artifact directory to write')
+    args = parser.parse_args()
+
+    directory = args.directory or (args.pickle[:-len('.pkl')] if args.pickle.endswith('.pkl')
+                                   else args.pickle + '.artifact')
+    predictor = TrainCongestionPredictor().load_model(args.pickle)
+    save_artifact(predictor, directory)
+    print(f"✅ Artifact written to {directory}")
+
+if __name__ == "__main__":
+    main()
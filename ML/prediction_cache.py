@@ -0,0 +1,119 @@
+"""
+Incremental per-train prediction cache
+
+Keeps the last scored feature vector and prediction for every train and only
+re-scores trains whose features moved beyond a tolerance since they were last
+scored. Each batch is treated as the full set of trains in the section, so
+trains missing from a batch are evicted.
+"""
+
+import numpy as np
+from feature_pipeline import FEATURE_NAMES
+
+# Absolute per-feature tolerances; features not listed must match exactly
+DEFAULT_TOLERANCES = {
+    'speed': 2.0,                       # km/h
+    'delay': 1.0,                       # minutes
+    'time_to_clear': 5.0,               # seconds
+    'distance_to_next': 100.0,          # metres
+    'distance_to_destination': 250.0,   # metres
+    'speed_occupancy_ratio': 1.0,
+    'delay_speed_ratio': 0.05
+}
+
+ID_COLUMNS = ('id', 'number', 'train_id')
+
+class PredictionCache:
+    """Re-score only trains whose features changed since they were last scored"""
+
+    def __init__(self, predictor, tolerance=None, feature_names=None):
+        self.predictor = predictor
+        self.feature_names = list(feature_names or FEATURE_NAMES)
+        self.tolerance = self._tolerance_vector(tolerance)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clear()
+
+    def _tolerance_vector(self, tolerance):
+        if tolerance is None:
+            tolerance = DEFAULT_TOLERANCES
+        if isinstance(tolerance, dict):
+            merged = {**DEFAULT_TOLERANCES, **tolerance}
+            return np.array([merged.get(name, 0.0) for name in self.feature_names], dtype=np.float32)
+        return np.full(len(self.feature_names), tolerance, dtype=np.float32)
+
+    def clear(self):
+        """Forget every cached train (e.g. after the model is reloaded)"""
+        self._slots = {}
+        self._features = np.empty((0, len(self.feature_names)), dtype=np.float32)
+        self._predictions = np.empty(0, dtype=np.int64)
+        self._probabilities = np.empty(0, dtype=np.float64)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def predict_congestion(self, train_data):
+        """Drop-in replacement for TrainCongestionPredictor.predict_congestion"""
+        X, _ = self.predictor.prepare_features(train_data)
+        return self.predict_features(self.train_ids(train_data), X)
+
+    def predict_features(self, train_ids, X):
+        """Predict a batch, re-scoring only new or changed trains"""
+        n = len(X)
+        slots = np.fromiter((self._slots.get(i, -1) for i in train_ids), dtype=np.int64, count=n)
+        known = slots >= 0
+
+        # A train is stale if it is new, any feature moved beyond its tolerance,
+        # or a feature went missing / became available (NaN never compares >)
+        stale = ~known
+        if known.any():
+            current = X[known]
+            previous = self._features[slots[known]]
+            moved = np.abs(current - previous) > self.tolerance
+            stale[known] = (moved | (np.isnan(current) != np.isnan(previous))).any(axis=1)
+
+        fresh = ~stale
+        features = np.empty((n, X.shape[1]), dtype=np.float32)
+        predictions = np.empty(n, dtype=np.int64)
+        probabilities = np.empty(n, dtype=np.float64)
+
+        # Cached trains keep the vector they were scored with, so slow drift
+        # still triggers a re-score once it exceeds the tolerance
+        features[fresh] = self._features[slots[fresh]]
+        predictions[fresh] = self._predictions[slots[fresh]]
+        probabilities[fresh] = self._probabilities[slots[fresh]]
+
+        if stale.any():
+            features[stale] = X[stale]
+            predictions[stale], probabilities[stale] = self.predictor.predict_features(X[stale])
+
+        # Rebuild the cache from this batch; trains that left the section are evicted
+        new_slots = dict(zip(train_ids, range(n)))
+        self.evictions += sum(1 for train_id in self._slots if train_id not in new_slots)
+        self.hits += int(fresh.sum())
+        self.misses += int(stale.sum())
+        self._slots = new_slots
+        self._features = features
+        self._predictions = predictions
+        self._probabilities = probabilities
+
+        return predictions.copy(), probabilities.copy()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'cached_trains': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    @staticmethod
+    def train_ids(train_data):
+        """Cache keys for a batch: its id column, else row positions"""
+        for name in ID_COLUMNS:
+            if name in train_data:
+                return list(train_data[name])
+        return list(range(len(train_data)))
@@ -0,0 +1,122 @@
+"""
+Concurrency-safe prediction service with request coalescing
+
+Callers submit a snapshot under a key (see ml_server_integration.snapshot_key).
+The service makes sure that:
+
+- scoring is serialised on its own worker thread(s), so a predictor and the
+  state it updates are never used from two threads at once
+- requests for a key that is already queued or being scored share that
+  request's Future instead of scoring the snapshot again
+- at most `max_pending` distinct snapshots wait for scoring; beyond that
+  submit() raises ServiceOverloaded (or waits up to `block` seconds), so a
+  backlog can't grow without bound when scoring falls behind
+"""
+
+import threading
+import queue
+from concurrent.futures import Future
+
+DEFAULT_MAX_PENDING = 8
+
+class ServiceOverloaded(RuntimeError):
+    """Raised when the pending queue is full"""
+
+class PredictionService:
+    """Bounded, coalescing front for a scoring function"""
+
+    def __init__(self, score_fn, max_pending=DEFAULT_MAX_PENDING, workers=1, name='prediction-service'):
+        self.score_fn = score_fn
+        self.max_pending = max_pending
+        self._queue = queue.Queue(max_pending)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._threads = [threading.Thread(target=self._run, name=f'{name}-{i}', daemon=True)
+                         for i in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, *args, block=None, **kwargs):
+        """Future for scoring a snapshot; joins an in-flight request with the same key"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Prediction service is closed')
+            self.submitted += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = self._inflight[key] = Future()
+
+        try:
+            self._queue.put((key, future, args, kwargs), block=block is not None, timeout=block)
+        except queue.Full:
+            with self._lock:
+                del self._inflight[key]
+                self.rejected += 1
+            error = ServiceOverloaded(f'{self.max_pending} snapshots already waiting to be scored')
+            future.set_exception(error)  # callers that coalesced onto it see the rejection too
+            raise error
+        return future
+
+    def predict(self, key, *args, timeout=None, block=None, **kwargs):
+        """Blocking submit(): the shared result for this snapshot"""
+        return self.submit(key, *args, block=block, **kwargs).result(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, future, args, kwargs = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self.score_fn(*args, **kwargs))
+                    success = True
+                except BaseException as e:
+                    future.set_exception(e)
+                    success = False
+            else:
+                success = False
+            # Later requests for this snapshot start a new scoring pass
+            with self._lock:
+                self._inflight.pop(key, None)
+                if success:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'in_flight': len(self._inflight),
+                'pending': self._queue.qsize(),
+                'max_pending': self.max_pending
+            }
+
+    def close(self, wait=True):
+        """Finish queued snapshots and stop the workers"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
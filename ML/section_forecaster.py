@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Section congestion forecasting with an LSTM
+
+Forecasts each track section's probability of congestion 5, 15 and 30 minutes
+ahead from a rolling window of per-section features, one row per tick:
+
+    occupancy, mean_speed, mean_delay, mean_congestion, hour_sin, hour_cos
+
+Per-section windows live in a doubled ring buffer: every tick is written
+twice (at pos and pos + window), so the window ending at the newest tick is
+always the contiguous slice [pos, pos + window). A tick costs one row per
+section and no window is ever rebuilt. Features are normalised as they are
+pushed.
+
+Inference runs through a tf.function with a fixed input signature
+(batch_size, window, features). Sections are scored in padded batches of
+exactly that shape, so the graph is traced once, warmed up at load time and
+never retraced. Only sections that had trains during the window are scored.
+
+Usage:
+    python section_forecaster.py --sections 60 --ticks 6000 --epochs 5
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_congestion_predictor import load_keras
+from feature_pipeline import PEAK_HOURS
+from feature_estimators import MAX_SECTION_OCCUPANCY, MEAN_DISTANCE_TO_NEXT
+
+SECTION_FEATURES = ['occupancy', 'mean_speed', 'mean_delay', 'mean_congestion', 'hour_sin', 'hour_cos']
+HORIZONS_MIN = (5, 15, 30)
+DEFAULT_WINDOW = 30            # ticks of history per forecast
+TICK_SECONDS = 60
+DEFAULT_BATCH = 256
+DEFAULT_MODEL_PATH = 'section_forecaster.keras'
+# Rates of the label terms the live feed doesn't report (see TrainCongestionPredictor._simulate_batch)
+RED_SIGNAL_RATE = 0.15
+PEAK_CONGESTION_RATE = 0.3
+
+def _hour_features(hour):
+    angle = 2 * np.pi * np.asarray(hour) / 24
+    return np.sin(angle), np.cos(angle)
+
+def _aggregate(cell, speed, delay, probability, n_cells):
+    """Train count and mean speed/delay/congestion probability per cell (cell -1 = off the grid)"""
+    cell = np.asarray(cell)
+    inside = cell >= 0
+    c = cell[inside]
+    count = np.bincount(c, minlength=n_cells)
+    per_train = np.maximum(count, 1)
+    columns = np.empty((n_cells, 4), dtype=np.float32)
+    columns[:, 0] = count
+    columns[:, 1] = np.bincount(c, np.asarray(speed)[inside], n_cells) / per_train
+    columns[:, 2] = np.bincount(c, np.asarray(delay)[inside], n_cells) / per_train
+    columns[:, 3] = np.bincount(c, np.asarray(probability)[inside], n_cells) / per_train
+    return columns
+
+def section_features(section, speed, delay, probability, n_sections, now):
+    """Per-section feature rows for one tick from per-train arrays (section -1 = off the grid)"""
+    frame = np.empty((n_sections, len(SECTION_FEATURES)), dtype=np.float32)
+    frame[:, :4] = _aggregate(section, speed, delay, probability, n_sections)
+    frame[:, 4], frame[:, 5] = _hour_features(now.hour + now.minute / 60)
+    return frame
+
+def train_congestion_probability(occupancy, speed, delay, peak):
+    """Per-train congestion probability under the classifier's training rules
+    
+    Stands in for the classifier's output when simulating: occupancy, speed and
+    delay decide the label outright; the signal, clear-time and peak-hour terms
+    the live feed doesn't report are averaged over their simulated distributions.
+    """
+    certain = (occupancy >= 3) | (speed < 25) | (delay > 20)
+    slow_clear = np.exp(-300 * (np.asarray(speed) + 1) / MEAN_DISTANCE_TO_NEXT)
+    uncertain = 1 - (1 - RED_SIGNAL_RATE) * (1 - slow_clear) * (1 - PEAK_CONGESTION_RATE * peak)
+    return np.where(certain, 1.0, uncertain)
+
+def simulate_section_series(n_sections=40, n_ticks=4000, tick_seconds=TICK_SECONDS, seed=42):
+    """Simulated per-section feature series and congestion labels, shape (ticks, sections, ...)
+    
+    Individual trains are drawn for every section and tick and aggregated with
+    the same definitions as live ticks (section_features): mean train delay in
+    minutes and mean per-train congestion probability.
+    """
+    rng = np.random.default_rng(seed)
+    hour = (np.arange(n_ticks) * tick_seconds / 3600) % 24
+    peak = np.isin(np.floor(hour), PEAK_HOURS)
+
+    # Slowly varying traffic load per section (AR(1)), heavier in peak hours
+    load = np.zeros((n_ticks, n_sections))
+    shocks = rng.normal(0, 0.25, (n_ticks, n_sections))
+    for t in range(1, n_ticks):
+        load[t] = 0.97 * load[t - 1] + shocks[t]
+    base = rng.uniform(0.5, 2.0, n_sections)
+    occupancy = rng.poisson(base * (1 + 0.8 * peak[:, None]) * np.exp(0.6 * load))
+
+    # Delay (minutes) builds up while a section is crowded and decays afterwards
+    backlog = np.zeros((n_ticks, n_sections))
+    for t in range(1, n_ticks):
+        backlog[t] = 0.9 * backlog[t - 1] + 2.0 * np.maximum(occupancy[t] - 2, 0)
+
+    # One row per train present in a section at a tick
+    cell = np.repeat(np.arange(n_ticks * n_sections), occupancy.reshape(-1))
+    tick = cell // n_sections
+    crowd = occupancy.reshape(-1)[cell]
+    speed = np.clip(85 - 12 * crowd + rng.normal(0, 15, len(cell)), 0, 130)
+    delay = np.maximum(backlog.reshape(-1)[cell] * rng.uniform(0.5, 1.5, len(cell))
+                       + rng.normal(0, 2, len(cell)), 0)
+    probability = train_congestion_probability(np.minimum(crowd, MAX_SECTION_OCCUPANCY), speed, delay, peak[tick])
+
+    features = np.empty((n_ticks, n_sections, len(SECTION_FEATURES)), dtype=np.float32)
+    features[..., :4] = _aggregate(cell, speed, delay, probability, n_ticks * n_sections).reshape(
+        n_ticks, n_sections, 4)
+    features[..., 4], features[..., 5] = (v[:, None] for v in _hour_features(hour))
+    congested = (occupancy >= 3) | (features[..., 2] > 20)
+    return features, congested
+
+def make_training_windows(features, labels, window, horizon_ticks):
+    """(samples, window, features) inputs and (samples, horizons) labels from series"""
+    n_ticks = len(features)
+    last = n_ticks - max(horizon_ticks)  # window end ticks with every horizon available
+    ends = np.arange(window - 1, last)
+    # (ticks - window + 1, sections, features, window) view, no copy
+    views = np.lib.stride_tricks.sliding_window_view(features, window, axis=0)
+    X = views[ends - window + 1].transpose(0, 1, 3, 2).reshape(-1, window, features.shape[2])
+    y = np.stack([labels[ends + h].reshape(-1) for h in horizon_ticks], axis=1).astype(np.float32)
+    return X, y
+
+class SectionWindowBuffer:
+    """Per-section sliding windows in a doubled ring buffer (O(1) per section per tick)"""
+
+    def __init__(self, n_sections, window, n_features):
+        self.window = window
+        self.data = np.zeros((n_sections, 2 * window, n_features), dtype=np.float32)
+        self.pos = 0
+        self.filled = 0
+        # Ticks in the current window with trains in the section, kept incrementally
+        self.occupied = np.zeros((n_sections, window), dtype=bool)
+        self.active_ticks = np.zeros(n_sections, dtype=np.int32)
+
+    @property
+    def ready(self):
+        return self.filled == self.window
+
+    def push(self, frame, occupied):
+        p = self.pos
+        self.data[:, p] = frame
+        self.data[:, p + self.window] = frame
+        self.active_ticks += occupied.astype(np.int32) - self.occupied[:, p]
+        self.occupied[:, p] = occupied
+        self.pos = (p + 1) % self.window
+        self.filled = min(self.filled + 1, self.window)
+
+    def windows(self, sections=None):
+        """Oldest-to-newest windows (a view when sections is None)"""
+        view = self.data[:, self.pos:self.pos + self.window]
+        return view if sections is None else view[sections]
+
+    def active(self):
+        return np.flatnonzero(self.active_ticks > 0)
+
+class SectionForecaster:
+    """LSTM forecaster of section congestion at several horizons"""
+
+    def __init__(self, model, window=DEFAULT_WINDOW, horizons=HORIZONS_MIN, tick_seconds=TICK_SECONDS,
+                 feature_mean=None, feature_std=None, batch_size=DEFAULT_BATCH):
+        self.model = model
+        self.window = window
+        self.horizons = tuple(horizons)
+        self.tick_seconds = tick_seconds
+        n_features = len(SECTION_FEATURES)
+        self.feature_mean = np.zeros(n_features, np.float32) if feature_mean is None else np.asarray(feature_mean, np.float32)
+        self.feature_std = np.ones(n_features, np.float32) if feature_std is None else np.asarray(feature_std, np.float32)
+        self.batch_size = batch_size
+        self.buffer = None
+        self.last_tick = None
+        self._infer = None
+        self._batch = None
+        self._forecast = None
+        self.forecasts_scored = 0
+
+    @staticmethod
+    def build_model(window, horizons, units=32):
+        keras = load_keras()
+        tf = keras['tf']
+        model = keras['Sequential']([
+            tf.keras.Input((window, len(SECTION_FEATURES))),
+            keras['LSTM'](units),
+            keras['BatchNormalization'](),
+            keras['Dropout'](0.2),
+            keras['Dense'](len(horizons), activation='sigmoid')
+        ])
+        model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['binary_accuracy'])
+        return model
+
+    @classmethod
+    def train(cls, features, labels, window=DEFAULT_WINDOW, horizons=HORIZONS_MIN, tick_seconds=TICK_SECONDS,
+              epochs=5, units=32, batch_size=DEFAULT_BATCH, validation_split=0.2, verbose=1):
+        """Fit on (ticks, sections, features) series with (ticks, sections) congestion labels"""
+        keras = load_keras()
+        horizon_ticks = [max(1, int(round(h * 60 / tick_seconds))) for h in horizons]
+        feature_mean = features.reshape(-1, features.shape[-1]).mean(axis=0)
+        feature_std = features.reshape(-1, features.shape[-1]).std(axis=0) + 1e-6
+        X, y = make_training_windows((features - feature_mean) / feature_std, labels, window, horizon_ticks)
+
+        model = cls.build_model(window, horizons, units)
+        callbacks = [
+            keras['EarlyStopping'](monitor='val_loss', patience=3, restore_best_weights=True),
+            keras['ReduceLROnPlateau'](monitor='val_loss', factor=0.5, patience=2)
+        ]
+        history = model.fit(X, y, epochs=epochs, batch_size=batch_size, validation_split=validation_split,
+                            callbacks=callbacks, verbose=verbose)
+        forecaster = cls(model, window, horizons, tick_seconds, feature_mean, feature_std, batch_size)
+        forecaster.history = history.history
+        return forecaster
+
+    def compile(self):
+        """Trace the fixed-shape inference graph once and warm it up"""
+        tf = load_keras()['tf']
+        spec = tf.TensorSpec((self.batch_size, self.window, len(SECTION_FEATURES)), tf.float32)
+        model = self.model
+        self._infer = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+        self._batch = np.zeros((self.batch_size, self.window, len(SECTION_FEATURES)), dtype=np.float32)
+        self._infer(self._batch)
+        return self
+
+    def predict_windows(self, windows):
+        """Horizon probabilities (n, len(horizons)) for already normalised windows"""
+        if self._infer is None:
+            self.compile()
+        n = len(windows)
+        out = np.empty((n, len(self.horizons)), dtype=np.float32)
+        for start in range(0, n, self.batch_size):
+            stop = min(start + self.batch_size, n)
+            self._batch[:stop - start] = windows[start:stop]
+            self._batch[stop - start:] = 0  # padding rows are scored and discarded
+            out[start:stop] = self._infer(self._batch).numpy()[:stop - start]
+        return out
+
+    def normalise(self, frame):
+        return (frame - self.feature_mean) / self.feature_std
+
+    def observe(self, frame, now=None):
+        """Push one tick of section features; ticks closer than tick_seconds are skipped"""
+        now = time.time() if now is None else now
+        if self.last_tick is not None and now - self.last_tick < self.tick_seconds:
+            return False
+        if self.buffer is None:
+            self.buffer = SectionWindowBuffer(len(frame), self.window, len(SECTION_FEATURES))
+        self.buffer.push(self.normalise(frame), frame[:, 0] > 0)
+        self.last_tick = now
+        self._forecast = None  # the window moved
+        return True
+
+    def forecast(self):
+        """(sections, probabilities) for sections with trains in the window, once it is full
+        
+        Scored once per observed tick; calls between ticks reuse the result.
+        """
+        if self.buffer is None or not self.buffer.ready:
+            return np.empty(0, dtype=np.intp), np.empty((0, len(self.horizons)), dtype=np.float32)
+        if self._forecast is None:
+            sections = self.buffer.active()
+            self._forecast = (sections, self.predict_windows(self.buffer.windows(sections)))
+            self.forecasts_scored += 1
+        return self._forecast
+
+    def top_sections(self, k=10, section_name=str, horizon=15):
+        """Sections most likely to be congested at a horizon, for result payloads"""
+        sections, probabilities = self.forecast()
+        column = self.horizons.index(horizon)
+        order = np.argsort(-probabilities[:, column], kind='stable')[:k]
+        return [{'section': section_name(int(sections[i])),
+                 **{f'congestion_{h}min': round(float(probabilities[i, j]), 4)
+                    for j, h in enumerate(self.horizons)}}
+                for i in order]
+
+    def save(self, filepath=DEFAULT_MODEL_PATH):
+        self.model.save(filepath)
+        with open(filepath + '.json', 'w') as f:
+            json.dump({
+                'window': self.window,
+                'horizons': list(self.horizons),
+                'tick_seconds': self.tick_seconds,
+                'features': SECTION_FEATURES,
+                'feature_mean': self.feature_mean.tolist(),
+                'feature_std': self.feature_std.tolist(),
+                'batch_size': self.batch_size
+            }, f, indent=2)
+        print(f"Forecaster saved to {filepath}")
+
+    @classmethod
+    def load(cls, filepath=DEFAULT_MODEL_PATH, batch_size=None):
+        """Load a saved forecaster with its inference graph compiled and warmed up"""
+        tf = load_keras()['tf']
+        with open(filepath + '.json') as f:
+            config = json.load(f)
+        model = tf.keras.models.load_model(filepath)
+        forecaster = cls(model, config['window'], config['horizons'], config['tick_seconds'],
+                         config['feature_mean'], config['feature_std'], batch_size or config['batch_size'])
+        return forecaster.compile()
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the section congestion forecaster on simulated series')
+    parser.add_argument('--sections', type=int, default=60)
+    parser.add_argument('--ticks', type=int, default=6000, help='Simulated ticks per section')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW)
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--output', default=DEFAULT_MODEL_PATH)
+    args = parser.parse_args()
+
+    print(f"📈 Simulating {args.sections} sections x {args.ticks} ticks...")
+    features, labels = simulate_section_series(args.sections, args.ticks)
+    forecaster = SectionForecaster.train(features, labels, window=args.window, epochs=args.epochs, verbose=2)
+    forecaster.save(args.output)
+
+    forecaster.compile()
+    windows = np.random.default_rng(0).normal(size=(4096, args.window, len(SECTION_FEATURES))).astype(np.float32)
+    started = time.perf_counter()
+    forecaster.predict_windows(windows)
+    elapsed = time.perf_counter() - started
+    print(f"⏱️  Inference: {len(windows)} sections in {elapsed * 1000:.1f}ms "
+          f"(batch {forecaster.batch_size}, fixed-shape graph)")
+
+if __name__ == "__main__":
+    main()
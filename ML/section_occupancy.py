@@ -0,0 +1,152 @@
+"""
+Section occupancy from live train positions
+
+The Howrah area is covered by a fixed lat/lon grid. A lookup table built once
+maps every grid cell to a track section: cells within `station_radius_km` of a
+station belong to that station's section (nearest station wins), and the open
+line in between is split into coarse blocks. Binning a batch of positions is
+then two multiplies, a cast and one table gather.
+
+SectionOccupancy keeps the section of every tracked slot and the number of
+trains per section, and updates both incrementally: only trains that changed
+section touch the counts.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+from station_registry import default_registry
+
+# Howrah section bounds (lat_min, lat_max, lon_min, lon_max)
+HOWRAH_BOUNDS = (20.78, 24.38, 86.41, 90.29)
+CELL_DEG = 0.01            # ~1.1 km grid cells
+BLOCK_DEG = 0.05           # open-line blocks of ~5.5 km
+STATION_RADIUS_KM = 3.0
+OUTSIDE = -1               # section of positions off the grid
+
+class SectionGrid:
+    """Precomputed cell -> section lookup table"""
+
+    def __init__(self, registry=None, bounds=HOWRAH_BOUNDS, cell_deg=CELL_DEG,
+                 block_deg=BLOCK_DEG, station_radius_km=STATION_RADIUS_KM):
+        registry = registry or default_registry()
+        self.lat_min, self.lat_max, self.lon_min, self.lon_max = bounds
+        self.inv_cell = 1.0 / cell_deg
+        self.n_lat = int(np.ceil((self.lat_max - self.lat_min) * self.inv_cell))
+        self.n_lon = int(np.ceil((self.lon_max - self.lon_min) * self.inv_cell))
+
+        # Cell centres, nearest station for each
+        lat = self.lat_min + (np.arange(self.n_lat) + 0.5) * cell_deg
+        lon = self.lon_min + (np.arange(self.n_lon) + 0.5) * cell_deg
+        cell_lat, cell_lon = np.meshgrid(lat, lon, indexing='ij')
+        station, distance_km = registry.nearest(cell_lat.ravel(), cell_lon.ravel())
+
+        # Open-line cells are grouped into coarse blocks, numbered after the stations
+        cells_per_block = max(1, int(round(block_deg / cell_deg)))
+        blocks_lon = -(-self.n_lon // cells_per_block)
+        block = ((np.arange(self.n_lat)[:, None] // cells_per_block) * blocks_lon
+                 + np.arange(self.n_lon)[None, :] // cells_per_block).ravel()
+        near_station = distance_km <= station_radius_km
+        _, block_ids = np.unique(block[~near_station], return_inverse=True)
+
+        table = np.empty(self.n_lat * self.n_lon, dtype=np.int32)
+        table[near_station] = station[near_station]
+        table[~near_station] = len(registry) + block_ids
+        self.table = table
+        self.n_sections = int(table.max()) + 1
+        self.n_stations = len(registry)
+        self.station_codes = registry.codes
+
+    def sections(self, lat, lon):
+        """Section id of every position (OUTSIDE when off the grid)"""
+        i = np.floor((np.asarray(lat, dtype=np.float64) - self.lat_min) * self.inv_cell)
+        j = np.floor((np.asarray(lon, dtype=np.float64) - self.lon_min) * self.inv_cell)
+        inside = (i >= 0) & (i < self.n_lat) & (j >= 0) & (j < self.n_lon)
+        cell = np.where(inside, i * self.n_lon + j, 0).astype(np.intp)
+        return np.where(inside, self.table[cell], OUTSIDE)
+
+    def section_name(self, section):
+        if section == OUTSIDE:
+            return 'outside'
+        if section < self.n_stations:
+            return str(self.station_codes[section])
+        return f'line-{section - self.n_stations}'
+
+@lru_cache(maxsize=1)
+def default_grid():
+    """Shared grid over the Howrah section stations"""
+    return SectionGrid()
+
+def count_occupancy(lat, lon, grid=None, cap=None):
+    """One-shot occupancy for a snapshot: trains sharing each train's section"""
+    grid = grid or default_grid()
+    section = grid.sections(lat, lon)
+    inside = section != OUTSIDE
+    counts = np.bincount(section[inside], minlength=grid.n_sections)
+    occupancy = np.where(inside, counts[np.maximum(section, 0)], 1)
+    return occupancy if cap is None else np.minimum(occupancy, cap)
+
+class SectionOccupancy:
+    """Incrementally maintained train counts per section, keyed by slot"""
+
+    def __init__(self, grid=None, capacity=1024):
+        self.grid = grid or default_grid()
+        self.counts = np.zeros(self.grid.n_sections, dtype=np.int64)
+        self.slot_section = np.full(capacity, OUTSIDE, dtype=np.int32)
+        self.moves = 0
+
+    def _ensure_capacity(self, max_slot):
+        if max_slot >= len(self.slot_section):
+            grown = np.full(max(max_slot + 1, 2 * len(self.slot_section)), OUTSIDE, dtype=np.int32)
+            grown[:len(self.slot_section)] = self.slot_section
+            self.slot_section = grown
+
+    def _add(self, sections, delta):
+        sections = sections[sections != OUTSIDE]
+        if len(sections) < 64:
+            np.add.at(self.counts, sections, delta)
+        else:
+            self.counts += delta * np.bincount(sections, minlength=len(self.counts))
+
+    def update(self, slots, lat, lon):
+        """Apply position updates; returns the number of trains that changed section"""
+        slots = np.asarray(slots, dtype=np.intp)
+        if not len(slots):
+            return 0
+        self._ensure_capacity(int(slots.max()))
+        new = self.grid.sections(lat, lon).astype(np.int32)
+        old = self.slot_section[slots]
+        moved = old != new
+        if moved.any():
+            self._add(old[moved], -1)
+            self._add(new[moved], 1)
+            self.slot_section[slots[moved]] = new[moved]
+            self.moves += int(moved.sum())
+        return int(moved.sum())
+
+    def remove(self, slots):
+        """Stop tracking slots (trains that left)"""
+        slots = np.asarray(slots, dtype=np.intp)
+        slots = slots[slots < len(self.slot_section)]
+        self._add(self.slot_section[slots], -1)
+        self.slot_section[slots] = OUTSIDE
+
+    def move(self, src, dst):
+        """Follow slots relocated by the state store's compaction"""
+        src = np.asarray(src, dtype=np.intp)
+        dst = np.asarray(dst, dtype=np.intp)
+        if len(src):
+            self._ensure_capacity(int(max(src.max(), dst.max())))
+            self.slot_section[dst] = self.slot_section[src]
+            self.slot_section[src] = OUTSIDE
+
+    def occupancy(self, slots, cap=None):
+        """Trains in each slot's section (1 for trains off the grid)"""
+        section = self.slot_section[np.asarray(slots, dtype=np.intp)]
+        occupancy = np.where(section != OUTSIDE, self.counts[np.maximum(section, 0)], 1)
+        return occupancy if cap is None else np.minimum(occupancy, cap)
+
+    def busiest(self, k=5):
+        """The k most occupied sections as (name, trains) pairs"""
+        top = np.argsort(-self.counts, kind='stable')[:k]
+        return [(self.grid.section_name(s), int(self.counts[s])) for s in top if self.counts[s] > 0]
@@ -0,0 +1,172 @@
+"""
+Multi-process sharded inference for very large fleets
+
+ShardedPredictor wraps a TrainCongestionPredictor for batches of tens of
+thousands of trains. A persistent process pool loads the model once per worker
+from a memory-mapped artifact directory, so the scaler and tree arrays are
+shared page-cache pages rather than per-process copies. For each batch the
+feature matrix is written to a shared-memory block. Workers score contiguous
+row ranges and write their probabilities into a shared output block at the
+same offsets, so the merged result keeps the input order without pickling any
+arrays.
+
+Batches below `min_rows` are scored in-process, where IPC would cost more than
+it saves. Anything else (prepare_features, feature_pipeline, ...) is delegated
+to the wrapped predictor, so a ShardedPredictor can stand in for it in
+run_prediction and PredictionCache.
+"""
+
+import os
+import atexit
+import tempfile
+import shutil
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, wait
+import numpy as np
+
+from train_congestion_predictor import TrainCongestionPredictor
+from model_artifact import is_artifact, resolve_model_path
+from stage_metrics import METRICS
+
+DEFAULT_MIN_ROWS = 50000      # below this, in-process scoring wins
+MIN_SHARD_ROWS = 10000
+
+# Worker process state: the warm predictor and attached shared-memory blocks
+_worker_predictor = None
+_worker_blocks = {}
+
+def _init_worker(model_path):
+    global _worker_predictor
+    METRICS.enabled = False  # stage timings are recorded by the parent
+    _worker_predictor = TrainCongestionPredictor().load_model(model_path, backend='sklearn')
+    _worker_predictor.model  # unpickle the estimator before the first shard
+
+def _attach(role, name):
+    """Worker-side handle on the parent's current input or output block"""
+    block = _worker_blocks.get(role)
+    if block is None or block.name != name:
+        # The parent replaces blocks when it grows them
+        if block is not None:
+            block.close()
+        block = _worker_blocks[role] = shared_memory.SharedMemory(name=name)
+    return block
+
+def _score_shard(x_name, out_name, n_rows, n_features, start, stop):
+    """Score rows [start, stop) of the shared feature matrix into the shared output"""
+    X = np.ndarray((n_rows, n_features), dtype=np.float32, buffer=_attach('x', x_name).buf)
+    out = np.ndarray(n_rows, dtype=np.float64, buffer=_attach('out', out_name).buf)
+    _, out[start:stop] = _worker_predictor.predict_features(X[start:stop])
+    return stop - start
+
+def _ping():
+    return os.getpid()
+
+class ShardedPredictor:
+    """Score large batches across a persistent process pool via shared memory"""
+
+    def __init__(self, predictor, model_path=None, workers=None, min_rows=DEFAULT_MIN_ROWS,
+                 min_shard_rows=MIN_SHARD_ROWS):
+        self.predictor = predictor
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self.min_shard_rows = min_shard_rows
+        self._owned_dir = None
+        self.model_path = self._shareable_path(model_path)
+        self._pool = None
+        self._x_block = None
+        self._out_block = None
+        self._block_rows = 0
+        self.sharded_batches = 0
+        self.local_batches = 0
+
+    def __getattr__(self, name):
+        # Only reached for attributes ShardedPredictor doesn't define itself
+        return getattr(self.__dict__['predictor'], name)
+
+    def _shareable_path(self, model_path):
+        """Artifact directory the workers memory-map (exported to a temp dir if needed)"""
+        if model_path is not None:
+            model_path = resolve_model_path(model_path)
+            if is_artifact(model_path):
+                return model_path
+        self._owned_dir = tempfile.mkdtemp(prefix='sharded-model-')
+        path = os.path.join(self._owned_dir, 'model')
+        self.predictor.save_model(path)
+        return path
+
+    def start(self):
+        """Start the pool and load the model in every worker"""
+        if self._pool is None:
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=context,
+                                             initializer=_init_worker, initargs=(self.model_path,))
+            wait([self._pool.submit(_ping) for _ in range(self.workers)])
+            atexit.register(self.close)
+        return self
+
+    def _blocks(self, n_rows, n_features):
+        """Shared input/output blocks big enough for the batch (grown by doubling)"""
+        if self._x_block is None or self._x_block.size < n_rows * n_features * 4:
+            rows = max(n_rows, 2 * self._block_rows)
+            self._release_blocks()
+            self._x_block = shared_memory.SharedMemory(create=True, size=rows * n_features * 4)
+            self._out_block = shared_memory.SharedMemory(create=True, size=rows * 8)
+            self._block_rows = rows
+        return self._x_block, self._out_block
+
+    def _release_blocks(self):
+        for block in (self._x_block, self._out_block):
+            if block is not None:
+                block.close()
+                block.unlink()
+        self._x_block = self._out_block = None
+
+    def shards(self, n_rows):
+        """Contiguous (start, stop) row ranges, at most one per worker"""
+        count = max(1, min(self.workers, n_rows // self.min_shard_rows))
+        bounds = np.linspace(0, n_rows, count + 1).astype(int)
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def predict_features(self, X):
+        """Same result as TrainCongestionPredictor.predict_features, sharded when large"""
+        n_rows = len(X)
+        if n_rows < self.min_rows or self.workers < 2:
+            self.local_batches += 1
+            return self.predictor.predict_features(X)
+
+        self.start()
+        n_features = X.shape[1]
+        x_block, out_block = self._blocks(n_rows, n_features)
+        np.ndarray((n_rows, n_features), dtype=np.float32, buffer=x_block.buf)[:] = X
+        futures = [self._pool.submit(_score_shard, x_block.name, out_block.name, n_rows, n_features, start, stop)
+                   for start, stop in self.shards(n_rows)]
+        for future in futures:
+            future.result()  # re-raises worker errors
+
+        probabilities = np.ndarray(n_rows, dtype=np.float64, buffer=out_block.buf).copy()
+        self.sharded_batches += 1
+        return (probabilities > 0.5).astype(int), probabilities
+
+    def predict_congestion(self, train_data):
+        X, _ = self.predictor.prepare_features(train_data)
+        return self.predict_features(X)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'min_rows': self.min_rows,
+            'started': self._pool is not None,
+            'sharded_batches': self.sharded_batches,
+            'local_batches': self.local_batches
+        }
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._release_blocks()
+        if self._owned_dir:
+            shutil.rmtree(self._owned_dir, ignore_errors=True)
+            self._owned_dir = None
@@ -0,0 +1,330 @@
+"""
+Columnar on-disk store for logged train snapshots
+
+Every scored tick can be appended: the feature matrix, train ids, predictions
+and probabilities. Later-observed outcomes (was the train congested?) go to a
+separate stream via record_outcomes(); ticks never label themselves unless
+asked to. Both streams are partitioned by UTC date/hour and written as
+append-only NumPy parts:
+
+    root/_schema.json
+    root/snapshots/date=2026-10-17/hour=13/part-<ts_min>-<ts_max>-<pid>-<seq>.npz
+    root/outcomes/date=2026-10-17/hour=13/part-...npz
+
+append() only copies the arrays and queues them; a background writer thread
+batches rows per partition and writes a part once enough rows are buffered or
+the flush interval passes, so disk I/O stays off the prediction hot path.
+
+Range scans prune whole hour partitions by directory name and parts by the
+timestamp range in their file name, and only read the requested columns.
+training_chunks() joins each snapshot with the train's next observed outcome
+and yields DataFrames that TrainCongestionPredictor.train_streaming accepts.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+import itertools
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+from feature_pipeline import FEATURE_NAMES, NUMERIC_COLUMNS, FeaturePipeline
+
+SNAPSHOTS = 'snapshots'
+OUTCOMES = 'outcomes'
+SCHEMA_FILE = '_schema.json'
+SCHEMA_VERSION = 1
+HOUR_S = 3600
+DEFAULT_FLUSH_ROWS = 50000
+DEFAULT_FLUSH_INTERVAL = 10.0   # seconds
+DEFAULT_HORIZON = 900           # outcome join window (seconds)
+UNKNOWN_CATEGORY = 'unknown'
+
+def observed_congestion(X, feature_names=FEATURE_NAMES):
+    """Congestion by the labelling rules of the training data, from observed feature rows"""
+    column = {name: X[:, j] for j, name in enumerate(feature_names)}
+    return ((column['occupancy'] >= 3) | (column['speed'] < 25) | (column['signal_status'] == 0) |
+            (column['delay'] > 20) | (column['time_to_clear'] > 300))
+
+def partition_of(ts):
+    """Partition directories (UTC date, hour) for an epoch timestamp"""
+    utc = time.gmtime(ts)
+    return time.strftime('date=%Y-%m-%d', utc), time.strftime('hour=%H', utc)
+
+def _epoch(value):
+    """Epoch seconds for a float, datetime or ISO string bound (None = open)"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+def _partition_start(path):
+    """Epoch seconds at which a date=.../hour=.. partition starts"""
+    date, hour = path.split(os.sep)[-2:]
+    return datetime.strptime(f"{date[5:]} {hour[5:]}", '%Y-%m-%d %H').replace(tzinfo=timezone.utc).timestamp()
+
+class SnapshotStore:
+    """Append-only, hour-partitioned snapshot log with a background writer"""
+
+    def __init__(self, root, feature_pipeline=None, flush_rows=DEFAULT_FLUSH_ROWS,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_pending=1024):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.schema = self._load_schema(feature_pipeline or FeaturePipeline())
+        self.feature_names = self.schema['feature_names']
+        self.rows_appended = 0
+        self.rows_written = 0
+        self.parts_written = 0
+        self.dropped = 0
+        self._seq = itertools.count()
+        self._buffers = {}
+        self._buffered_rows = {}
+        self._queue = queue.Queue(max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _load_schema(self, pipeline):
+        path = os.path.join(self.root, SCHEMA_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        os.makedirs(self.root, exist_ok=True)
+        schema = {'format_version': SCHEMA_VERSION, 'feature_names': list(pipeline.feature_names),
+                  'feature_pipeline': pipeline.to_dict()}
+        with open(path, 'w') as f:
+            json.dump(schema, f, indent=2)
+        return schema
+
+    # Writing
+
+    def append(self, X, train_ids, predictions, probabilities, timestamp=None, observe_outcomes=False):
+        """Queue one scored tick (non-blocking; the arrays are copied)
+
+        observe_outcomes=True also records an outcome per row by applying the
+        training data's labelling rules to the tick's own features. Those are
+        synthetic labels, only meant for simulated feeds; real outcomes should
+        come from record_outcomes().
+        """
+        batch = {
+            'ts': time.time() if timestamp is None else _epoch(timestamp),
+            'train_id': list(train_ids),
+            'features': np.array(X, dtype=np.float32),
+            'prediction': np.array(predictions, dtype=np.uint8),
+            'probability': np.array(probabilities, dtype=np.float32)
+        }
+        self._enqueue((SNAPSHOTS, batch, observe_outcomes))
+
+    def record_outcomes(self, train_ids, congested, timestamp=None):
+        """Queue outcomes observed for trains (e.g. reported later by operations)"""
+        batch = {
+            'ts': time.time() if timestamp is None else _epoch(timestamp),
+            'train_id': list(train_ids),
+            'congested': np.array(congested, dtype=np.uint8)
+        }
+        self._enqueue((OUTCOMES, batch, False))
+
+    def _enqueue(self, item):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(item[1]['train_id'])
+            return
+        with self._lock:
+            self.rows_appended += len(item[1]['train_id'])
+
+    def _ensure_writer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+            self._thread.start()
+
+    def flush(self):
+        """Block until everything queued so far is on disk"""
+        if self._thread is not None and self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def close(self):
+        """Write out pending rows and stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None or isinstance(item, threading.Event):
+                self._write_all()
+                if item is None:
+                    return
+                item.set()
+                last_flush = time.monotonic()
+                continue
+            if item:
+                self._buffer(*item)
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._write_all()
+                last_flush = time.monotonic()
+
+    def _buffer(self, stream, batch, observe_outcomes):
+        n = len(batch['train_id'])
+        ts = np.full(n, batch['ts'], dtype=np.float64)
+        ids = np.asarray(batch['train_id']).astype(str)
+        columns = {'ts': ts, 'train_id': ids}
+        columns.update((name, values) for name, values in batch.items() if name not in columns)
+        self._add(stream, batch['ts'], columns)
+        if observe_outcomes:
+            congested = observed_congestion(batch['features'], self.feature_names).astype(np.uint8)
+            self._add(OUTCOMES, batch['ts'], {'ts': ts, 'train_id': ids, 'congested': congested})
+
+    def _add(self, stream, ts, columns):
+        key = (stream, *partition_of(ts))
+        self._buffers.setdefault(key, []).append(columns)
+        self._buffered_rows[key] = self._buffered_rows.get(key, 0) + len(columns['ts'])
+        if self._buffered_rows[key] >= self.flush_rows:
+            self._write(key)
+
+    def _write_all(self):
+        for key in list(self._buffers):
+            self._write(key)
+
+    def _write(self, key):
+        batches = self._buffers.pop(key)
+        del self._buffered_rows[key]
+        columns = {name: np.concatenate([b[name] for b in batches]) for name in batches[0]}
+        ts = columns['ts']
+        directory = os.path.join(self.root, *key)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{int(ts.min() * 1000)}-{int(ts.max() * 1000)}-{os.getpid()}-{next(self._seq)}.npz"
+        staging = os.path.join(directory, '.' + name)
+        with open(staging, 'wb') as f:
+            np.savez(f, **columns)
+        os.replace(staging, os.path.join(directory, name))  # readers never see partial parts
+        with self._lock:
+            self.rows_written += len(ts)
+            self.parts_written += 1
+
+    # Reading
+
+    def partitions(self, stream=SNAPSHOTS, start=None, end=None):
+        """Hour partition directories overlapping [start, end), oldest first"""
+        start, end = _epoch(start), _epoch(end)
+        base = os.path.join(self.root, stream)
+        if not os.path.isdir(base):
+            return []
+        selected = []
+        for date in sorted(os.listdir(base)):
+            for hour in sorted(os.listdir(os.path.join(base, date))):
+                path = os.path.join(base, date, hour)
+                begins = _partition_start(path)
+                if (end is None or begins < end) and (start is None or begins + HOUR_S > start):
+                    selected.append(path)
+        return selected
+
+    def scan(self, stream=SNAPSHOTS, start=None, end=None, columns=None):
+        """Yield one dict of column arrays per part with rows in [start, end)"""
+        start, end = _epoch(start), _epoch(end)
+        for directory in self.partitions(stream, start, end):
+            for name in sorted(os.listdir(directory)):
+                if not name.startswith('part-'):
+                    continue
+                ts_min, ts_max = (int(v) / 1000 for v in name.split('-')[1:3])
+                if (end is not None and ts_min >= end) or (start is not None and ts_max < start):
+                    continue
+                with np.load(os.path.join(directory, name)) as part:
+                    names = part.files if columns is None else columns
+                    batch = {column: part[column] for column in set(names) | {'ts'}}
+                ts = batch['ts']
+                if (start is not None and ts_min < start) or (end is not None and ts_max >= end):
+                    keep = np.ones(len(ts), dtype=bool)
+                    if start is not None:
+                        keep &= ts >= start
+                    if end is not None:
+                        keep &= ts < end
+                    batch = {column: values[keep] for column, values in batch.items()}
+                yield batch
+
+    def read(self, stream=SNAPSHOTS, start=None, end=None, columns=None):
+        """Rows in [start, end) as a DataFrame (features expanded to named columns)"""
+        frames = [self.to_frame(batch) for batch in self.scan(stream, start, end, columns)]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).sort_values('ts', kind='stable', ignore_index=True)
+
+    def to_frame(self, batch):
+        data = {}
+        for column, values in batch.items():
+            if column == 'features':
+                data.update(zip(self.feature_names, values.T))
+            else:
+                data[column] = values
+        return pd.DataFrame(data)
+
+    def training_chunks(self, start=None, end=None, horizon=DEFAULT_HORIZON, chunk_rows=DEFAULT_FLUSH_ROWS * 2):
+        """Chunk source of labelled snapshots for TrainCongestionPredictor.train_streaming
+
+        Each snapshot row is labelled with the first outcome observed for the
+        same train within `horizon` seconds after it; rows without one are
+        skipped. Partitions are joined one hour at a time.
+        """
+        pipeline = FeaturePipeline.from_dict(self.schema['feature_pipeline'])
+        # Unknown codes (-1) index the trailing UNKNOWN_CATEGORY entry
+        category = np.array(pipeline.category_vocab + [UNKNOWN_CATEGORY], dtype=object)
+        station_type = np.array(pipeline.station_type_vocab + [UNKNOWN_CATEGORY], dtype=object)
+        names = self.feature_names
+
+        def chunks():
+            for directory in self.partitions(SNAPSHOTS, start, end):
+                hour_start = _partition_start(directory)
+                lo = hour_start if start is None else max(hour_start, _epoch(start))
+                hi = hour_start + HOUR_S if end is None else min(hour_start + HOUR_S, _epoch(end))
+                snapshots = list(self.scan(SNAPSHOTS, lo, hi, ['train_id', 'features']))
+                outcomes = list(self.scan(OUTCOMES, lo, hi + horizon, ['train_id', 'congested']))
+                if not snapshots or not outcomes:
+                    continue
+                left = pd.DataFrame({
+                    'ts': np.concatenate([b['ts'] for b in snapshots]),
+                    'train_id': np.concatenate([b['train_id'] for b in snapshots]),
+                    'row': np.arange(sum(len(b['ts']) for b in snapshots))
+                }).sort_values('ts', kind='stable')
+                right = pd.DataFrame({
+                    'ts': np.concatenate([b['ts'] for b in outcomes]),
+                    'train_id': np.concatenate([b['train_id'] for b in outcomes]),
+                    'congestion': np.concatenate([b['congested'] for b in outcomes]).astype(np.int64)
+                }).sort_values('ts', kind='stable')
+                joined = pd.merge_asof(left, right, on='ts', by='train_id', direction='forward',
+                                       tolerance=horizon, allow_exact_matches=False).dropna(subset=['congestion'])
+                if joined.empty:
+                    continue
+
+                X = np.concatenate([b['features'] for b in snapshots])[joined['row'].to_numpy()]
+                frame = pd.DataFrame(dict(zip(NUMERIC_COLUMNS, X[:, :len(NUMERIC_COLUMNS)].T)))
+                frame['category'] = category[X[:, names.index('category_encoded')].astype(np.int64)]
+                frame['station_type'] = station_type[X[:, names.index('station_type_encoded')].astype(np.int64)]
+                frame['congestion'] = joined['congestion'].to_numpy(dtype=np.int64)
+                for offset in range(0, len(frame), chunk_rows):
+                    yield frame.iloc[offset:offset + chunk_rows].reset_index(drop=True)
+        return chunks
+
+    def stats(self):
+        with self._lock:
+            return {
+                'root': self.root,
+                'rows_appended': self.rows_appended,
+                'rows_written': self.rows_written,
+                'parts_written': self.parts_written,
+                'dropped': self.dropped,
+                'pending_batches': self._queue.qsize()
+            }
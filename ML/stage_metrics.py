@@ -0,0 +1,131 @@
+"""
+Stage timers and counters for the prediction hot path
+
+Code marks its stages with `with METRICS.stage('score'):` and counts work with
+`METRICS.count('rows_scored', n)`. Every stage feeds process-wide aggregates
+(count/total/max/last) for the metrics endpoint, and stages inside a
+`with METRICS.trace() as timings:` block are also collected per call, so one
+request's breakdown can go into its result payload.
+
+When disabled (ML_METRICS=0 or METRICS.enabled = False) stage() hands back a
+shared no-op context manager and count() returns immediately.
+"""
+
+import os
+import time
+import threading
+from contextlib import nullcontext
+
+_NULL_STAGE = nullcontext()
+
+class _Stage:
+    """Times one stage into the aggregates and the active trace"""
+
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.started)
+        return False
+
+class _Trace:
+    """Collects per-call stage durations (seconds) for the current thread"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.timings = {}
+        self.parent = None
+
+    def __enter__(self):
+        local = self.metrics._local
+        self.parent = getattr(local, 'trace', None)
+        local.trace = self.timings
+        return self.timings
+
+    def __exit__(self, *exc):
+        self.metrics._local.trace = self.parent
+        if self.parent is not None:
+            for name, seconds in self.timings.items():
+                self.parent[name] = self.parent.get(name, 0.0) + seconds
+        return False
+
+class Metrics:
+    """Process-wide stage timing and counter registry"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.gauges = {}
+            self.started_at = time.time()
+
+    def stage(self, name):
+        """Context manager timing one stage (no-op when disabled)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def trace(self):
+        """Context manager yielding a dict of this call's stage durations"""
+        if not self.enabled:
+            return nullcontext({})
+        return _Trace(self)
+
+    def record(self, name, seconds):
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace[name] = trace.get(name, 0.0) + seconds
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = {'count': 0, 'total_s': 0.0, 'max_s': 0.0, 'last_s': 0.0}
+            stats['count'] += 1
+            stats['total_s'] += seconds
+            stats['last_s'] = seconds
+            if seconds > stats['max_s']:
+                stats['max_s'] = seconds
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        """Record a one-off measurement such as import or model load time"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        """JSON-ready copy of every aggregate"""
+        with self._lock:
+            stages = {
+                name: {**stats, 'mean_ms': stats['total_s'] / stats['count'] * 1000 if stats['count'] else 0.0}
+                for name, stats in self.stages.items()
+            }
+            return {
+                'enabled': self.enabled,
+                'since': self.started_at,
+                'stages': stages,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges)
+            }
+
+def to_ms(timings):
+    """Round a trace's seconds to milliseconds for payloads"""
+    return {name: round(seconds * 1000, 3) for name, seconds in timings.items()}
+
+METRICS = Metrics(enabled=os.environ.get('ML_METRICS', '1') != '0')
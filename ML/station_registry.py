@@ -0,0 +1,75 @@
+"""
+Shared station registry with a spatial index for nearest-station lookups
+
+Stations are indexed as points on the unit sphere in a KD-tree, so the nearest
+station by chord length is also the nearest by great-circle distance, and a
+whole batch of trains is resolved in one vectorized query.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Station coordinates for Howrah section (200km radius)
+HOWRAH_STATIONS = {
+    'HWH': {'lat': 22.583, 'lon': 88.342, 'type': 'major'},
+    'SDAH': {'lat': 22.576, 'lon': 88.363, 'type': 'major'},
+    'SHM': {'lat': 22.543, 'lon': 88.319, 'type': 'yard'},
+    'SRC': {'lat': 22.492, 'lon': 88.314, 'type': 'yard'},
+    'BWN': {'lat': 23.232, 'lon': 87.861, 'type': 'junction'},
+    'BDC': {'lat': 22.664, 'lon': 88.171, 'type': 'junction'},
+    'NH': {'lat': 22.894, 'lon': 88.427, 'type': 'suburban'},
+    'DKAE': {'lat': 22.680, 'lon': 88.300, 'type': 'freight'},
+    'KGP': {'lat': 22.339, 'lon': 87.325, 'type': 'major'}
+}
+
+def to_unit_vectors(lat, lon):
+    """Convert degrees to (n, 3) points on the unit sphere"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+class StationRegistry:
+    """Station codes, types and coordinates with a KD-tree spatial index"""
+
+    def __init__(self, stations=None):
+        from scipy.spatial import cKDTree
+
+        stations = stations or HOWRAH_STATIONS
+        self.codes = np.array(list(stations), dtype=object)
+        self.lat = np.array([s['lat'] for s in stations.values()], dtype=np.float64)
+        self.lon = np.array([s['lon'] for s in stations.values()], dtype=np.float64)
+        self.types = np.array([s.get('type', 'major') for s in stations.values()], dtype=object)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self._tree = cKDTree(to_unit_vectors(self.lat, self.lon))
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a registry from dicts with code/lat/lon/type keys"""
+        return cls({r['code']: {'lat': r['lat'], 'lon': r['lon'], 'type': r.get('type', 'major')}
+                    for r in records})
+
+    def __len__(self):
+        return len(self.codes)
+
+    def nearest(self, lat, lon):
+        """Nearest station index and great-circle distance (km) for each point"""
+        chord, index = self._tree.query(to_unit_vectors(lat, lon))
+        distance_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+        return index, distance_km
+
+    def lookup(self, lat, lon):
+        """Nearest station code, type and distance for a batch of positions"""
+        index, distance_km = self.nearest(lat, lon)
+        return {
+            'station': self.codes[index],
+            'station_type': self.types[index],
+            'station_distance_km': distance_km
+        }
+
+@lru_cache(maxsize=1)
+def default_registry():
+    """Shared registry for the Howrah section stations"""
+    return StationRegistry(HOWRAH_STATIONS)
@@ -0,0 +1,171 @@
+"""
+Memory-bounded streaming training over chunked datasets
+
+Training data (simulated or logged snapshots) is read one DataFrame chunk at a
+time, so memory depends on the chunk size rather than the dataset size:
+
+    stats pass  StandardScaler.partial_fit on every chunk, plus bounded
+                reservoirs for the histogram bin edges and the holdout set
+    epochs      each chunk is scaled, binned and fed to
+                SGDClassifier(loss='log_loss').partial_fit
+
+The model is Pipeline(QuantileBinner, SGDClassifier): features are one-hot
+encoded into per-feature quantile bins (sparse), so the linear model learns a
+step function per feature and picks up the threshold rules behind congestion.
+Holdout rows are chosen per chunk from a seeded RNG, so the same rows are held
+out in every pass.
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+DEFAULT_CHUNK_SIZE = 100000
+DEFAULT_BINS = 32
+SAMPLE_ROWS = 50000         # reservoir used for the bin edges
+MAX_HOLDOUT_ROWS = 50000
+CLASSES = np.array([0, 1])
+
+class QuantileBinner(BaseEstimator, TransformerMixin):
+    """One-hot encode each feature into quantile bins (sparse CSR output)"""
+
+    def __init__(self, n_bins=DEFAULT_BINS):
+        self.n_bins = n_bins
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=np.float64)
+        quantiles = np.linspace(0, 1, self.n_bins + 1)[1:-1]
+        # Repeated edges (discrete features) collapse; unused bins stay empty
+        self.edges_ = [np.unique(np.quantile(X[:, j], quantiles)) for j in range(X.shape[1])]
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X)
+        n, n_features = X.shape
+        indices = np.empty((n, n_features), dtype=np.int32)
+        for j, edges in enumerate(self.edges_):
+            indices[:, j] = np.searchsorted(edges, X[:, j], side='right') + j * self.n_bins
+        indptr = np.arange(0, n * n_features + 1, n_features, dtype=np.int32)
+        data = np.ones(n * n_features, dtype=np.float32)
+        return sparse.csr_matrix((data, indices.ravel(), indptr), shape=(n, n_features * self.n_bins))
+
+class Reservoir:
+    """Fixed-size uniform sample of the rows seen so far (algorithm R, vectorized per chunk)"""
+
+    def __init__(self, size, n_columns, rng, dtype=np.float32):
+        self.rows = np.empty((size, n_columns), dtype=dtype)
+        self.labels = np.empty(size, dtype=np.int64)
+        self.size = size
+        self.seen = 0
+        self.rng = rng
+
+    def add(self, X, y):
+        n = len(X)
+        fill = min(max(self.size - self.seen, 0), n)
+        self.rows[self.seen:self.seen + fill] = X[:fill]
+        self.labels[self.seen:self.seen + fill] = y[:fill]
+        if fill < n:
+            # Row i (global index) replaces a random slot with probability size / (i + 1)
+            index = self.seen + np.arange(fill, n)
+            slot = (self.rng.random(n - fill) * (index + 1)).astype(np.int64)
+            keep = slot < self.size
+            self.rows[slot[keep]] = X[fill:][keep]
+            self.labels[slot[keep]] = y[fill:][keep]
+        self.seen += n
+
+    def sample(self):
+        n = min(self.seen, self.size)
+        return self.rows[:n], self.labels[:n]
+
+def csv_chunks(paths, chunksize=DEFAULT_CHUNK_SIZE):
+    """Chunk source over logged CSV snapshots (re-readable for every pass)"""
+    paths = [paths] if isinstance(paths, str) else list(paths)
+
+    def chunks():
+        for path in paths:
+            yield from pd.read_csv(path, chunksize=chunksize)
+    return chunks
+
+def _holdout_mask(n, chunk_index, fraction, seed):
+    """Same holdout rows for a chunk in every pass"""
+    return np.random.default_rng([seed, chunk_index]).random(n) < fraction
+
+def train_streaming(predictor, chunk_source, epochs=3, n_bins=DEFAULT_BINS, holdout_fraction=0.1,
+                    max_holdout=MAX_HOLDOUT_ROWS, sample_rows=SAMPLE_ROWS, alpha=1e-5, seed=42):
+    """Fit predictor's scaler and a binned SGD model from a re-iterable chunk source"""
+    from sklearn.metrics import accuracy_score
+
+    pipeline = predictor.feature_pipeline
+    predictor.label_encoder.fit(pipeline.category_vocab)
+    predictor.feature_names = pipeline.feature_names
+    n_features = len(pipeline.feature_names)
+    rng = np.random.default_rng(seed)
+    scaler = predictor.scaler = StandardScaler()
+    sample = Reservoir(sample_rows, n_features, rng)
+    holdout = Reservoir(max_holdout, n_features, rng)
+
+    # Stats pass: running scaler statistics and bounded samples
+    started = time.perf_counter()
+    rows = chunks_seen = 0
+    positives = 0
+    for chunk_index, df in enumerate(chunk_source()):
+        X, y = predictor.prepare_features(df)
+        held = _holdout_mask(len(X), chunk_index, holdout_fraction, seed)
+        holdout.add(X[held], y[held])
+        X, y = X[~held], y[~held]
+        scaler.partial_fit(X)
+        sample.add(X, y)
+        rows += len(X)
+        positives += int(y.sum())
+        chunks_seen += 1
+    if not rows:
+        raise ValueError("No training data in chunk source")
+    print(f"Stats pass: {rows} training rows in {chunks_seen} chunks "
+          f"({positives / rows:.1%} congested) [{time.perf_counter() - started:.1f}s]")
+
+    binner = QuantileBinner(n_bins).fit(scaler.transform(sample.sample()[0]))
+    classifier = SGDClassifier(loss='log_loss', alpha=alpha, random_state=seed)
+
+    # Training epochs: one chunk in memory at a time, shuffled within the chunk
+    for epoch in range(epochs):
+        started = time.perf_counter()
+        for chunk_index, df in enumerate(chunk_source()):
+            X, y = predictor.prepare_features(df)
+            train = ~_holdout_mask(len(X), chunk_index, holdout_fraction, seed)
+            order = rng.permutation(np.flatnonzero(train))
+            classifier.partial_fit(binner.transform(scaler.transform(X[order])), y[order], classes=CLASSES)
+        print(f"Epoch {epoch + 1}/{epochs} [{time.perf_counter() - started:.1f}s]")
+
+    model = Pipeline([('bins', binner), ('sgd', classifier)])
+    X_holdout, y_holdout = holdout.sample()
+    X_holdout = scaler.transform(X_holdout)
+    accuracy = float(accuracy_score(y_holdout, model.predict(X_holdout))) if len(y_holdout) else None
+    if accuracy is not None:
+        print(f"Holdout accuracy: {accuracy:.4f} ({len(y_holdout)} rows)")
+
+    predictor.model = model
+    predictor.is_trained = True
+    predictor.selection_report = {}
+    compiled = predictor.compile_model(X_holdout if len(y_holdout) else None)
+    predictor.metadata = {
+        'model_name': 'Streaming SGD (binned)',
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'training_samples': rows,
+        'test_accuracy': accuracy,
+        'streaming': {
+            'chunks': chunks_seen,
+            'epochs': epochs,
+            'n_bins': n_bins,
+            'holdout_rows': int(len(y_holdout)),
+            'sample_rows': int(len(sample.sample()[1])),
+            'alpha': alpha
+        },
+        'compiled': compiled
+    }
+    return model, accuracy
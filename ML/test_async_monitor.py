@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test the asyncio fixed-rate monitoring loop
+"""
+
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_backend_integration import MLBackendIntegration
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+def _integration(fetch_delay):
+    integration = MLBackendIntegration()
+    assert integration.load_trained_model(MODEL_PATH)
+    trains = integration._generate_sample_trains(40)
+
+    def slow_fetch():
+        time.sleep(fetch_delay)
+        return trains
+
+    integration.fetch_live_trains = slow_fetch
+    integration._log_results = lambda results: None
+    return integration
+
+def test_fetch_overlaps_scoring():
+    """Ticks keep the fixed cadence instead of interval + fetch + score"""
+    integration = _integration(fetch_delay=0.1)
+    interval, ticks = 0.2, 5
+
+    started = time.perf_counter()
+    asyncio.run(integration.monitor_async(interval=interval, max_ticks=ticks))
+    elapsed = time.perf_counter() - started
+
+    # A sleep-after-work loop would need at least ticks * (interval + fetch)
+    assert elapsed < ticks * interval + 0.3, elapsed
+    stats = integration.monitoring_stats()
+    assert stats['ticks'] + stats['dropped_ticks'] == ticks
+    assert stats['missed_ticks'] == 0
+    for stage in ('fetch', 'convert', 'predict', 'optimize', 'build', 'total'):
+        assert stage in stats['stages']
+
+def test_slow_backend_skips_slots():
+    """A fetch slower than the interval skips slots rather than drifting"""
+    integration = _integration(fetch_delay=0.25)
+    asyncio.run(integration.monitor_async(interval=0.1, max_ticks=3))
+
+    stats = integration.monitoring_stats()
+    assert stats['missed_ticks'] >= 2
+    assert stats['max_drift_s'] < 0.1
+
+if __name__ == "__main__":
+    test_fetch_overlaps_scoring()
+    test_slow_backend_skips_slots()
+    print("✅ Async monitor tests passed")
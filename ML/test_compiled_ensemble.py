@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test the compiled tree-ensemble inference backend
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sklearn.ensemble import (RandomForestClassifier, GradientBoostingClassifier,
+                              HistGradientBoostingClassifier)
+from train_congestion_predictor import TrainCongestionPredictor
+from compiled_ensemble import CompiledEnsemble, compiled_path, model_fingerprint
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+def _holdout_data():
+    predictor = TrainCongestionPredictor()
+    X, y = predictor.prepare_features(predictor.fetch_simulated_data(1500, seed=11), fit=True)
+    X = predictor.scaler.fit_transform(X)
+    return X[:1000], y[:1000], X[1000:]
+
+def test_compiled_matches_sklearn():
+    """Forest and boosting ensembles give identical holdout probabilities"""
+    X_train, y_train, X_holdout = _holdout_data()
+    models = [
+        RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0),
+        GradientBoostingClassifier(n_estimators=20, random_state=0),
+        HistGradientBoostingClassifier(max_iter=20, random_state=0)
+    ]
+    for model in models:
+        model.fit(X_train, y_train)
+        compiled = CompiledEnsemble.from_sklearn(model)
+        result = compiled.validate(model, X_holdout)
+        assert result['identical'], (type(model).__name__, result)
+        assert np.array_equal(compiled.predict(X_holdout), model.predict(X_holdout))
+
+def test_missing_values_follow_sklearn():
+    """NaN features take the same branch as in scikit-learn"""
+    X_train, y_train, X_holdout = _holdout_data()
+    X_train = X_train.copy()
+    X_train[::5, 3] = np.nan
+    X_holdout = X_holdout.copy()
+    X_holdout[::3, 3] = np.nan
+
+    model = HistGradientBoostingClassifier(max_iter=20, random_state=0).fit(X_train, y_train)
+    assert CompiledEnsemble.from_sklearn(model).validate(model, X_holdout)['identical']
+
+def test_predictor_export_roundtrip():
+    """The compiled ensemble is exported next to the pickle and reloaded"""
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    df = predictor.fetch_simulated_data(300, seed=5)
+    X, _ = predictor.prepare_features(df)
+    expected = predictor.model.predict_proba(predictor.scaler.transform(X))[:, 1]
+
+    assert predictor.compiled is not None
+    predictions, probabilities = predictor.predict_congestion(df)
+    assert np.array_equal(probabilities, expected)
+    assert np.array_equal(predictions, (expected > 0.5).astype(int))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pkl')
+        predictor.save_model(path)
+        assert os.path.exists(compiled_path(path))
+
+        reloaded = TrainCongestionPredictor().load_model(path)
+        assert reloaded.compiled.n_nodes == predictor.compiled.n_nodes
+        assert np.array_equal(reloaded.predict_congestion(df)[1], expected)
+
+        baseline = TrainCongestionPredictor().load_model(path, backend='sklearn')
+        assert baseline.compiled is None
+        assert np.array_equal(baseline.predict_congestion(df)[1], expected)
+
+def test_stale_export_is_not_used():
+    """A pickle saved without a compiled form never picks up another model's ensemble"""
+    forest = TrainCongestionPredictor().load_model(MODEL_PATH)
+    assert forest.compiled.matches(forest.model)
+    assert forest.compiled.fingerprint() == model_fingerprint(forest.model)
+
+    streaming = TrainCongestionPredictor()
+    streaming.train_streaming(num_samples=20000, chunk_size=5000, epochs=1)
+    assert streaming.compiled is None
+    df = streaming.fetch_simulated_data(300, seed=6)
+    X, _ = streaming.prepare_features(df)
+    expected = streaming.model.predict_proba(streaming.scaler.transform(X))[:, 1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pkl')
+        forest.save_model(path)
+        shutil.copy(compiled_path(path), os.path.join(tmp, 'forest.npz'))
+        streaming.save_model(path)
+        assert not os.path.exists(compiled_path(path))
+        assert np.allclose(TrainCongestionPredictor().load_model(path).predict_features(X)[1], expected)
+
+        # An export left behind by an older save is rejected by its fingerprint
+        shutil.copy(os.path.join(tmp, 'forest.npz'), compiled_path(path))
+        reloaded = TrainCongestionPredictor().load_model(path)
+        assert reloaded.compiled is None
+        assert np.allclose(reloaded.predict_features(X)[1], expected)
+
+if __name__ == "__main__":
+    test_compiled_matches_sklearn()
+    test_missing_values_follow_sklearn()
+    test_predictor_export_roundtrip()
+    test_stale_export_is_not_used()
+    print("✅ Compiled ensemble tests passed")
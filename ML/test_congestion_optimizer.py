@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized optimization rule engine
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_congestion_predictor import TrainCongestionPredictor, CongestionOptimizer
+
+def _trains():
+    return pd.DataFrame([
+        # slow + red signal + peak hour: high beats medium
+        {'id': 'A', 'speed': 20, 'occupancy': 1, 'signal_status': 0, 'delay': 5, 'hour_of_day': 8},
+        # slow + busy section + late: reroute has the largest improvement
+        {'id': 'B', 'speed': 20, 'occupancy': 4, 'signal_status': 2, 'delay': 30, 'hour_of_day': 12},
+        # nothing matches: keep monitoring
+        {'id': 'C', 'speed': 80, 'occupancy': 0, 'signal_status': 2, 'delay': 0, 'hour_of_day': 12},
+        # not congested: no suggestion
+        {'id': 'D', 'speed': 10, 'occupancy': 5, 'signal_status': 0, 'delay': 50, 'hour_of_day': 8},
+        # red signal at peak hour: both medium, schedule adjustment improves more
+        {'id': 'E', 'speed': 60, 'occupancy': 0, 'signal_status': 0, 'delay': 0, 'hour_of_day': 18}
+    ])
+
+def test_numeric_priority_ranking():
+    """Rules are ranked by numeric priority, then expected improvement"""
+    optimizer = CongestionOptimizer(TrainCongestionPredictor())
+    suggestions = optimizer.suggest_actions(_trains(), np.array([1, 1, 1, 0, 1]))
+    by_id = {s['train_id']: s for s in suggestions}
+
+    assert set(by_id) == {'A', 'B', 'C', 'E'}
+    assert by_id['A']['action'] == 'increase_speed'
+    assert by_id['B']['action'] == 'reroute'
+    assert by_id['C']['action'] == 'monitor'
+    assert by_id['E']['action'] == 'schedule_adjustment'
+
+    # Batch output is ordered most urgent first
+    assert [s['train_id'] for s in suggestions] == ['B', 'A', 'E', 'C']
+
+def test_arrays_and_limit():
+    """Columnar output matches the records and limit trims the record list"""
+    optimizer = CongestionOptimizer(TrainCongestionPredictor())
+    arrays = optimizer.suggest_actions_arrays(_trains(), [1, 1, 1, 0, 1])
+
+    assert arrays['index'].tolist() == [1, 0, 4, 2]
+    assert arrays['priority'].tolist() == [3, 3, 2, 1]
+    assert len(optimizer.suggest_actions(_trains(), [1, 1, 1, 0, 1], limit=2)) == 2
+
+def test_short_predictions():
+    """Trains beyond the prediction array are treated as not congested"""
+    optimizer = CongestionOptimizer(TrainCongestionPredictor())
+    suggestions = optimizer.suggest_actions(_trains(), [1])
+
+    assert [s['train_id'] for s in suggestions] == ['A']
+
+if __name__ == "__main__":
+    test_numeric_priority_ranking()
+    test_arrays_and_limit()
+    test_short_predictions()
+    print("✅ Congestion optimizer tests passed")
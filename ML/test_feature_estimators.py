@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Test the batch feature estimators
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from feature_estimators import (estimate_signal_status, estimate_distance_to_next,
+                                estimate_distance_to_destination, STOPPED_DISTANCE_TO_NEXT,
+                                MEAN_DISTANCE_TO_NEXT, MEAN_DISTANCE_TO_DESTINATION)
+
+def test_signal_status_thresholds():
+    """Matches the per-train rules: red, then yellow, then green"""
+    speed = np.array([5, 50, 20, 50, 50, 80])
+    delay = np.array([0, 25, 0, 15, 5, 0])
+    assert estimate_signal_status(speed, delay).tolist() == [0, 0, 1, 1, 2, 2]
+
+def test_stopped_trains_get_fixed_distance():
+    rng = np.random.default_rng(0)
+    distance = estimate_distance_to_next(np.array([0.0, 40.0, 0.0]), rng)
+    assert distance[0] == distance[2] == STOPPED_DISTANCE_TO_NEXT
+    assert distance[1] > 0
+
+def test_expected_distances_without_rng():
+    """Without an rng the estimates are expected values, identical on every call"""
+    distance = estimate_distance_to_next(np.array([0.0, 40.0]))
+    assert distance.tolist() == [STOPPED_DISTANCE_TO_NEXT, MEAN_DISTANCE_TO_NEXT]
+    assert (estimate_distance_to_destination(3) == MEAN_DISTANCE_TO_DESTINATION).all()
+
+if __name__ == "__main__":
+    test_signal_status_thresholds()
+    test_stopped_trains_get_fixed_distance()
+    test_expected_distances_without_rng()
+    print("✅ Feature estimator tests passed")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test the fitted feature pipeline
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from feature_pipeline import FeaturePipeline, FEATURE_NAMES, UNKNOWN_CODE
+from train_congestion_predictor import TrainCongestionPredictor
+
+def test_encoding_is_batch_independent():
+    """A train is encoded the same way alone or inside a larger batch"""
+    df = TrainCongestionPredictor().fetch_simulated_data(500)
+    pipeline = FeaturePipeline().fit(df)
+
+    full = pipeline.transform(df)
+    single = pipeline.transform(df.iloc[[3]])
+
+    assert full.dtype == np.float32
+    assert full.shape == (500, len(FEATURE_NAMES))
+    assert np.array_equal(full[3], single[0])
+
+def test_unknown_bucket_and_defaults():
+    """Unseen categories map to the unknown bucket; station_type defaults to major"""
+    pipeline = FeaturePipeline()
+    batch = pd.DataFrame([{
+        'category': 'hyperloop', 'speed': 50.0, 'occupancy': 1, 'signal_status': 2,
+        'delay': 4.0, 'time_to_clear': 98.0, 'distance_to_next': 5000.0,
+        'distance_to_destination': 25000.0, 'hour_of_day': 8, 'day_of_week': 6
+    }])
+
+    row = pipeline.transform(batch)[0]
+    assert row[9] == UNKNOWN_CODE
+    assert row[10] == pipeline.station_type_vocab.index('major')
+    assert row[11] == np.float32(25.0)  # speed / (occupancy + 1)
+    assert row[13] == 1 and row[14] == 1  # peak hour, weekend
+
+def test_round_trip():
+    """Pipeline config survives to_dict/from_dict"""
+    pipeline = FeaturePipeline(category_vocab=['express', 'freight'])
+    restored = FeaturePipeline.from_dict(pipeline.to_dict())
+
+    assert restored.category_vocab == ['express', 'freight']
+    assert restored.feature_names == FEATURE_NAMES
+
+if __name__ == "__main__":
+    test_encoding_is_batch_independent()
+    test_unknown_bucket_and_defaults()
+    test_round_trip()
+    print("✅ Feature pipeline tests passed")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test the declarative input schema and snapshot memo of the server integration
+"""
+
+import sys
+import os
+from datetime import datetime
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_congestion_predictor import TrainCongestionPredictor, CongestionOptimizer
+from ml_server_integration import (prepare_train_frame, run_prediction, SnapshotMemo,
+                                   INPUT_COLUMNS, DERIVED_COLUMNS)
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+NOW = datetime(2024, 3, 4, 8, 30)
+
+TRAINS = [
+    {'id': 'T1', 'speed': 60, 'delay': 2, 'lat': 22.583, 'lon': 88.342, 'category': 'express'},
+    {'id': 'T2', 'speed': 5, 'delay': 25, 'lat': 22.584, 'lon': 88.343, 'category': 'freight'},
+    {'id': 'T3', 'speed': None, 'category': 'vande', 'occupancy': 4},
+]
+
+def test_schema_fills_columns_with_fixed_dtypes():
+    """Every schema column is present with its declared dtype; supplied values win"""
+    df = prepare_train_frame(TRAINS, now=NOW)
+    for name, (dtype, _) in {**INPUT_COLUMNS, **DERIVED_COLUMNS}.items():
+        assert name in df.columns
+        if dtype is not object:
+            assert df[name].dtype == dtype, name
+
+    assert df['speed'].tolist() == [60, 5, 0]
+    assert df['station'].tolist() == ['HWH', 'HWH', 'HWH']
+    assert df['occupancy'].tolist() == [2, 2, 4]
+    assert df['signal_status'].tolist() == [2, 0, 0]
+    assert (df['hour_of_day'] == 8).all() and (df['day_of_week'] == 0).all()
+
+def test_deterministic_mode_is_repeatable():
+    """Identical snapshots give identical frames; random mode still draws"""
+    first = prepare_train_frame(TRAINS, now=NOW)
+    second = prepare_train_frame(TRAINS, now=NOW)
+    assert first.equals(second)
+
+    drawn = prepare_train_frame(TRAINS, mode='random', now=NOW, rng=np.random.default_rng(0))
+    assert not np.array_equal(drawn['distance_to_destination'], first['distance_to_destination'])
+
+def test_memo_serves_identical_snapshots():
+    """The second identical request is answered from the memo"""
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    optimizer = CongestionOptimizer(predictor)
+    memo = SnapshotMemo(maxsize=2)
+
+    first = run_prediction(predictor, optimizer, TRAINS, memo=memo)
+    second = run_prediction(predictor, optimizer, TRAINS, memo=memo)
+    assert second['congestion_probabilities'] == first['congestion_probabilities']
+    assert memo.stats()['hits'] == 1
+
+    moved = [dict(TRAINS[0], speed=20)] + TRAINS[1:]
+    run_prediction(predictor, optimizer, moved, memo=memo)
+    run_prediction(predictor, optimizer, moved, encoding='binary', memo=memo)
+    assert memo.stats()['misses'] == 3 and len(memo) == 2
+
+if __name__ == "__main__":
+    test_schema_fills_columns_with_fixed_dtypes()
+    test_deterministic_mode_is_repeatable()
+    test_memo_serves_identical_snapshots()
+    print("✅ Input schema tests passed")
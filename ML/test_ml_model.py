@@ -144,6 +144,37 @@ def test_model_performance():
     print(f"True Negatives: {tn}")
     print(f"False Negatives: {fn}")
 
+def test_parallel_cv_matches_serial():
+    """Fanning folds out across processes gives the same CV report as running them in order"""
+    predictor = TrainCongestionPredictor()
+    X, y = predictor.prepare_features(predictor.fetch_simulated_data(2000, seed=2), fit=True)
+    models = {name: model for name, model in predictor._candidate_models().items()
+              if name in ('Random Forest', 'Shallow Forest')}
+    assert len(models) == 2
+    serial, _ = predictor.select_model(models, X, y, cv=3, n_jobs=1)
+    parallel, wall_time = predictor.select_model(models, X, y, cv=3, n_jobs=2)
+    
+    assert wall_time > 0
+    for name in models:
+        assert parallel[name]['cv_scores'] == serial[name]['cv_scores']
+        assert parallel[name]['cv_mean'] == np.mean(serial[name]['cv_scores'])
+        assert parallel[name]['fit_time_s'] > 0 and parallel[name]['wall_time_s'] > 0
+
+def test_model_selection_profiles_after_cv():
+    """Parallel CV scores every candidate; serving cost is profiled once per candidate"""
+    predictor = TrainCongestionPredictor()
+    X, y = predictor.prepare_features(predictor.fetch_simulated_data(2000, seed=1), fit=True)
+    models = {name: model for name, model in predictor._candidate_models().items()
+              if name in ('Hist Gradient Boosting', 'Shallow Forest')}
+    assert len(models) == 2
+    report, _ = predictor.select_model(models, X, y, cv=3, n_jobs=2)
+    
+    for name in models:
+        assert len(report[name]['cv_scores']) == 3
+        assert report[name]['latency_ms'] > 0 and report[name]['load_ms'] > 0
+
 if __name__ == "__main__":
     test_model_without_backend()
     test_model_performance()
+    test_parallel_cv_matches_serial()
+    test_model_selection_profiles_after_cv()
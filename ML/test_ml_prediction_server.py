@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test the persistent prediction server line protocol
+"""
+
+import sys
+import os
+import io
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_prediction_server import PredictionServer
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+SAMPLE_TRAINS = [
+    {'id': 'T10001', 'name': 'Express 1', 'category': 'express', 'speed': 12, 'delay': 25,
+     'lat': 22.583, 'lon': 88.342},
+    {'id': 'T10002', 'name': 'Vande 1', 'category': 'vande', 'speed': 95, 'delay': 0,
+     'lat': 22.664, 'lon': 88.171}
+]
+
+def _run_frames(frames):
+    out = io.StringIO()
+    server = PredictionServer(MODEL_PATH, out=out)
+    server.load()
+    server.serve(io.StringIO(''.join(json.dumps(f) + '\n' for f in frames)))
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    return server, {r['id']: r for r in responses}
+
+def test_health_probe():
+    """Health frames report readiness once the model is warm"""
+    _, responses = _run_frames([{'id': 'h1', 'type': 'health'}])
+
+    health = responses['h1']['result']
+    assert responses['h1']['ok']
+    assert health['status'] == 'ready'
+    assert health['model_loaded']
+    assert health['prediction_cache']['cached_trains'] == 0  # reported while still empty
+
+def test_multiplexed_predictions():
+    """Several predict frames in flight are answered by id"""
+    server, responses = _run_frames([
+        {'id': 1, 'type': 'predict', 'trains': SAMPLE_TRAINS},
+        {'id': 2, 'type': 'predict', 'trains': SAMPLE_TRAINS[:1]},
+        {'id': 3, 'type': 'predict', 'trains': []}
+    ])
+
+    assert responses[1]['ok'] and responses[1]['result']['total_trains'] == 2
+    assert responses[2]['ok'] and responses[2]['result']['total_trains'] == 1
+    assert not responses[3]['ok']
+    assert server.requests_served == 2
+    assert server.errors == 1
+    assert server.in_flight == 0
+
+def test_invalid_frames():
+    """Malformed or unknown frames get an error response instead of killing the server"""
+    out = io.StringIO()
+    server = PredictionServer(MODEL_PATH, out=out)
+    server.load()
+    server.serve(io.StringIO('not json\n42\n[1]\n{"id": 7, "type": "reload"}\n{"id": 8, "type": "health"}\n'))
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['ok'] for r in responses] == [False, False, False, False, True]
+    assert [r['error'] for r in responses[:3]] == ['Invalid frame'] * 3
+    assert responses[3]['id'] == 7
+
+if __name__ == "__main__":
+    test_health_probe()
+    test_multiplexed_predictions()
+    test_invalid_frames()
+    print("✅ Prediction server tests passed")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test the shared result payload builder
+"""
+
+import sys
+import os
+import json
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_results import build_results, select_high_risk, decode_array
+
+TRAINS = [{'id': f'T{i}', 'name': f'Train {i}', 'speed': 10 * i, 'lat': 22.5, 'lon': 88.3}
+          for i in range(6)]
+PREDICTIONS = np.array([1, 1, 0, 1, 1, 0])
+PROBABILITIES = np.array([0.75, 0.99, 0.95, 0.2, 0.85, 0.1])
+
+def test_high_risk_selection():
+    """High-risk rows are congested, above threshold and ordered by probability"""
+    assert select_high_risk(PREDICTIONS, PROBABILITIES).tolist() == [1, 4, 0]
+    assert select_high_risk(PREDICTIONS, PROBABILITIES, top_k=2).tolist() == [1, 4]
+
+def test_json_payload():
+    """Default encoding keeps the JSON lists and record format"""
+    results = build_results(TRAINS, PREDICTIONS, PROBABILITIES, [], top_k=2)
+    json.dumps(results)
+
+    assert results['congestion_predictions'] == PREDICTIONS.tolist()
+    assert results['congested_trains'] == 4
+    assert results['high_risk_count'] == 3
+    assert [t['train_id'] for t in results['high_risk_trains']] == ['T1', 'T4']
+    assert results['summary']['top_action'] == 'monitor'
+
+def test_binary_payload():
+    """Binary encoding round-trips labels and float32 probabilities"""
+    results = build_results(TRAINS, PREDICTIONS, PROBABILITIES, [], encoding='binary')
+
+    assert 'congestion_probabilities' not in results
+    assert decode_array(results['congestion_predictions_b64'], np.uint8).tolist() == PREDICTIONS.tolist()
+    assert np.allclose(decode_array(results['congestion_probabilities_b64'], np.float32), PROBABILITIES)
+
+    # Payload is much smaller than JSON lists for a realistic batch
+    rng = np.random.default_rng(0)
+    probabilities = rng.random(500)
+    predictions = (probabilities > 0.5).astype(int)
+    trains = [{'id': f'T{i}'} for i in range(500)]
+    binary = json.dumps(build_results(trains, predictions, probabilities, [], encoding='binary', top_k=10))
+    plain = json.dumps(build_results(trains, predictions, probabilities, [], top_k=10))
+    assert len(binary) < len(plain) / 2
+
+if __name__ == "__main__":
+    test_high_risk_selection()
+    test_json_payload()
+    test_binary_payload()
+    print("✅ Result builder tests passed")
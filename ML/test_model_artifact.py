@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the memory-mapped model artifact format
+"""
+
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_congestion_predictor import TrainCongestionPredictor
+from model_artifact import resolve_model_path, METADATA_FILE
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+def test_artifact_matches_pickle():
+    """An artifact exported from the pickle predicts identically"""
+    legacy = TrainCongestionPredictor().load_model(MODEL_PATH)
+    small = legacy.fetch_simulated_data(100, seed=8)
+    large = legacy.fetch_simulated_data(2000, seed=9)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model')
+        legacy.save_model(path)
+        predictor = TrainCongestionPredictor().load_model(path)
+
+        assert isinstance(predictor.scaler.mean_, np.memmap)
+        assert isinstance(predictor.compiled.value, np.memmap)
+        assert predictor.feature_pipeline.to_dict() == legacy.feature_pipeline.to_dict()
+
+        # Small batches use the compiled arrays; the estimator stays unloaded
+        for a, b in zip(predictor.predict_congestion(small), legacy.predict_congestion(small)):
+            assert np.array_equal(a, b)
+        assert predictor._model is None
+
+        # Large batches load the estimator on demand
+        for a, b in zip(predictor.predict_congestion(large), legacy.predict_congestion(large)):
+            assert np.array_equal(a, b)
+        assert predictor._model is not None
+
+def test_resolve_prefers_exported_artifact():
+    """A pickle path resolves to its sibling artifact directory once exported"""
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, 'model.pkl')
+        assert resolve_model_path(pickle_path) == pickle_path
+        predictor.save_model(os.path.join(tmp, 'model'))
+        assert resolve_model_path(pickle_path) == os.path.join(tmp, 'model')
+
+def test_stale_artifact_is_not_preferred():
+    """A pickle saved after the artifact directory wins over the stale export"""
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, 'model.pkl')
+        artifact_metadata = os.path.join(tmp, 'model', METADATA_FILE)
+        predictor.save_model(os.path.join(tmp, 'model'))
+        predictor.save_model(pickle_path)
+        os.utime(artifact_metadata, (1000, 1000))
+        assert resolve_model_path(pickle_path) == pickle_path
+
+        # Re-exporting makes the artifact current again
+        predictor.save_model(os.path.join(tmp, 'model'))
+        os.utime(pickle_path, (1000, 1000))
+        assert resolve_model_path(pickle_path) == os.path.join(tmp, 'model')
+
+def test_newer_format_is_rejected():
+    """Artifacts from a newer format version fail loudly"""
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model')
+        predictor.save_model(path)
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            metadata = json.load(f)
+        metadata['format_version'] = 99
+        with open(os.path.join(path, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f)
+
+        try:
+            TrainCongestionPredictor().load_model(path)
+            assert False, "Expected ValueError"
+        except ValueError:
+            pass
+
+if __name__ == "__main__":
+    test_artifact_matches_pickle()
+    test_resolve_prefers_exported_artifact()
+    test_stale_artifact_is_not_preferred()
+    test_newer_format_is_rejected()
+    print("✅ Model artifact tests passed")
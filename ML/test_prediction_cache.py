@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test the incremental per-train prediction cache
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_congestion_predictor import TrainCongestionPredictor
+from prediction_cache import PredictionCache
+from ml_backend_integration import MLBackendIntegration
+from ml_server_integration import run_prediction
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+class CountingPredictor:
+    """Wraps the real predictor and counts how many rows get scored"""
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+        self.scored = 0
+
+    def prepare_features(self, df):
+        return self.predictor.prepare_features(df)
+
+    def predict_features(self, X):
+        self.scored += len(X)
+        return self.predictor.predict_features(X)
+
+def _setup():
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    counting = CountingPredictor(predictor)
+    df = predictor.fetch_simulated_data(200, seed=3)
+    return predictor, counting, PredictionCache(counting), df
+
+def test_steady_trains_are_not_rescored():
+    """Unchanged trains come from the cache with identical results"""
+    predictor, counting, cache, df = _setup()
+
+    first = cache.predict_congestion(df)
+    second = cache.predict_congestion(df)
+    direct = predictor.predict_congestion(df)
+
+    assert counting.scored == 200
+    assert np.array_equal(second[1], direct[1])
+    assert np.array_equal(first[0], second[0])
+    assert cache.stats()['hits'] == 200
+
+def test_moved_trains_are_rescored():
+    """Only trains that moved beyond the tolerance are re-scored"""
+    _, counting, cache, df = _setup()
+    cache.predict_congestion(df)
+
+    moved = df.copy()
+    moved.loc[:9, 'speed'] += 10.0     # beyond the 2 km/h tolerance
+    moved.loc[10:19, 'speed'] += 0.5   # within tolerance
+    counting.scored = 0
+    cache.predict_congestion(moved)
+
+    assert counting.scored == 10
+
+def test_missing_features_are_rescored():
+    """A feature switching between NaN and a value counts as a change"""
+    predictor, counting, cache, df = _setup()
+    X, _ = predictor.prepare_features(df)
+    ids = cache.train_ids(df)
+    distance = cache.feature_names.index('distance_to_next')
+    cache.predict_features(ids, X)
+
+    missing = X.copy()
+    missing[:5, distance] = np.nan
+    counting.scored = 0
+    cache.predict_features(ids, missing)
+    assert counting.scored == 5
+
+    # Still missing: served from the cache; position back: re-scored
+    cache.predict_features(ids, missing)
+    assert counting.scored == 5
+    cache.predict_features(ids, X)
+    assert counting.scored == 10
+
+def test_departed_trains_are_evicted():
+    """Trains missing from a batch leave the cache"""
+    _, counting, cache, df = _setup()
+    cache.predict_congestion(df)
+    cache.predict_congestion(df.iloc[:150])
+
+    assert len(cache) == 150
+    assert cache.stats()['evictions'] == 50
+
+    counting.scored = 0
+    cache.predict_congestion(df)
+    assert counting.scored == 50
+
+def test_hits_grow_across_integration_ticks():
+    """Repeated ticks of steady trains are served from the cache on both prediction paths"""
+    integration = MLBackendIntegration(seed=0)
+    assert integration.load_trained_model(MODEL_PATH)
+    trains = integration._generate_sample_trains(30)
+    for i, train in enumerate(trains):
+        train['id'] = f'S{i}'
+
+    hits = []
+    for _ in range(3):
+        integration.analyze_trains(trains)
+        hits.append(integration.prediction_cache.stats()['hits'])
+    assert hits == [0, 30, 60]
+
+    cache = PredictionCache(integration.predictor)
+    hits = []
+    for _ in range(3):
+        run_prediction(integration.predictor, integration.optimizer, trains, cache=cache)
+        hits.append(cache.stats()['hits'])
+    assert hits == [0, 30, 60]
+
+if __name__ == "__main__":
+    test_steady_trains_are_not_rescored()
+    test_moved_trains_are_rescored()
+    test_missing_features_are_rescored()
+    test_departed_trains_are_evicted()
+    test_hits_grow_across_integration_ticks()
+    print("✅ Prediction cache tests passed")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test the coalescing prediction service
+"""
+
+import sys
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prediction_service import PredictionService, ServiceOverloaded
+from ml_backend_integration import MLBackendIntegration
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+class GatedScorer:
+    """Scoring function that waits for the test to release it"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def __call__(self, snapshot):
+        self.calls.append(snapshot)
+        self.started.set()
+        self.gate.wait(5)
+        if snapshot == 'bad':
+            raise ValueError('bad snapshot')
+        return {'snapshot': snapshot}
+
+def test_identical_snapshots_share_one_pass():
+    """Requests for a snapshot already in flight get the same result"""
+    scorer = GatedScorer()
+    service = PredictionService(scorer)
+    futures = [service.submit('k1', 'a') for _ in range(3)]
+    scorer.gate.set()
+    results = [f.result(5) for f in futures]
+    assert scorer.calls == ['a']
+    assert all(r is results[0] for r in results)
+
+    # Once answered, the same snapshot is scored again
+    assert service.predict('k1', 'a', timeout=5) == {'snapshot': 'a'}
+    assert len(scorer.calls) == 2
+    stats = service.stats()
+    assert stats['coalesced'] == 2 and stats['completed'] == 2 and stats['in_flight'] == 0
+    service.close()
+
+def test_backpressure_when_scoring_falls_behind():
+    """Distinct snapshots beyond max_pending are rejected instead of queued"""
+    scorer = GatedScorer()
+    service = PredictionService(scorer, max_pending=1)
+    running = service.submit('k1', 'a')
+    assert scorer.started.wait(5)      # 'a' is being scored
+    queued = service.submit('k2', 'b')  # fills the queue
+    try:
+        service.submit('k3', 'c')
+        assert False, 'expected ServiceOverloaded'
+    except ServiceOverloaded:
+        pass
+    assert service.submit('k2', 'b') is queued  # coalescing still works when full
+
+    scorer.gate.set()
+    assert running.result(5)['snapshot'] == 'a' and queued.result(5)['snapshot'] == 'b'
+    assert service.stats()['rejected'] == 1
+    service.close()
+
+def test_errors_reach_every_waiter():
+    """A failed pass fails all coalesced requests and doesn't stick to the key"""
+    scorer = GatedScorer()
+    service = PredictionService(scorer)
+    futures = [service.submit('k', 'bad') for _ in range(2)]
+    scorer.gate.set()
+    assert all(isinstance(f.exception(5), ValueError) for f in futures)
+    assert service.stats()['failed'] == 1 and service.stats()['in_flight'] == 0
+    service.close()
+
+def test_concurrent_integration_calls():
+    """Concurrent callers of the integration are serialised through the service"""
+    integration = MLBackendIntegration(use_prediction_cache=False, seed=0)
+    assert integration.load_trained_model(MODEL_PATH)
+    snapshots = [integration._generate_sample_trains(20 + k % 3) for k in range(6)]
+
+    with ThreadPoolExecutor(6) as pool:
+        results = list(pool.map(lambda trains: integration.analyze(trains, block=30), snapshots))
+    assert [r['total_trains'] for r in results] == [len(t) for t in snapshots]
+    stats = integration.service.stats()
+    assert stats['completed'] + stats['coalesced'] == 6 and stats['failed'] == 0
+    integration.close()
+    assert not any(t.is_alive() for t in integration.service._threads)
+
+def test_coalesced_callers_get_timings():
+    """Every caller sharing a scoring pass gets that pass's stage timings"""
+    integration = MLBackendIntegration(use_prediction_cache=False, seed=0)
+    assert integration.load_trained_model(MODEL_PATH)
+    trains = integration._generate_sample_trains(20)
+    scored = threading.Event()
+    analyze_trains = integration.service.score_fn
+
+    def slow_analyze(*args, **kwargs):
+        scored.wait(5)
+        return analyze_trains(*args, **kwargs)
+    integration.service.score_fn = slow_analyze
+
+    timings = [{'fetch': 0.1} for _ in range(3)]
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(integration.analyze, trains, t) for t in timings]
+        while integration.service.stats()['coalesced'] < 2:
+            time.sleep(0.01)
+        scored.set()
+        results = [f.result(10) for f in futures]
+    assert all(r is results[0] for r in results)
+    for t in timings:
+        assert t['fetch'] == 0.1 and t['predict'] > 0 and 'convert' in t
+    integration.close()
+
+if __name__ == "__main__":
+    test_identical_snapshots_share_one_pass()
+    test_backpressure_when_scoring_falls_behind()
+    test_errors_reach_every_waiter()
+    test_concurrent_integration_calls()
+    test_coalesced_callers_get_timings()
+    print("✅ Prediction service tests passed")
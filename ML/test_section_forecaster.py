@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the LSTM section congestion forecaster
+"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from section_forecaster import (SectionForecaster, SectionWindowBuffer, SECTION_FEATURES,
+                                simulate_section_series, make_training_windows, section_features)
+from ml_backend_integration import MLBackendIntegration
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+def test_ring_buffer_matches_rebuilt_windows():
+    """The doubled ring buffer always exposes the last `window` ticks in order"""
+    frames = np.random.default_rng(0).normal(size=(23, 4, 2)).astype(np.float32)
+    buffer = SectionWindowBuffer(4, 5, 2)
+    for t, frame in enumerate(frames):
+        buffer.push(frame, frame[:, 0] > 1.0)
+        if t >= 4:
+            assert np.array_equal(buffer.windows(), frames[t - 4:t + 1].transpose(1, 0, 2))
+            expected_active = (frames[t - 4:t + 1, :, 0] > 1.0).any(axis=0)
+            assert np.array_equal(buffer.active(), np.flatnonzero(expected_active))
+    assert buffer.ready and np.shares_memory(buffer.windows(), buffer.data)
+
+def test_training_windows_align_with_horizons():
+    """Each sample's labels are the section's congestion h ticks after the window ends"""
+    features, labels = simulate_section_series(n_sections=3, n_ticks=60, seed=1)
+    X, y = make_training_windows(features, labels, window=10, horizon_ticks=[5, 15])
+    assert X.shape == (3 * (60 - 15 - 9), 10, len(SECTION_FEATURES)) and y.shape == (len(X), 2)
+    # Sample for window ending at tick 20, section 2
+    i = (20 - 9) * 3 + 2
+    assert np.array_equal(X[i], features[11:21, 2])
+    assert y[i, 0] == labels[25, 2] and y[i, 1] == labels[35, 2]
+
+def test_simulated_features_follow_live_definitions():
+    """Simulated ticks are aggregated like live ones: empty sections are all zeros, probabilities are means"""
+    features, _ = simulate_section_series(n_sections=5, n_ticks=200, seed=4)
+    empty = features[..., 0] == 0
+    assert empty.any() and (features[empty][:, 1:4] == 0).all()
+    assert ((features[..., 3] >= 0) & (features[..., 3] <= 1)).all()
+
+    frame = section_features([0, 0, 2, -1], [40.0, 60.0, 30.0, 99.0], [10.0, 0.0, 5.0, 99.0],
+                             [0.2, 0.6, 1.0, 1.0], 3, datetime(2024, 3, 4, 18, 0))
+    assert np.allclose(frame[:, :4], [[2, 50, 5, 0.4], [0, 0, 0, 0], [1, 30, 5, 1]])
+
+def test_forecaster_fixed_shape_inference_and_integration():
+    """Padded fixed-shape batches trace one graph; forecasts survive save/load and reach the results"""
+    features, labels = simulate_section_series(n_sections=6, n_ticks=300, seed=2)
+    forecaster = SectionForecaster.train(features, labels, window=8, epochs=1, batch_size=32, verbose=0)
+    forecaster.compile()
+
+    windows = np.random.default_rng(3).normal(size=(70, 8, len(SECTION_FEATURES))).astype(np.float32)
+    probabilities = forecaster.predict_windows(windows)
+    forecaster.predict_windows(windows[:5])
+    assert probabilities.shape == (70, 3) and ((probabilities >= 0) & (probabilities <= 1)).all()
+    assert np.allclose(probabilities, forecaster.model.predict(windows, verbose=0), atol=1e-5)
+    assert forecaster._infer.experimental_get_tracing_count() == 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'forecaster.keras')
+        forecaster.save(path)
+        loaded = SectionForecaster.load(path)
+    assert np.allclose(loaded.predict_windows(windows), probabilities, atol=1e-5)
+
+    # The LSTM runs once per observed tick; calls in between reuse the forecast
+    for tick in range(8):
+        loaded.observe(features[tick], now=tick * 60.0)
+    loaded.forecast()
+    assert not loaded.observe(features[8], now=7 * 60.0 + 30)
+    loaded.top_sections(3)
+    assert loaded.forecasts_scored == 1
+    assert loaded.observe(features[8], now=8 * 60.0)
+    loaded.forecast()
+    assert loaded.forecasts_scored == 2
+
+    loaded.buffer = loaded.last_tick = None
+    loaded.tick_seconds = 0  # one window tick per analysis pass
+    integration = MLBackendIntegration(use_prediction_cache=False, seed=0, forecaster=loaded)
+    assert integration.load_trained_model(MODEL_PATH)
+    trains = integration._generate_sample_trains(40)
+    for _ in range(8):
+        results = integration.analyze_trains(trains)
+    forecast = results['section_forecast']
+    assert forecast and set(forecast[0]) == {'section', 'congestion_5min', 'congestion_15min', 'congestion_30min'}
+
+if __name__ == "__main__":
+    test_ring_buffer_matches_rebuilt_windows()
+    test_training_windows_align_with_horizons()
+    test_simulated_features_follow_live_definitions()
+    test_forecaster_fixed_shape_inference_and_integration()
+    print("✅ Section forecaster tests passed")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test section occupancy from live positions
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from section_occupancy import SectionOccupancy, count_occupancy, default_grid, OUTSIDE
+from station_registry import HOWRAH_STATIONS
+from train_state_store import TrainStateStore
+
+HWH = HOWRAH_STATIONS['HWH']
+KGP = HOWRAH_STATIONS['KGP']
+
+def test_positions_bin_into_station_sections():
+    """Trains near a station share its section; off-grid trains are outside"""
+    grid = default_grid()
+    sections = grid.sections([HWH['lat'], HWH['lat'] + 0.005, KGP['lat'], 0.0],
+                             [HWH['lon'], HWH['lon'], KGP['lon'], 0.0])
+    assert grid.section_name(sections[0]) == 'HWH'
+    assert sections[0] == sections[1]
+    assert grid.section_name(sections[2]) == 'KGP'
+    assert sections[3] == OUTSIDE
+    assert count_occupancy([HWH['lat']] * 3 + [KGP['lat'], 0.0],
+                           [HWH['lon']] * 3 + [KGP['lon'], 0.0]).tolist() == [3, 3, 3, 1, 1]
+
+def test_incremental_counts_match_recount():
+    """Random moves, departures and compaction keep counts exact"""
+    rng = np.random.default_rng(1)
+    occupancy = SectionOccupancy(capacity=4)
+    lat = rng.uniform(22.3, 23.3, 500)
+    lon = rng.uniform(87.3, 88.5, 500)
+    slots = np.arange(500)
+    occupancy.update(slots, lat, lon)
+
+    for _ in range(20):
+        moving = rng.choice(500, 100, replace=False)
+        lat[moving] += rng.normal(0, 0.02, 100)
+        lon[moving] += rng.normal(0, 0.02, 100)
+        occupancy.update(moving, lat[moving], lon[moving])
+
+    assert np.array_equal(occupancy.occupancy(slots), count_occupancy(lat, lon))
+
+def test_store_listener_follows_compaction():
+    """Occupancy tracks store slots through departures and compaction"""
+    store = TrainStateStore(capacity=8)
+    occupancy = SectionOccupancy()
+    store.listeners.append(occupancy)
+
+    trains = [{'id': f'T{i}', 'lat': HWH['lat'], 'lon': HWH['lon']} for i in range(4)]
+    trains += [{'id': f'K{i}', 'lat': KGP['lat'], 'lon': KGP['lon']} for i in range(2)]
+    view = store.sync(trains)
+    occupancy.update(np.arange(len(view)), view['lat'], view['lon'])
+
+    view = store.sync(trains[2:])
+    occupancy.update(np.arange(len(view)), view['lat'], view['lon'])
+    by_id = dict(zip(view['train_id'], occupancy.occupancy(np.arange(len(view)))))
+    assert by_id == {'T2': 2, 'T3': 2, 'K0': 2, 'K1': 2}
+    assert occupancy.counts.sum() == 4
+
+if __name__ == "__main__":
+    test_positions_bin_into_station_sections()
+    test_incremental_counts_match_recount()
+    test_store_listener_follows_compaction()
+    print("✅ Section occupancy tests passed")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test multi-process sharded inference
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_congestion_predictor import TrainCongestionPredictor
+from sharded_inference import ShardedPredictor
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+def test_shards_cover_rows_in_order():
+    """Shard ranges are contiguous, ordered and capped at one per worker"""
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    sharded = ShardedPredictor(predictor, workers=4, min_shard_rows=100)
+    try:
+        assert sharded.shards(250) == [(0, 125), (125, 250)]
+        shards = sharded.shards(10000)
+        assert len(shards) == 4 and shards[0][0] == 0 and shards[-1][1] == 10000
+        assert all(a[1] == b[0] for a, b in zip(shards, shards[1:]))
+    finally:
+        sharded.close()
+
+def test_sharded_scores_match_in_process():
+    """Worker processes return the in-process probabilities in input order"""
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    sharded = ShardedPredictor(predictor, workers=2, min_rows=1000, min_shard_rows=500)
+    try:
+        # Small batches stay in-process
+        small = predictor.fetch_simulated_data(200, seed=1)
+        assert np.array_equal(sharded.predict_congestion(small)[1], predictor.predict_congestion(small)[1])
+        assert sharded.stats()['local_batches'] == 1 and not sharded.stats()['started']
+
+        for n in (3000, 8000):  # the second batch grows the shared blocks
+            df = predictor.fetch_simulated_data(n, seed=n)
+            labels, probabilities = sharded.predict_congestion(df)
+            expected_labels, expected = predictor.predict_congestion(df)
+            assert np.array_equal(probabilities, expected)
+            assert np.array_equal(labels, expected_labels)
+        assert sharded.stats()['sharded_batches'] == 2
+        assert sharded.feature_pipeline is predictor.feature_pipeline  # delegated
+    finally:
+        sharded.close()
+    assert sharded._x_block is None and sharded._owned_dir is None
+
+if __name__ == "__main__":
+    test_shards_cover_rows_in_order()
+    test_sharded_scores_match_in_process()
+    print("✅ Sharded inference tests passed")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized simulated data generator
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_congestion_predictor import TrainCongestionPredictor, HOWRAH_STATIONS
+
+EXPECTED_COLUMNS = [
+    'train_id', 'category', 'station', 'station_type', 'speed', 'occupancy',
+    'signal_status', 'delay', 'distance_to_next', 'distance_to_destination',
+    'time_to_clear', 'hour_of_day', 'day_of_week', 'congestion', 'lat', 'lon'
+]
+
+def test_schema_and_ranges():
+    """Generated data keeps the original schema and value ranges"""
+    df = TrainCongestionPredictor().fetch_simulated_data(5000)
+
+    assert list(df.columns) == EXPECTED_COLUMNS
+    assert len(df) == 5000
+    assert df['speed'].between(0, 130).all()
+    assert df['occupancy'].between(0, 5).all()
+    assert set(df['signal_status']) <= {0, 1, 2}
+    assert (df['delay'] >= 0).all()
+    assert set(df['congestion']) <= {0, 1}
+    assert set(df['station']) <= set(HOWRAH_STATIONS)
+
+    # Category-conditioned speed: vande fastest, freight slowest
+    speeds = df.groupby('category')['speed'].mean()
+    assert speeds['vande'] > speeds['express'] > speeds['passenger'] > speeds['freight']
+
+    # Congestion rules always hold
+    rules = ((df['occupancy'] >= 3) | (df['speed'] < 25) | (df['signal_status'] == 0) |
+             (df['delay'] > 20) | (df['time_to_clear'] > 300))
+    assert (df.loc[rules, 'congestion'] == 1).all()
+
+def test_seeded_generator():
+    """Same seed gives the same data without touching the global numpy state"""
+    predictor = TrainCongestionPredictor()
+    state = np.random.get_state()[1].copy()
+
+    a = predictor.fetch_simulated_data(1000, seed=7)
+    b = predictor.fetch_simulated_data(1000, seed=7)
+    c = predictor.fetch_simulated_data(1000, seed=8)
+
+    assert a.equals(b)
+    assert not a.equals(c)
+    assert (np.random.get_state()[1] == state).all()
+
+def test_chunked_stream():
+    """Streaming output covers exactly the requested number of samples"""
+    chunks = list(TrainCongestionPredictor().iter_simulated_data(2500, chunk_size=1000))
+
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+    assert all(list(c.columns) == EXPECTED_COLUMNS for c in chunks)
+
+if __name__ == "__main__":
+    test_schema_and_ranges()
+    test_seeded_generator()
+    test_chunked_stream()
+    print("✅ Simulated data tests passed")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the hot-path stage timers and metrics surface
+"""
+
+import sys
+import os
+import io
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stage_metrics import Metrics, METRICS
+from train_congestion_predictor import TrainCongestionPredictor, CongestionOptimizer
+from ml_server_integration import run_prediction, SnapshotMemo
+from ml_prediction_server import PredictionServer
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+def test_trace_collects_nested_stages():
+    """Stages inside a trace land in it and in the aggregates"""
+    metrics = Metrics()
+    with metrics.trace() as outer:
+        with metrics.stage('a'):
+            with metrics.trace() as inner:
+                with metrics.stage('b'):
+                    pass
+        metrics.count('rows', 3)
+    assert set(inner) == {'b'}
+    assert set(outer) == {'a', 'b'}
+
+    snapshot = metrics.snapshot()
+    assert snapshot['stages']['a']['count'] == 1
+    assert snapshot['counters'] == {'rows': 3}
+    json.dumps(snapshot)
+
+def test_disabled_metrics_are_noops():
+    """A disabled registry records nothing and traces stay empty"""
+    metrics = Metrics(enabled=False)
+    with metrics.trace() as trace:
+        with metrics.stage('a'):
+            metrics.count('rows')
+    assert trace == {}
+    assert metrics.snapshot()['stages'] == {} and metrics.snapshot()['counters'] == {}
+
+def test_payload_carries_stage_timings():
+    """run_prediction reports its per-stage breakdown, also on memo hits"""
+    predictor = TrainCongestionPredictor().load_model(MODEL_PATH)
+    optimizer = CongestionOptimizer(predictor)
+    trains = [{'id': f'T{i}', 'category': 'express', 'speed': 20 + i, 'delay': i,
+               'lat': 22.58, 'lon': 88.34} for i in range(5)]
+    memo = SnapshotMemo()
+
+    result = run_prediction(predictor, optimizer, trains, memo=memo)
+    assert {'prepare', 'predict', 'score', 'optimize', 'build'} <= set(result['timings_ms'])
+    assert all(ms >= 0 for ms in result['timings_ms'].values())
+
+    cached = run_prediction(predictor, optimizer, trains, memo=memo)
+    assert set(cached['timings_ms']) == {'memo'}
+    assert 'prepare' in result['timings_ms']
+
+def test_server_metrics_frame():
+    """The persistent server answers metrics frames with the stage aggregates"""
+    out = io.StringIO()
+    server = PredictionServer(MODEL_PATH, out=out)
+    server.load()
+    server.serve(io.StringIO(json.dumps({'id': 1, 'type': 'predict', 'trains': [
+        {'id': 'T1', 'category': 'local', 'speed': 30, 'delay': 4, 'lat': 22.6, 'lon': 88.3}]}) + '\n'))
+    server.handle_line(json.dumps({'id': 2, 'type': 'metrics'}))
+
+    responses = {r['id']: r for r in map(json.loads, out.getvalue().splitlines())}
+    metrics = responses[2]['result']
+    assert responses[2]['ok'] and metrics['enabled'] == METRICS.enabled
+    assert metrics['server']['requests_served'] == 1
+    assert 'model_load_s' in metrics['gauges']
+    if METRICS.enabled:
+        assert metrics['stages']['score']['count'] >= 1
+        assert metrics['counters']['rows_predicted'] >= 1
+
+if __name__ == "__main__":
+    test_trace_collects_nested_stages()
+    test_disabled_metrics_are_noops()
+    test_payload_carries_stage_timings()
+    test_server_metrics_frame()
+    print("✅ Stage metrics tests passed")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test the station registry spatial index
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from station_registry import StationRegistry, HOWRAH_STATIONS, EARTH_RADIUS_KM
+from ml_backend_integration import MLBackendIntegration
+from ml_server_integration import prepare_train_frame
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def test_station_positions_resolve_to_themselves():
+    """Each station's own coordinates map to that station with zero distance"""
+    registry = StationRegistry()
+    lat = [s['lat'] for s in HOWRAH_STATIONS.values()]
+    lon = [s['lon'] for s in HOWRAH_STATIONS.values()]
+
+    result = registry.lookup(lat, lon)
+    assert result['station'].tolist() == list(HOWRAH_STATIONS)
+    assert result['station_type'].tolist() == [s['type'] for s in HOWRAH_STATIONS.values()]
+    assert np.allclose(result['station_distance_km'], 0, atol=1e-6)
+
+def test_matches_brute_force_on_large_zone():
+    """Batched KD-tree lookups agree with a brute-force haversine scan"""
+    rng = np.random.default_rng(1)
+    records = [{'code': f'S{i}', 'lat': lat, 'lon': lon, 'type': 'suburban'}
+               for i, (lat, lon) in enumerate(zip(rng.uniform(20, 25, 3000), rng.uniform(85, 91, 3000)))]
+    registry = StationRegistry.from_records(records)
+    train_lat = rng.uniform(20, 25, 500)
+    train_lon = rng.uniform(85, 91, 500)
+
+    index, distance = registry.nearest(train_lat, train_lon)
+    brute = _haversine_km(train_lat[:, None], train_lon[:, None], registry.lat[None, :], registry.lon[None, :])
+
+    assert len(registry) == 3000
+    assert np.array_equal(index, brute.argmin(axis=1))
+    assert np.allclose(distance, brute.min(axis=1), atol=1e-6)
+
+def test_trains_without_position_get_default_station():
+    """Unpositioned trains aren't matched to the station nearest (0, 0), on either path"""
+    trains = [{'id': 'A', 'speed': 40, 'delay': 2, 'lat': 22.583, 'lon': 88.342},
+              {'id': 'B', 'speed': 40, 'delay': 2},
+              {'id': 'C', 'speed': 40, 'delay': 2, 'lat': None, 'lon': None}]
+    frame = MLBackendIntegration().convert_to_ml_format(trains)
+    expected = prepare_train_frame(trains)
+
+    assert list(frame['station']) == list(expected['station']) == ['HWH', 'HWH', 'HWH']
+    assert list(frame['station_type']) == list(expected['station_type'])
+    assert list(frame['occupancy']) == list(expected['occupancy']) == [1, 1, 1]
+    assert frame['station_distance_km'][0] < 1 and np.isnan(frame['station_distance_km'][1:]).all()
+
+if __name__ == "__main__":
+    test_station_positions_resolve_to_themselves()
+    test_matches_brute_force_on_large_zone()
+    test_trains_without_position_get_default_station()
+    print("✅ Station registry tests passed")
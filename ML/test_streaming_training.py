@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test memory-bounded streaming training
+"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_congestion_predictor import TrainCongestionPredictor
+from streaming_training import Reservoir, QuantileBinner, csv_chunks
+
+def test_reservoir_is_bounded_and_uniform():
+    """The reservoir keeps a fixed number of rows drawn from the whole stream"""
+    reservoir = Reservoir(1000, 1, np.random.default_rng(0))
+    for start in range(0, 100000, 7000):
+        values = np.arange(start, min(start + 7000, 100000), dtype=np.float32)[:, None]
+        reservoir.add(values, np.zeros(len(values), dtype=np.int64))
+    rows, _ = reservoir.sample()
+    assert rows.shape == (1000, 1) and reservoir.seen == 100000
+    assert 40000 < rows.mean() < 60000  # not just the first rows
+    assert len(np.unique(rows)) == 1000
+
+def test_binner_one_hot():
+    """Every row gets exactly one active bin per feature"""
+    X = np.random.default_rng(1).normal(size=(500, 3))
+    binned = QuantileBinner(8).fit(X).transform(X)
+    assert binned.shape == (500, 24)
+    assert np.array_equal(binned.sum(axis=1).A1, np.full(500, 3))
+
+def test_streaming_training_round_trip():
+    """A chunk-trained model scores well and survives pickle and artifact round trips"""
+    predictor = TrainCongestionPredictor()
+    _, accuracy = predictor.train_streaming(num_samples=40000, chunk_size=10000, epochs=2)
+    assert accuracy > 0.85
+    assert predictor.compiled is None
+    assert predictor.metadata['streaming']['chunks'] == 4
+
+    test_data = predictor.fetch_simulated_data(500, seed=3)
+    _, expected = predictor.predict_congestion(test_data)
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in (os.path.join(tmp, 'model.pkl'), os.path.join(tmp, 'model')):
+            predictor.save_model(path)
+            loaded = TrainCongestionPredictor().load_model(path)
+            assert np.allclose(loaded.predict_congestion(test_data)[1], expected)
+
+def test_csv_chunk_source():
+    """Logged CSV snapshots are re-read chunk by chunk on every pass"""
+    predictor = TrainCongestionPredictor()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'snapshots.csv')
+        predictor.fetch_simulated_data(5000, seed=4).to_csv(path, index=False)
+        source = csv_chunks(path, chunksize=2000)
+        assert [len(df) for df in source()] == [2000, 2000, 1000]
+        _, accuracy = predictor.train_streaming(source, epochs=2)
+    assert accuracy > 0.8
+
+if __name__ == "__main__":
+    test_reservoir_is_bounded_and_uniform()
+    test_binner_one_hot()
+    test_streaming_training_round_trip()
+    test_csv_chunk_source()
+    print("✅ Streaming training tests passed")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the columnar train state store
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from train_state_store import TrainStateStore
+from ml_backend_integration import MLBackendIntegration
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+def _trains(ids, speed=40.0):
+    return [{'id': f'T{i}', 'speed': speed + i, 'delay': i % 7, 'lat': 22.5, 'lon': 88.3,
+             'category': 'express'} for i in ids]
+
+def test_updates_are_written_in_place():
+    """Known trains keep their slot and views share the column memory"""
+    store = TrainStateStore(capacity=8)
+    store.sync(_trains(range(5)))
+    slots = dict(store.slots)
+    speed = store.columns['speed']
+
+    view = store.sync(_trains(range(5), speed=10.0))
+    assert store.slots == slots
+    assert np.shares_memory(view['speed'], speed)
+    assert np.array_equal(view['speed'], np.arange(5) + 10.0)
+
+def test_departed_slots_are_reused_and_compacted():
+    """Freed slots go to new arrivals first; remaining holes are compacted"""
+    store = TrainStateStore(capacity=8)
+    store.sync(_trains(range(6)))
+
+    # Two leave, one arrives: the arrival reuses a freed slot
+    view = store.sync(_trains([0, 1, 2, 3, 9]))
+    assert len(view) == 5 and store.high_water == 5
+    assert max(store.slots.values()) == 4
+    ids = list(view['train_id'])
+    assert sorted(ids) == ['T0', 'T1', 'T2', 'T3', 'T9']
+    assert view['speed'][ids.index('T9')] == 49.0
+    assert all(view['record'][store.slots[i]]['id'] == i for i in ids)
+
+    # Growing past capacity keeps existing rows
+    view = store.sync(_trains(range(20)))
+    assert store.capacity >= 20 and len(view) == 20
+    assert view['speed'][store.slots['T3']] == 43.0
+
+def _sample_trains(integration, count):
+    """Sample trains with distinct ids (random sample ids can collide)"""
+    trains = integration._generate_sample_trains(count)
+    for i, train in enumerate(trains):
+        train['id'] = f'S{i}'
+    return trains
+
+def test_integration_scores_from_store():
+    """Predictions from the store match predicting the equivalent DataFrame"""
+    integration = MLBackendIntegration(use_prediction_cache=False, seed=0)
+    assert integration.load_trained_model(MODEL_PATH)
+    trains = _sample_trains(integration, 40)
+
+    results = integration.analyze_trains(trains)
+    state = integration.state_store.view()
+    expected = integration.predictor.predict_congestion(state)[1]
+    assert results['total_trains'] == 40
+    assert np.allclose(results['congestion_probabilities'], expected)
+
+    frame = integration.convert_to_ml_format(trains)
+    assert list(frame['train_id']) == [t['id'] for t in trains]
+
+def test_store_path_uses_prediction_cache():
+    """The store-backed path scores through the prediction cache, even while it is empty"""
+    integration = MLBackendIntegration(seed=0)
+    assert integration.load_trained_model(MODEL_PATH)
+    assert len(integration.prediction_cache) == 0
+    results = integration.analyze_trains(_sample_trains(integration, 40))
+    assert results['total_trains'] == 40
+    assert integration.prediction_cache.stats()['misses'] == 40
+    assert len(integration.prediction_cache) == 40
+
+if __name__ == "__main__":
+    test_updates_are_written_in_place()
+    test_departed_slots_are_reused_and_compacted()
+    test_integration_scores_from_store()
+    test_store_path_uses_prediction_cache()
+    print("✅ Train state store tests passed")
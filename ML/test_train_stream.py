@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test streaming ingestion of the train WebSocket feed
+"""
+
+import sys
+import os
+import json
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_backend_integration import MLBackendIntegration
+from train_stream import TrainStateTable, ws_url_for
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trained_congestion_model.pkl')
+
+def _frames(trains, moves):
+    """Feed frames: the same trains with the first `moves[i]` trains shifted"""
+    frames = []
+    for tick, moved in enumerate(moves):
+        snapshot = [dict(t, lat=t['lat'] + 0.01 * tick if i < moved else t['lat'])
+                    for i, t in enumerate(trains)]
+        frames.append(json.dumps({'type': 'trains', 'updatedAt': tick, 'trains': snapshot}))
+    return frames
+
+def test_state_table_diffs_snapshots():
+    """Only new/changed trains are upserts; missing trains are removed"""
+    table = TrainStateTable()
+    trains = [{'id': f'T{i}', 'lat': 22.5, 'lon': 88.3, 'speed': 40} for i in range(5)]
+
+    upserts, removals = table.apply_snapshot(trains)
+    assert len(upserts) == 5 and not removals
+
+    upserts, removals = table.apply_snapshot(trains)
+    assert not upserts and not removals
+
+    moved = [dict(trains[0], speed=10)] + trains[1:4]
+    upserts, removals = table.apply_snapshot(moved)
+    assert [t['id'] for t in upserts] == ['T0']
+    assert removals == ['T4']
+    assert len(table) == 4
+
+    # Entries that aren't train objects are skipped
+    upserts, removals = table.apply_snapshot([42, 'T1', None, [1]] + moved)
+    assert not upserts and not removals
+
+def _stream_setup():
+    integration = MLBackendIntegration()
+    assert integration.load_trained_model(MODEL_PATH)
+    integration._log_results = lambda results: None
+    trains = integration._generate_sample_trains(30)
+    for i, train in enumerate(trains):
+        train['id'] = f'S{i}'  # random sample ids can collide
+    results = []
+    integration._send_to_frontend = results.append
+    return integration, trains, results
+
+def test_changes_are_micro_batched():
+    """Frames inside one batch window produce a single prediction"""
+    integration, trains, results = _stream_setup()
+
+    async def feed():
+        for frame in _frames(trains, [30, 5, 5, 0]):
+            yield frame
+            await asyncio.sleep(0.01)
+
+    asyncio.run(integration.stream_async(batch_window=0.2, messages=feed()))
+
+    stream = integration.stream
+    assert stream.stats['messages'] == 4
+    assert stream.stats['batches'] == 1
+    assert len(results) == 1 and results[0]['total_trains'] == 30
+    assert stream.latency_stats()['max_s'] < 1.0
+
+def test_malformed_frames_are_skipped():
+    """Frames that aren't objects or carry no train list don't stop the consumer"""
+    integration, trains, results = _stream_setup()
+
+    async def feed():
+        for frame in ['42', '[1]', 'not json', json.dumps({'type': 'trains', 'trains': 5}),
+                  json.dumps({'type': 'trains', 'trains': [42]})]:
+            yield frame
+        yield _frames(trains, [0])[0]
+
+    asyncio.run(integration.stream_async(batch_window=0.05, messages=feed()))
+    assert integration.stream.stats['messages'] == 2
+    assert len(results) == 1 and results[0]['total_trains'] == 30
+
+def test_scoring_errors_do_not_stop_the_stream():
+    """A failed batch is logged and the next change is scored"""
+    integration, trains, results = _stream_setup()
+    analyze = integration.analyze
+    calls = []
+
+    def flaky_analyze(*args):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('scoring failed')
+        return analyze(*args)
+    integration.analyze = flaky_analyze
+
+    async def feed():
+        for frame in _frames(trains, [0, 5]):
+            yield frame
+            await asyncio.sleep(0.2)
+
+    asyncio.run(integration.stream_async(batch_window=0.05, messages=feed()))
+    assert integration.stream.stats['errors'] == 1
+    assert integration.stream.stats['batches'] == 1
+    assert len(results) == 1
+
+def test_ws_url_for_backend():
+    assert ws_url_for('http://localhost:5055') == 'ws://localhost:5055/ws/trains/howrah'
+    assert ws_url_for('https://rail.example/') == 'wss://rail.example/ws/trains/howrah'
+
+if __name__ == "__main__":
+    test_state_table_diffs_snapshots()
+    test_changes_are_micro_batched()
+    test_malformed_frames_are_skipped()
+    test_scoring_errors_do_not_stop_the_stream()
+    test_ws_url_for_backend()
+    print("✅ Train stream tests passed")
@@ -1,171 +1,273 @@
 import numpy as np
 import pandas as pd
-import json
-import requests
-from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from sklearn.model_selection import GridSearchCV
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 import joblib
+import os
+import time
 import warnings
+from feature_pipeline import FeaturePipeline, PEAK_HOURS
+from station_registry import HOWRAH_STATIONS
+from compiled_ensemble import CompiledEnsemble, compiled_path
+from model_artifact import save_artifact, load_artifact, is_artifact
+from stage_metrics import METRICS
 warnings.filterwarnings('ignore')
 
+# Inference only needs numpy/pandas, the scaler and the pickled tree ensemble.
+# Training-only dependencies (model selection, metrics, TensorFlow/Keras) are
+# imported on demand so the prediction path never pays for them.
+
+def load_keras():
+    """Import the TensorFlow/Keras stack on demand (training-only)"""
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+    return {
+        'tf': tf,
+        'Sequential': Sequential,
+        'LSTM': LSTM,
+        'Dense': Dense,
+        'Dropout': Dropout,
+        'BatchNormalization': BatchNormalization,
+        'EarlyStopping': EarlyStopping,
+        'ReduceLROnPlateau': ReduceLROnPlateau
+    }
+
+TRAIN_CATEGORIES = ['passenger', 'express', 'vande', 'freight']
+CATEGORY_PROBABILITIES = [0.4, 0.3, 0.1, 0.2]
+CATEGORY_SPEED = {  # mean, std (km/h)
+    'passenger': (45, 10),
+    'express': (65, 12),
+    'vande': (85, 15),
+    'freight': (35, 10)
+}
+
+# Model selection trades CV accuracy against serving cost: with these weights
+# 0.01 accuracy is worth ~10ms of batch latency, ~50ms of load time or ~5MB
+SELECTION_WEIGHTS = {'latency_ms': 0.001, 'load_ms': 0.0002, 'size_mb': 0.002}
+PROFILE_BATCH_SIZE = 256
+
+# The compiled ensemble beats the Cython trees on small batches; above this many
+# rows sklearn's predict_proba is faster (both give identical probabilities)
+COMPILED_MAX_BATCH = 512
+
 class TrainCongestionPredictor:
     def __init__(self):
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
-        self.model = None
+        self.feature_pipeline = FeaturePipeline()
+        self.selection_report = {}
+        self.metadata = {}
+        self._model = None
+        self._model_loader = None
+        self.compiled = None
         self.is_trained = False
         self.feature_names = []
+    
+    @property
+    def model(self):
+        """scikit-learn estimator (unpickled on first use for artifact directories)"""
+        if self._model is None and self._model_loader is not None:
+            self._model = self._model_loader()
+            self._model_loader = None
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_loader = None
+    
+    def set_model_loader(self, loader):
+        """Defer loading the estimator until something needs it"""
+        self._model = None
+        self._model_loader = loader
         
-    def fetch_simulated_data(self, num_samples=10000):
+    def fetch_simulated_data(self, num_samples=10000, seed=42):
         """Generate realistic train data based on our simulation"""
-        np.random.seed(42)
-        
-        # Station coordinates for Howrah section (200km radius)
-        stations = {
-            'HWH': {'lat': 22.583, 'lon': 88.342, 'type': 'major'},
-            'SDAH': {'lat': 22.576, 'lon': 88.363, 'type': 'major'},
-            'SHM': {'lat': 22.543, 'lon': 88.319, 'type': 'yard'},
-            'SRC': {'lat': 22.492, 'lon': 88.314, 'type': 'yard'},
-            'BWN': {'lat': 23.232, 'lon': 87.861, 'type': 'junction'},
-            'BDC': {'lat': 22.664, 'lon': 88.171, 'type': 'junction'},
-            'NH': {'lat': 22.894, 'lon': 88.427, 'type': 'suburban'},
-            'DKAE': {'lat': 22.680, 'lon': 88.300, 'type': 'freight'},
-            'KGP': {'lat': 22.339, 'lon': 87.325, 'type': 'major'}
-        }
+        return self._simulate_batch(np.random.default_rng(seed), num_samples)
+    
+    def iter_simulated_data(self, num_samples, chunk_size=100000, seed=42):
+        """Stream simulated data in DataFrame chunks for datasets larger than memory"""
+        rng = np.random.default_rng(seed)
+        for start in range(0, num_samples, chunk_size):
+            yield self._simulate_batch(rng, min(chunk_size, num_samples - start))
+    
+    def _simulate_batch(self, rng, num_samples):
+        """Draw one batch of simulated samples in a single vectorized pass"""
+        n = num_samples
+        station_codes = np.array(list(HOWRAH_STATIONS))
+        station_lat = np.array([s['lat'] for s in HOWRAH_STATIONS.values()])
+        station_lon = np.array([s['lon'] for s in HOWRAH_STATIONS.values()])
+        station_types = np.array([s['type'] for s in HOWRAH_STATIONS.values()])
+        
+        # Train characteristics
+        train_id = np.char.add('T', rng.integers(10000, 99999, n).astype(str))
+        category_idx = rng.choice(len(TRAIN_CATEGORIES), n, p=CATEGORY_PROBABILITIES)
+        category = np.array(TRAIN_CATEGORIES)[category_idx]
+        
+        # Speed based on category, clamped to 0-130 km/h
+        speed_mean = np.array([CATEGORY_SPEED[c][0] for c in TRAIN_CATEGORIES])
+        speed_std = np.array([CATEGORY_SPEED[c][1] for c in TRAIN_CATEGORIES])
+        speed = np.clip(rng.normal(speed_mean[category_idx], speed_std[category_idx]), 0, 130)
+        
+        # Station selection
+        station_idx = rng.integers(0, len(station_codes), n)
+        station_type = station_types[station_idx]
+        
+        # Distance calculations (exponential for realistic distances)
+        distance_to_next = rng.exponential(5000, n)
+        distance_to_destination = rng.exponential(25000, n)
+        
+        # Occupancy (number of trains in section), higher at major stations and junctions
+        occupancy_rate = np.where(station_types == 'major', 2.5,
+                                  np.where(station_types == 'junction', 2.0, 1.0))
+        occupancy = np.minimum(rng.poisson(occupancy_rate[station_idx]), 5)  # Max 5 trains in section
+        
+        # Signal status (0=Red, 1=Yellow, 2=Green)
+        signal_status = rng.choice(3, n, p=[0.15, 0.25, 0.6])
+        
+        # Delay calculation (realistic based on multiple factors)
+        base_delay = (
+            (speed < 30) * rng.exponential(10, n) +
+            (occupancy >= 3) * rng.exponential(8, n) +
+            (signal_status == 0) * rng.exponential(5, n) +
+            (category == 'freight') * rng.exponential(3, n)
+        )
+        delay = np.maximum(0, base_delay + rng.normal(0, 2, n))
+        
+        # Time to clear section
+        time_to_clear = np.where(speed > 0, distance_to_next / (speed + 1), 999)
+        
+        # Congestion label (realistic rules); more than 5 minutes to clear counts
+        congestion = (
+            (occupancy >= 3) |
+            (speed < 25) |
+            (signal_status == 0) |
+            (delay > 20) |
+            (time_to_clear > 300)
+        )
         
-        data = []
-        
-        for i in range(num_samples):
-            # Train characteristics
-            train_id = f"T{np.random.randint(10000, 99999)}"
-            category = np.random.choice(['passenger', 'express', 'vande', 'freight'], 
-                                      p=[0.4, 0.3, 0.1, 0.2])
-            
-            # Speed based on category
-            if category == 'freight':
-                speed = np.random.normal(35, 10)
-            elif category == 'vande':
-                speed = np.random.normal(85, 15)
-            elif category == 'express':
-                speed = np.random.normal(65, 12)
-            else:  # passenger
-                speed = np.random.normal(45, 10)
-            
-            speed = max(0, min(130, speed))  # Clamp speed
-            
-            # Station selection
-            station = np.random.choice(list(stations.keys()))
-            station_info = stations[station]
-            
-            # Distance calculations
-            distance_to_next = np.random.exponential(5000)  # Exponential distribution for realistic distances
-            distance_to_destination = np.random.exponential(25000)
-            
-            # Occupancy (number of trains in section)
-            if station_info['type'] == 'major':
-                occupancy = np.random.poisson(2.5)  # Higher occupancy at major stations
-            elif station_info['type'] == 'junction':
-                occupancy = np.random.poisson(2.0)
-            else:
-                occupancy = np.random.poisson(1.0)
-            
-            occupancy = min(occupancy, 5)  # Max 5 trains in section
-            
-            # Signal status (0=Red, 1=Yellow, 2=Green)
-            signal_status = np.random.choice([0, 1, 2], p=[0.15, 0.25, 0.6])
-            
-            # Delay calculation (realistic based on multiple factors)
-            base_delay = 0
-            if speed < 30:
-                base_delay += np.random.exponential(10)
-            if occupancy >= 3:
-                base_delay += np.random.exponential(8)
-            if signal_status == 0:
-                base_delay += np.random.exponential(5)
-            if category == 'freight':
-                base_delay += np.random.exponential(3)
-            
-            delay = max(0, base_delay + np.random.normal(0, 2))
-            
-            # Time to clear section
-            time_to_clear = distance_to_next / (speed + 1) if speed > 0 else 999
-            
-            # Congestion label (realistic rules)
-            congestion = 0
-            if (occupancy >= 3 or 
-                speed < 25 or 
-                signal_status == 0 or 
-                delay > 20 or
-                time_to_clear > 300):  # More than 5 minutes to clear
-                congestion = 1
-            
-            # Additional features
-            hour_of_day = np.random.randint(0, 24)
-            day_of_week = np.random.randint(0, 7)
-            
-            # Peak hour congestion
-            if hour_of_day in [7, 8, 9, 17, 18, 19]:  # Peak hours
-                if np.random.random() < 0.3:  # 30% chance of additional congestion
-                    congestion = 1
-            
-            data.append({
-                'train_id': train_id,
-                'category': category,
-                'station': station,
-                'station_type': station_info['type'],
-                'speed': speed,
-                'occupancy': occupancy,
-                'signal_status': signal_status,
-                'delay': delay,
-                'distance_to_next': distance_to_next,
-                'distance_to_destination': distance_to_destination,
-                'time_to_clear': time_to_clear,
-                'hour_of_day': hour_of_day,
-                'day_of_week': day_of_week,
-                'congestion': congestion,
-                'lat': station_info['lat'] + np.random.normal(0, 0.01),
-                'lon': station_info['lon'] + np.random.normal(0, 0.01)
-            })
-        
-        return pd.DataFrame(data)
-    
-    def prepare_features(self, df):
+        # Additional features
+        hour_of_day = rng.integers(0, 24, n)
+        day_of_week = rng.integers(0, 7, n)
+        
+        # Peak hour congestion: 30% chance of additional congestion
+        congestion |= np.isin(hour_of_day, PEAK_HOURS) & (rng.random(n) < 0.3)
+        
+        return pd.DataFrame({
+            'train_id': train_id,
+            'category': category,
+            'station': station_codes[station_idx],
+            'station_type': station_type,
+            'speed': speed,
+            'occupancy': occupancy,
+            'signal_status': signal_status,
+            'delay': delay,
+            'distance_to_next': distance_to_next,
+            'distance_to_destination': distance_to_destination,
+            'time_to_clear': time_to_clear,
+            'hour_of_day': hour_of_day,
+            'day_of_week': day_of_week,
+            'congestion': congestion.astype(int),
+            'lat': station_lat[station_idx] + rng.normal(0, 0.01, n),
+            'lon': station_lon[station_idx] + rng.normal(0, 0.01, n)
+        })
+    
+    def prepare_features(self, df, fit=False):
         """Prepare features for ML model"""
-        # Encode categorical variables
-        df_encoded = df.copy()
-        df_encoded['category_encoded'] = self.label_encoder.fit_transform(df_encoded['category'])
-        
-        # Handle missing station_type column
-        if 'station_type' not in df_encoded.columns:
-            df_encoded['station_type'] = 'major'  # Default station type
-        df_encoded['station_type_encoded'] = pd.Categorical(df_encoded['station_type']).codes
-        
-        # Feature engineering
-        df_encoded['speed_occupancy_ratio'] = df_encoded['speed'] / (df_encoded['occupancy'] + 1)
-        df_encoded['delay_speed_ratio'] = df_encoded['delay'] / (df_encoded['speed'] + 1)
-        df_encoded['is_peak_hour'] = df_encoded['hour_of_day'].isin([7, 8, 9, 17, 18, 19]).astype(int)
-        df_encoded['is_weekend'] = df_encoded['day_of_week'].isin([5, 6]).astype(int)
-        
-        # Select features
-        feature_columns = [
-            'speed', 'occupancy', 'signal_status', 'delay', 'time_to_clear',
-            'distance_to_next', 'distance_to_destination', 'hour_of_day', 'day_of_week',
-            'category_encoded', 'station_type_encoded', 'speed_occupancy_ratio',
-            'delay_speed_ratio', 'is_peak_hour', 'is_weekend'
-        ]
+        # Category vocabularies are fixed when training, then reused as-is
+        if fit:
+            self.feature_pipeline.fit(df)
+            self.label_encoder.fit(self.feature_pipeline.category_vocab)
+        
+        X = self.feature_pipeline.transform(df)
+        y = df['congestion'].to_numpy() if 'congestion' in df else None
+        
+        self.feature_names = self.feature_pipeline.feature_names
+        return X, y
+    
+    def _candidate_models(self):
+        """Candidate models for model selection"""
+        from sklearn.ensemble import (RandomForestClassifier, GradientBoostingClassifier,
+                                      HistGradientBoostingClassifier)
+        
+        return {
+            'Random Forest': RandomForestClassifier(
+                n_estimators=100, 
+                max_depth=10, 
+                min_samples_split=5,
+                random_state=42
+            ),
+            'Gradient Boosting': GradientBoostingClassifier(
+                n_estimators=100,
+                learning_rate=0.1,
+                max_depth=6,
+                random_state=42
+            ),
+            # Fast candidates: small to ship, quick to load and score
+            'Hist Gradient Boosting': HistGradientBoostingClassifier(
+                max_iter=100,
+                learning_rate=0.1,
+                max_depth=6,
+                random_state=42
+            ),
+            'Shallow Forest': RandomForestClassifier(
+                n_estimators=30,
+                max_depth=6,
+                min_samples_split=5,
+                random_state=42
+            )
+        }
+    
+    def select_model(self, models, X, y, cv=5, n_jobs=1, selection_weights=None):
+        """Cross-validate candidate models, fanning (model, fold) pairs out across processes"""
+        from sklearn.model_selection import StratifiedKFold
+        from joblib import Parallel, delayed
+        
+        weights = SELECTION_WEIGHTS if selection_weights is None else selection_weights
+        
+        # Folds are split once and shared by every candidate; the scaled matrix is
+        # memory-mapped into the worker processes rather than copied per task.
+        # The first fold's model of each candidate is sent back for profiling.
+        folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+        started = time.perf_counter()
+        fold_results = Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(_fit_and_score_fold)(name, model, X, y, train_idx, test_idx, keep=(k == 0))
+            for name, model in models.items()
+            for k, (train_idx, test_idx) in enumerate(folds)
+        )
+        wall_time = time.perf_counter() - started
+        
+        # Serving cost is profiled serially once the pool is done, so other
+        # folds' fits don't contend for the CPU while latency and load are timed
+        profile_batch = X[folds[0][1]][:PROFILE_BATCH_SIZE]
+        costs = {r['name']: _serving_cost(r['estimator'], profile_batch)
+                 for r in fold_results if r['estimator'] is not None}
+        
+        report = {}
+        for name in models:
+            runs = [r for r in fold_results if r['name'] == name]
+            scores = np.array([r['score'] for r in runs])
+            cost = costs[name]
+            report[name] = {
+                'cv_scores': scores.tolist(),
+                'cv_mean': float(scores.mean()),
+                'cv_std': float(scores.std()),
+                'fit_time_s': float(sum(r['fit_time'] for r in runs)),
+                'wall_time_s': float(max(r['ended'] for r in runs) - min(r['started'] for r in runs)),
+                **cost,
+                # Accuracy minus weighted serving costs
+                'utility': float(scores.mean() - sum(w * cost[k] for k, w in weights.items()))
+            }
         
-        self.feature_names = feature_columns
-        return df_encoded[feature_columns], df_encoded['congestion']
+        return report, wall_time
     
-    def train_model(self, df=None):
+    def train_model(self, df=None, n_jobs=1, cv=5, selection_weights=None):
         """Train the congestion prediction model"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, classification_report
+        
         if df is None:
             print("Generating simulated data...")
             df = self.fetch_simulated_data(15000)
@@ -174,7 +276,7 @@ class TrainCongestionPredictor:
         print(f"Congestion distribution: {df['congestion'].value_counts().to_dict()}")
         
         # Prepare features
-        X, y = self.prepare_features(df)
+        X, y = self.prepare_features(df, fit=True)
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
@@ -186,36 +288,23 @@ class TrainCongestionPredictor:
         X_test_scaled = self.scaler.transform(X_test)
         
         # Train multiple models and select best
-        models = {
-            'Random Forest': RandomForestClassifier(
-                n_estimators=100, 
-                max_depth=10, 
-                min_samples_split=5,
-                random_state=42
-            ),
-            'Gradient Boosting': GradientBoostingClassifier(
-                n_estimators=100,
-                learning_rate=0.1,
-                max_depth=6,
-                random_state=42
-            )
-        }
-        
-        best_model = None
-        best_score = 0
-        best_name = ""
-        
-        for name, model in models.items():
-            # Cross-validation
-            cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='accuracy')
-            mean_score = cv_scores.mean()
-            
-            print(f"{name} - CV Accuracy: {mean_score:.4f} (+/- {cv_scores.std() * 2:.4f})")
-            
-            if mean_score > best_score:
-                best_score = mean_score
-                best_model = model
-                best_name = name
+        models = self._candidate_models()
+        weights = SELECTION_WEIGHTS if selection_weights is None else selection_weights
+        report, wall_time = self.select_model(models, X_train_scaled, y_train, cv=cv, n_jobs=n_jobs,
+                                              selection_weights=weights)
+        
+        for name, result in report.items():
+            print(f"{name} - CV Accuracy: {result['cv_mean']:.4f} (+/- {result['cv_std'] * 2:.4f}) "
+                  f"[fit {result['fit_time_s']:.1f}s, wall {result['wall_time_s']:.1f}s]")
+            print(f"    latency {result['latency_ms']:.2f}ms/{PROFILE_BATCH_SIZE} rows, "
+                  f"load {result['load_ms']:.1f}ms, size {result['size_mb']:.2f}MB, "
+                  f"utility {result['utility']:.4f}")
+        print(f"Model selection wall time: {wall_time:.1f}s (n_jobs={n_jobs})")
+        
+        # Best trade-off between accuracy and serving cost
+        best_name = max(report, key=lambda name: report[name]['utility'])
+        best_model = models[best_name]
+        self.selection_report = report
         
         # Train best model
         print(f"\nTraining best model: {best_name}")
@@ -245,139 +334,283 @@ class TrainCongestionPredictor:
         
         self.model = best_model
         self.is_trained = True
+        compiled = self.compile_model(X_test_scaled)
+        self.metadata = {
+            'model_name': best_name,
+            'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'training_samples': int(len(df)),
+            'test_accuracy': float(accuracy),
+            'selection': {
+                'criterion': 'cv_accuracy - weighted serving cost',
+                'weights': dict(weights),
+                'profile_batch_size': PROFILE_BATCH_SIZE,
+                'candidates': report
+            },
+            'compiled': compiled
+        }
         
         return best_model, accuracy
     
+    def train_streaming(self, chunk_source=None, num_samples=1000000, chunk_size=100000, epochs=3, **options):
+        """Train within a fixed memory budget from a re-iterable source of DataFrame chunks"""
+        from streaming_training import train_streaming
+        
+        if chunk_source is None:
+            print(f"Streaming {num_samples} simulated samples in chunks of {chunk_size}...")
+            chunk_source = lambda: self.iter_simulated_data(num_samples, chunk_size)
+        return train_streaming(self, chunk_source, epochs=epochs, **options)
+    
     def predict_congestion(self, train_data):
         """Predict congestion for given train data"""
         if not self.is_trained:
             raise ValueError("Model not trained yet!")
         
         # Prepare features
-        X, _ = self.prepare_features(train_data)
-        X_scaled = self.scaler.transform(X)
+        with METRICS.stage('features'):
+            X, _ = self.prepare_features(train_data)
+        return self.predict_features(X)
+    
+    def predict_features(self, X):
+        """Predict congestion for an already prepared feature matrix"""
+        if not self.is_trained:
+            raise ValueError("Model not trained yet!")
         
-        # Predict
-        predictions = self.model.predict(X_scaled)
-        probabilities = self.model.predict_proba(X_scaled)[:, 1]  # Probability of congestion
+        with METRICS.stage('scale'):
+            X_scaled = self.scaler.transform(X)
+        
+        # Single pass: labels are derived from the probabilities
+        with METRICS.stage('score'):
+            if self.compiled is not None and len(X_scaled) <= COMPILED_MAX_BATCH:
+                probabilities = self.compiled.predict_proba(X_scaled)
+                METRICS.count('rows_scored_compiled', len(X_scaled))
+            else:
+                probabilities = self.model.predict_proba(X_scaled)[:, 1]  # Probability of congestion
+                METRICS.count('rows_scored_sklearn', len(X_scaled))
+            predictions = (probabilities > 0.5).astype(int)
         
         return predictions, probabilities
     
+    def compile_model(self, X_holdout=None):
+        """Flatten the trained ensemble for fast inference, validating it on a holdout set"""
+        try:
+            self.compiled = CompiledEnsemble.from_sklearn(self.model)
+        except ValueError as e:
+            print(f"⚠️  Compiled backend unavailable: {e}")
+            self.compiled = None
+            return None
+        
+        info = {'kind': self.compiled.kind, 'n_trees': self.compiled.n_trees,
+                'n_nodes': self.compiled.n_nodes, 'max_depth': self.compiled.max_depth}
+        if X_holdout is not None:
+            info['validation'] = self.compiled.validate(self.model, X_holdout)
+            if not info['validation']['identical']:
+                print(f"⚠️  Compiled ensemble differs from {type(self.model).__name__} "
+                      f"(max diff {info['validation']['max_abs_diff']:.2e}); using sklearn")
+                self.compiled = None
+        return info
+    
     def save_model(self, filepath='ML/trained_congestion_model.pkl'):
-        """Save the trained model"""
+        """Save the trained model (a path without .pkl writes an artifact directory)"""
         if not self.is_trained:
             raise ValueError("Model not trained yet!")
         
+        if not filepath.endswith('.pkl'):
+            save_artifact(self, filepath)
+            print(f"Model artifact saved to {filepath}")
+            return
+        
         model_data = {
             'model': self.model,
             'scaler': self.scaler,
             'label_encoder': self.label_encoder,
+            'feature_pipeline': self.feature_pipeline.to_dict(),
             'feature_names': self.feature_names,
-            'is_trained': self.is_trained
+            'is_trained': self.is_trained,
+            'metadata': self.metadata
         }
         
         joblib.dump(model_data, filepath)
+        if self.compiled is not None:
+            self.compiled.save(compiled_path(filepath))
+        elif os.path.exists(compiled_path(filepath)):
+            # Don't leave a previous model's ensemble next to this pickle
+            os.remove(compiled_path(filepath))
         print(f"Model saved to {filepath}")
     
-    def load_model(self, filepath='ML/trained_congestion_model.pkl'):
-        """Load a trained model"""
+    def load_model(self, filepath='ML/trained_congestion_model.pkl', backend='auto'):
+        """Load a trained model
+        
+        Artifact directories are memory-mapped; pickles are unpickled in full.
+        backend='auto' uses the compiled ensemble exported next to the model,
+        compiling one in memory for older pickles; 'sklearn' disables it.
+        """
+        with METRICS.stage('model_load'):
+            if is_artifact(filepath):
+                load_artifact(self, filepath, backend=backend)
+            else:
+                self._load_pickle(filepath, backend)
+        
+        print(f"Model loaded from {filepath}")
+        return self
+    
+    def _load_pickle(self, filepath, backend):
         model_data = joblib.load(filepath)
         
         self.model = model_data['model']
         self.scaler = model_data['scaler']
         self.label_encoder = model_data['label_encoder']
+        if 'feature_pipeline' in model_data:
+            self.feature_pipeline = FeaturePipeline.from_dict(model_data['feature_pipeline'])
+        else:
+            self.feature_pipeline = FeaturePipeline.from_label_encoder(self.label_encoder)
         self.feature_names = model_data['feature_names']
         self.is_trained = model_data['is_trained']
-        
-        print(f"Model loaded from {filepath}")
-        return self
+        self.metadata = model_data.get('metadata', {})
+        
+        self.compiled = None
+        if backend != 'sklearn':
+            path = compiled_path(filepath)
+            exported = CompiledEnsemble.load(path) if os.path.exists(path) else None
+            if exported is not None and exported.matches(self.model):
+                self.compiled = exported
+            else:
+                if exported is not None:
+                    print(f"⚠️  Ignoring {path}: it was compiled from a different model")
+                self.compile_model()
     
-    def load_trained_model(self, filepath='ML/trained_congestion_model.pkl'):
+    def load_trained_model(self, filepath='ML/trained_congestion_model.pkl', backend='auto'):
         """Alias for load_model for backward compatibility"""
-        return self.load_model(filepath)
+        return self.load_model(filepath, backend=backend)
+
+def _fit_and_score_fold(name, model, X, y, train_idx, test_idx, keep=False):
+    """Fit one candidate on one CV fold (runs in a worker process)"""
+    from sklearn.base import clone
+    
+    started = time.time()
+    estimator = clone(model)
+    estimator.fit(X[train_idx], y[train_idx])
+    fit_time = time.time() - started
+    score = float((estimator.predict(X[test_idx]) == y[test_idx]).mean())
+    return {'name': name, 'score': score, 'fit_time': fit_time, 'estimator': estimator if keep else None,
+            'started': started, 'ended': time.time()}
+
+def _serving_cost(estimator, X_batch, repeats=5):
+    """Measure single-batch inference latency, load time and serialized size"""
+    import io
+    
+    buffer = io.BytesIO()
+    joblib.dump(estimator, buffer)
+    payload = buffer.getvalue()
+    
+    load_times, latencies = [], []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        loaded = joblib.load(io.BytesIO(payload))
+        load_times.append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        loaded.predict_proba(X_batch)
+        latencies.append(time.perf_counter() - started)
+    
+    return {
+        'latency_ms': float(np.median(latencies) * 1000),
+        'load_ms': float(np.median(load_times) * 1000),
+        'size_mb': len(payload) / 1e6
+    }
+
+# Numeric priority ranks; ties are broken by expected improvement
+PRIORITY_LEVELS = {'low': 1, 'medium': 2, 'high': 3}
+
+# Optimization rules: (action, priority, expected improvement, reason)
+OPTIMIZATION_RULES = [
+    ('increase_speed', 'high', 0.3, 'Low speed causing congestion'),
+    ('reroute', 'high', 0.4, 'High occupancy in section'),
+    ('wait', 'medium', 0.2, 'Red signal ahead'),
+    ('express_priority', 'high', 0.35, 'High delay affecting schedule'),
+    ('schedule_adjustment', 'medium', 0.25, 'Peak hour congestion')
+]
+MONITOR_RULE = ('monitor', 'low', 0.1, 'Continue monitoring')
+OPTIMIZATION_RULES_ALL = OPTIMIZATION_RULES + [MONITOR_RULE]
 
 class CongestionOptimizer:
     """Optimization algorithms for congestion management"""
     
     def __init__(self, predictor):
         self.predictor = predictor
+        self.actions = np.array([r[0] for r in OPTIMIZATION_RULES_ALL])
+        self.priority_levels = np.array([PRIORITY_LEVELS[r[1]] for r in OPTIMIZATION_RULES_ALL])
+        self.improvements = np.array([r[2] for r in OPTIMIZATION_RULES_ALL])
+        # Rank key per rule: priority first, expected improvement second
+        self.rule_rank = self.priority_levels + self.improvements / (self.improvements.max() + 1)
     
-    def suggest_actions(self, train_data, congestion_predictions):
+    def suggest_actions(self, train_data, congestion_predictions, limit=None):
         """Suggest optimization actions based on congestion predictions"""
-        suggestions = []
-        
-        for i, (_, train) in enumerate(train_data.iterrows()):
-            if i < len(congestion_predictions) and congestion_predictions[i] == 1:  # Congestion predicted
-                suggestion = self._get_optimization_suggestion(train)
-                suggestions.append({
-                    'train_id': train.get('id', train.get('number', f'TRAIN_{i}')),
-                    'action': suggestion['action'],
-                    'priority': suggestion['priority'],
-                    'expected_improvement': suggestion['improvement'],
-                    'reason': suggestion['reason']
-                })
-        
-        return suggestions
-    
-    def _get_optimization_suggestion(self, train):
-        """Get specific optimization suggestion for a train"""
-        suggestions = []
-        
-        # Speed-based suggestions
-        if train.speed < 30:
-            suggestions.append({
-                'action': 'increase_speed',
-                'priority': 'high',
-                'improvement': 0.3,
-                'reason': 'Low speed causing congestion'
-            })
-        
-        # Occupancy-based suggestions
-        if train.occupancy >= 3:
-            suggestions.append({
-                'action': 'reroute',
-                'priority': 'high',
-                'improvement': 0.4,
-                'reason': 'High occupancy in section'
-            })
-        
-        # Signal-based suggestions
-        if train.signal_status == 0:
-            suggestions.append({
-                'action': 'wait',
-                'priority': 'medium',
-                'improvement': 0.2,
-                'reason': 'Red signal ahead'
-            })
-        
-        # Delay-based suggestions
-        if train.delay > 20:
-            suggestions.append({
-                'action': 'express_priority',
-                'priority': 'high',
-                'improvement': 0.35,
-                'reason': 'High delay affecting schedule'
-            })
-        
-        # Peak hour suggestions
-        if train.hour_of_day in [7, 8, 9, 17, 18, 19]:
-            suggestions.append({
-                'action': 'schedule_adjustment',
-                'priority': 'medium',
-                'improvement': 0.25,
-                'reason': 'Peak hour congestion'
-            })
-        
-        # Return highest priority suggestion
-        if suggestions:
-            return max(suggestions, key=lambda x: x['priority'])
-        else:
-            return {
-                'action': 'monitor',
-                'priority': 'low',
-                'improvement': 0.1,
-                'reason': 'Continue monitoring'
+        with METRICS.stage('suggest'):
+            return self._suggestion_records(self.suggest_actions_arrays(train_data, congestion_predictions), limit)
+    
+    def _suggestion_records(self, result, limit):
+        train_ids = result['train_id'][:limit].tolist()
+        rules = result['rule'][:limit].tolist()
+        return [
+            {
+                'train_id': train_id,
+                'action': OPTIMIZATION_RULES_ALL[rule][0],
+                'priority': OPTIMIZATION_RULES_ALL[rule][1],
+                'expected_improvement': OPTIMIZATION_RULES_ALL[rule][2],
+                'reason': OPTIMIZATION_RULES_ALL[rule][3]
             }
+            for train_id, rule in zip(train_ids, rules)
+        ]
+    
+    def suggest_actions_arrays(self, train_data, congestion_predictions):
+        """Columnar suggestions for congested trains, ranked by priority then improvement"""
+        n = len(train_data)
+        congested = np.zeros(n, dtype=bool)
+        predictions = np.asarray(congestion_predictions)[:n]
+        congested[:len(predictions)] = predictions == 1  # Congestion predicted
+        
+        # Best matching rule per train; trains with no match fall back to monitoring
+        masks = self._rule_masks(train_data)
+        scores = np.where(masks, self.rule_rank[:len(OPTIMIZATION_RULES), None], -np.inf)
+        best = scores.argmax(axis=0)
+        rule = np.where(masks.any(axis=0), best, len(OPTIMIZATION_RULES))
+        
+        index = np.flatnonzero(congested)
+        order = np.argsort(-self.rule_rank[rule[index]], kind='stable')
+        index = index[order]
+        rule = rule[index]
+        
+        return {
+            'index': index,
+            'train_id': self._train_ids(train_data)[index],
+            'rule': rule,
+            'action': self.actions[rule],
+            'priority': self.priority_levels[rule],
+            'expected_improvement': self.improvements[rule]
+        }
+    
+    def _rule_masks(self, train_data):
+        """Evaluate every rule over the whole batch as boolean masks"""
+        n = len(train_data)
+        
+        def column(name, default):
+            if name in train_data:
+                return np.asarray(train_data[name])
+            return np.full(n, default)
+        
+        return np.vstack([
+            column('speed', np.inf) < 30,                        # Speed-based
+            column('occupancy', 0) >= 3,                         # Occupancy-based
+            column('signal_status', 2) == 0,                     # Signal-based
+            column('delay', 0) > 20,                             # Delay-based
+            np.isin(column('hour_of_day', -1), PEAK_HOURS)       # Peak hour
+        ])
+    
+    def _train_ids(self, train_data):
+        for name in ('id', 'number', 'train_id'):
+            if name in train_data:
+                return np.asarray(train_data[name], dtype=object)
+        return np.array([f'TRAIN_{i}' for i in range(len(train_data))], dtype=object)
 
 def main():
     """Main function to train and test the model"""
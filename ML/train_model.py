@@ -6,6 +6,7 @@ Run this script to train and save the ML model
 
 import sys
 import os
+import argparse
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from train_congestion_predictor import TrainCongestionPredictor
@@ -49,14 +50,49 @@ def plot_training_results(df, predictions, probabilities):
     plt.savefig('training_analysis.png', dpi=300, bbox_inches='tight')
     plt.show()
 
+def train_streaming(predictor, args):
+    """Memory-bounded training from chunked simulated data or logged CSV snapshots"""
+    from streaming_training import csv_chunks
+    
+    chunk_source = csv_chunks(args.csv, args.chunk_size) if args.csv else None
+    print(f"\n🌊 Streaming training (chunks of {args.chunk_size}, {args.epochs} epochs)...")
+    _, accuracy = predictor.train_streaming(chunk_source, num_samples=args.samples,
+                                            chunk_size=args.chunk_size, epochs=args.epochs)
+    
+    print("\n💾 Saving model...")
+    predictor.save_model('trained_congestion_model.pkl')
+    predictor.save_model('trained_congestion_model')  # memory-mapped artifact directory
+    
+    print(f"\n✅ Streaming training complete!")
+    if accuracy is not None:
+        print(f"Holdout accuracy: {accuracy:.4f}")
+    else:
+        print("Holdout accuracy: n/a (no holdout rows; stream more samples)")
+    print(f"Model saved to: trained_congestion_model.pkl (artifact: trained_congestion_model/)")
+
 def main():
     """Main training function"""
+    parser = argparse.ArgumentParser(description='Train the congestion prediction model')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Worker processes for model selection (-1 = all cores)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Train chunk by chunk in a fixed memory budget (incremental SGD model)')
+    parser.add_argument('--csv', nargs='+', help='Logged snapshot CSVs to stream (default: simulated data)')
+    parser.add_argument('--samples', type=int, default=1000000, help='Simulated samples for --streaming')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per chunk for --streaming')
+    parser.add_argument('--epochs', type=int, default=3, help='Passes over the data for --streaming')
+    args = parser.parse_args()
+    
     print("🚂 Training Train Congestion Prediction Model")
     print("=" * 60)
     
     # Initialize predictor
     predictor = TrainCongestionPredictor()
     
+    if args.streaming:
+        train_streaming(predictor, args)
+        return
+    
     # Generate training data
     print("\n📊 Generating training data...")
     df = predictor.fetch_simulated_data(20000)  # Generate 20k samples
@@ -67,7 +103,7 @@ def main():
     
     # Train model
     print("\n🤖 Training model...")
-    model, accuracy = predictor.train_model(df)
+    model, accuracy = predictor.train_model(df, n_jobs=args.jobs)
     
     # Test with sample data
     print("\n🧪 Testing with sample data...")
@@ -84,6 +120,7 @@ def main():
     # Save model
     print("\n💾 Saving model...")
     predictor.save_model('trained_congestion_model.pkl')
+    predictor.save_model('trained_congestion_model')  # memory-mapped artifact directory
     
     # Test optimization
     print("\n🎯 Testing optimization...")
@@ -99,7 +136,7 @@ def main():
     
     print(f"\n✅ Training complete!")
     print(f"Final accuracy: {accuracy:.4f}")
-    print(f"Model saved to: trained_congestion_model.pkl")
+    print(f"Model saved to: trained_congestion_model.pkl (artifact: trained_congestion_model/)")
     print(f"Analysis plot saved to: training_analysis.png")
     
     # Model validation
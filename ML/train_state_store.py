@@ -0,0 +1,201 @@
+"""
+Columnar in-memory train state store
+
+Every train owns a slot in preallocated NumPy column arrays, found through a
+train-id -> slot map. Updates are written in place, freed slots go on a
+free-list and are reused by the next arrival, and live rows are kept dense
+below a high-water mark (tail rows are moved into holes), so every column is
+exposed to the feature pipeline and predictor as a zero-copy slice.
+
+Per-slot state kept outside the store (e.g. section occupancy) registers as a
+listener and is told when slots are freed (remove) or relocated (move).
+"""
+
+import numpy as np
+
+# Column name -> dtype; object columns hold ids/categories and the raw record
+COLUMNS = {
+    'speed': np.float32,
+    'delay': np.float32,
+    'lat': np.float64,
+    'lon': np.float64,
+    'occupancy': np.float32,
+    'signal_status': np.float32,
+    'distance_to_next': np.float32,
+    'distance_to_destination': np.float32,
+    'time_to_clear': np.float32,
+    'hour_of_day': np.float32,
+    'day_of_week': np.float32,
+    'station_distance_km': np.float32,
+    'train_id': object,
+    'category': object,
+    'station': object,
+    'station_type': object,
+    'record': object
+}
+
+# Raw train fields copied on ingest: column -> (train key, default)
+INGEST_FIELDS = {
+    'speed': ('speed', 0),
+    'delay': ('delay', 0),
+    'lat': ('lat', np.nan),      # NaN marks an unreported position
+    'lon': ('lon', np.nan),
+    'category': ('category', 'passenger')
+}
+
+def train_id_of(train):
+    return train.get('id', train.get('number', 'UNKNOWN'))
+
+class StoreView:
+    """Read-only mapping of column name -> live slice, sized to the live trains"""
+
+    def __init__(self, store):
+        self._store = store
+        self._n = store.size
+
+    def __getitem__(self, name):
+        return self._store.columns[name][:self._n]
+
+    def __contains__(self, name):
+        return name in self._store.columns
+
+    def __len__(self):
+        return self._n
+
+    def keys(self):
+        return self._store.columns.keys()
+
+    def to_dict(self, names=None):
+        return {name: self[name] for name in (names or self.keys()) if name != 'record'}
+
+class TrainStateStore:
+    """Preallocated columnar arrays indexed by a train-id -> slot map"""
+
+    def __init__(self, capacity=1024):
+        self.capacity = max(1, capacity)
+        self.columns = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.slots = {}
+        self.free_slots = []
+        self.high_water = 0
+        self._features = None
+        self.listeners = []
+        self.compactions = 0
+        self.grows = 0
+
+    @property
+    def size(self):
+        return len(self.slots)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, values in self.columns.items():
+            grown = np.zeros(capacity, dtype=values.dtype)
+            grown[:self.high_water] = values[:self.high_water]
+            self.columns[name] = grown
+        self.capacity = capacity
+        self.grows += 1
+
+    def _allocate(self, train_id):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.high_water == self.capacity:
+                self._grow(self.high_water + 1)
+            slot = self.high_water
+            self.high_water += 1
+        self.slots[train_id] = slot
+        return slot
+
+    def upsert(self, trains):
+        """Write trains into their slots (allocating new ones); returns the slots"""
+        ids = [train_id_of(train) for train in trains]
+        slots = np.fromiter((self.slots[i] if i in self.slots else self._allocate(i) for i in ids),
+                            dtype=np.int64, count=len(ids))
+
+        for column, (key, default) in INGEST_FIELDS.items():
+            self.columns[column][slots] = [train.get(key, default) for train in trains]
+        self.columns['train_id'][slots] = ids
+        self.columns['record'][slots] = trains
+        return slots
+
+    def remove(self, train_ids):
+        """Free the slots of departed trains"""
+        freed = [slot for slot in (self.slots.pop(train_id, None) for train_id in train_ids)
+                 if slot is not None]
+        if not freed:
+            return
+        for values in self.columns.values():
+            if values.dtype == object:
+                values[freed] = None
+        self.free_slots.extend(freed)
+        for listener in self.listeners:
+            listener.remove(freed)
+
+    def sync(self, trains):
+        """Make the store match a full snapshot; returns a dense view of it"""
+        present = {train_id_of(train) for train in trains}
+        self.remove([train_id for train_id in self.slots if train_id not in present])
+        self.upsert(trains)
+        self.compact()
+        return self.view()
+
+    def compact(self):
+        """Move tail rows into holes so live rows occupy [0, size)"""
+        if not self.free_slots:
+            return 0
+        free = set(self.free_slots)
+        holes = sorted(slot for slot in free if slot < self.size)
+        live_tail = [slot for slot in range(self.size, self.high_water) if slot not in free]
+
+        if holes:
+            owner = {slot: train_id for train_id, slot in self.slots.items() if slot >= self.size}
+            src = np.array(live_tail, dtype=np.int64)
+            dst = np.array(holes, dtype=np.int64)
+            for values in self.columns.values():
+                values[dst] = values[src]
+                if values.dtype == object:
+                    values[src] = None
+            for s, d in zip(live_tail, holes):
+                self.slots[owner[s]] = d
+            for listener in self.listeners:
+                listener.move(src, dst)
+
+        self.free_slots = []
+        self.high_water = self.size
+        self.compactions += 1
+        return len(holes)
+
+    def view(self):
+        """Zero-copy column slices over the live trains (valid until the next update)"""
+        if self.free_slots:
+            self.compact()
+        return StoreView(self)
+
+    def feature_matrix(self, pipeline):
+        """Model features for the live trains, written into a reused buffer"""
+        n_features = len(pipeline.feature_names)
+        if self._features is None or self._features.shape != (self.capacity, n_features):
+            self._features = np.empty((self.capacity, n_features), dtype=np.float32, order='F')
+        view = self.view()
+        return pipeline.transform(view, out=self._features[:len(view)])
+
+    def slot_of(self, train_id):
+        return self.slots.get(train_id)
+
+    def slots_of(self, train_ids):
+        return np.fromiter((self.slots[i] for i in train_ids), dtype=np.int64, count=len(train_ids))
+
+    def stats(self):
+        return {
+            'trains': self.size,
+            'capacity': self.capacity,
+            'high_water': self.high_water,
+            'free_slots': len(self.free_slots),
+            'compactions': self.compactions,
+            'grows': self.grows
+        }
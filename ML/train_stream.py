@@ -0,0 +1,229 @@
+"""
+Streaming ingestion of the backend's train WebSocket feed
+
+The Node server broadcasts the full train list on /ws/trains/howrah every
+second. TrainStateTable keeps the latest state of every train and diffs each
+snapshot into upserts/removals, and TrainStream collects changes for a short
+batch window before scoring them, so the delay from a position update to a
+congestion alert is bounded by the window rather than by a 30s poll.
+
+The `websockets` package is an optional dependency, imported only when the
+stream connects to a live server.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+
+WS_PATH = '/ws/trains/howrah'
+
+# Fields whose change makes a train's state stale
+TRACKED_FIELDS = ('lat', 'lon', 'speed', 'delay', 'status', 'category')
+
+def load_websockets():
+    """Import the optional websockets client on demand"""
+    try:
+        import websockets
+    except ImportError as e:
+        raise ImportError("Streaming mode needs the 'websockets' package (pip install websockets)") from e
+    return websockets
+
+def ws_url_for(backend_url):
+    """WebSocket feed URL for an http(s) backend URL"""
+    if backend_url.startswith('https://'):
+        base = 'wss://' + backend_url[len('https://'):]
+    elif backend_url.startswith('http://'):
+        base = 'ws://' + backend_url[len('http://'):]
+    else:
+        base = backend_url
+    return base.rstrip('/') + WS_PATH
+
+def train_key(train):
+    return train.get('id', train.get('number'))
+
+class TrainStateTable:
+    """Latest known state of every train, updated by deltas"""
+
+    def __init__(self):
+        self.trains = {}
+        self.updated_at = None
+
+    def __len__(self):
+        return len(self.trains)
+
+    def apply_delta(self, upserts=(), removals=()):
+        """Insert/replace changed trains and drop departed ones"""
+        for train in upserts:
+            self.trains[train_key(train)] = train
+        for key in removals:
+            self.trains.pop(key, None)
+
+    def apply_snapshot(self, trains, updated_at=None):
+        """Diff a full snapshot against the table; returns (upserts, removals)"""
+        upserts = []
+        seen = set()
+        for train in trains:
+            if not isinstance(train, dict):
+                continue  # malformed entry
+            key = train_key(train)
+            if key is None:
+                continue
+            seen.add(key)
+            previous = self.trains.get(key)
+            if previous is None or any(previous.get(f) != train.get(f) for f in TRACKED_FIELDS):
+                upserts.append(train)
+        removals = [key for key in self.trains if key not in seen]
+        self.apply_delta(upserts, removals)
+        self.updated_at = updated_at
+        return upserts, removals
+
+    def snapshot(self):
+        return list(self.trains.values())
+
+class TrainStream:
+    """Subscribe to the train feed and run micro-batched predictions on change"""
+
+    def __init__(self, integration, ws_url=None, batch_window=0.25, on_result=None,
+                 reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.integration = integration
+        self.ws_url = ws_url or ws_url_for(integration.backend_url)
+        self.batch_window = batch_window
+        self.on_result = on_result
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.table = TrainStateTable()
+        self.latencies = deque(maxlen=200)
+        self.stats = {'messages': 0, 'upserts': 0, 'removals': 0, 'batches': 0, 'reconnects': 0, 'errors': 0}
+        self._changed = None
+        self._loop = None
+        self._first_change_at = None
+        self._source_done = False
+        self._running = False
+
+    def handle_message(self, message):
+        """Apply one feed frame to the state table; True if anything changed"""
+        frame = json.loads(message) if isinstance(message, (str, bytes)) else message
+        if not isinstance(frame, dict):
+            raise ValueError(f'expected a JSON object, got {type(frame).__name__}')
+        if frame.get('type') != 'trains':
+            return False
+        trains = frame.get('trains') or []
+        if not isinstance(trains, list):
+            raise ValueError(f"expected a list of trains, got {type(trains).__name__}")
+        self.stats['messages'] += 1
+        upserts, removals = self.table.apply_snapshot(trains, frame.get('updatedAt'))
+        self.stats['upserts'] += len(upserts)
+        self.stats['removals'] += len(removals)
+        if not upserts and not removals:
+            return False
+        if self._first_change_at is None:
+            self._first_change_at = time.perf_counter()
+        self._changed.set()
+        return True
+
+    async def _consume(self, messages):
+        async for message in messages:
+            if not self._running:
+                break
+            try:
+                self.handle_message(message)
+            except ValueError as e:
+                print(f"⚠️  Skipping malformed train frame: {e}")
+
+    async def _connect_and_consume(self):
+        """Consume the live feed, reconnecting with exponential backoff"""
+        websockets = load_websockets()
+        delay = self.reconnect_delay
+        while self._running:
+            try:
+                async with websockets.connect(self.ws_url) as ws:
+                    delay = self.reconnect_delay
+                    await self._consume(ws)
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                print(f"⚠️  Train feed disconnected ({e}); retrying in {delay:.1f}s")
+            if not self._running:
+                break
+            self.stats['reconnects'] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _score_batches(self, max_batches):
+        """Wait for changes, let the batch window fill, then score the whole table"""
+        loop = asyncio.get_running_loop()
+        while self._running and (max_batches is None or self.stats['batches'] < max_batches):
+            if self._source_done and self._first_change_at is None:
+                break
+            await self._changed.wait()
+            if self._first_change_at is None:
+                self._changed.clear()
+                continue
+            remaining = self.batch_window - (time.perf_counter() - self._first_change_at)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+
+            first_change_at = self._first_change_at
+            self._first_change_at = None
+            self._changed.clear()
+            trains = self.table.snapshot()
+            if not trains:
+                continue
+
+            timings = {}
+            try:
+                results = await loop.run_in_executor(None, self.integration.analyze, trains, timings)
+            except Exception as e:
+                # e.g. ServiceOverloaded; the next change rescores the whole table
+                self.stats['errors'] += 1
+                print(f"❌ Streaming prediction error: {e}")
+                continue
+            timings['latency'] = time.perf_counter() - first_change_at
+            self.latencies.append(timings)
+            self.stats['batches'] += 1
+            if results and self.on_result:
+                self.on_result(results)
+
+    async def run(self, messages=None, max_batches=None):
+        """Stream until stopped (or max_batches are scored)
+
+        messages may be any async iterable of feed frames; by default the
+        stream connects to the backend WebSocket.
+        """
+        self._running = True
+        self._source_done = False
+        self._changed = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        source = self._consume(messages) if messages is not None else self._connect_and_consume()
+        consumer = asyncio.ensure_future(source)
+        consumer.add_done_callback(lambda _: self._source_finished())
+        try:
+            await self._score_batches(max_batches)
+        finally:
+            self._running = False
+            consumer.cancel()
+            try:
+                await consumer
+            except asyncio.CancelledError:
+                pass
+
+    def _source_finished(self):
+        # Wake the scorer so it can flush pending changes and exit
+        self._source_done = True
+        self._changed.set()
+
+    def stop(self):
+        """Stop streaming (safe to call from another thread)"""
+        self._running = False
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    def latency_stats(self):
+        """Change-to-result latency over recent batches (seconds)"""
+        values = sorted(t['latency'] for t in self.latencies)
+        if not values:
+            return {'batches': 0}
+        return {
+            'batches': len(values),
+            'median_s': values[len(values) // 2],
+            'max_s': values[-1]
+        }
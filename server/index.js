@@ -32,11 +32,122 @@ function inBox(lat, lon) {
 }
 
 // ML Prediction Functions
+const ML_DIR = path.join(__dirname, '..', 'ML');
+const ML_REQUEST_TIMEOUT = 20000;
+
+// Persistent prediction server: keeps the model warm in one long-lived Python
+// process and exchanges newline-delimited JSON frames over stdin/stdout.
+const mlServer = { proc: null, ready: false, buffer: '', nextId: 1, pending: new Map(), restartAt: 0 };
+
+function startMLServer() {
+  if (mlServer.proc || Date.now() < mlServer.restartAt) return;
+  const proc = spawn('python', [path.join(ML_DIR, 'ml_prediction_server.py')], {
+    cwd: ML_DIR,
+    stdio: ['pipe', 'pipe', 'pipe']
+  });
+  mlServer.proc = proc;
+  mlServer.ready = false;
+  mlServer.buffer = '';
+  proc.stdout.setEncoding('utf8');
+
+  proc.stdout.on('data', (data) => {
+    mlServer.buffer += data;
+    let newline;
+    while ((newline = mlServer.buffer.indexOf('\n')) >= 0) {
+      const line = mlServer.buffer.slice(0, newline).trim();
+      mlServer.buffer = mlServer.buffer.slice(newline + 1);
+      if (line) handleMLServerFrame(line);
+    }
+  });
+
+  proc.stderr.on('data', () => {}); // model/library logs
+
+  const onExit = (reason) => {
+    if (mlServer.proc !== proc) return;
+    mlServer.proc = null;
+    mlServer.ready = false;
+    mlServer.restartAt = Date.now() + 5000;
+    mlServer.pending.forEach(({ resolve, timer }) => {
+      clearTimeout(timer);
+      resolve({ error: 'ML server exited', details: reason });
+    });
+    mlServer.pending.clear();
+  };
+  proc.on('exit', (code) => onExit(`exit code ${code}`));
+  proc.on('error', (err) => onExit(err.message));
+}
+
+function handleMLServerFrame(line) {
+  let frame;
+  try {
+    frame = JSON.parse(line);
+  } catch (e) {
+    return;
+  }
+  if (frame.event === 'ready') {
+    mlServer.ready = true;
+    console.log(`ML server ready (model load ${frame.load_time_s}s)`);
+    return;
+  }
+  const entry = mlServer.pending.get(frame.id);
+  if (!entry) return;
+  mlServer.pending.delete(frame.id);
+  clearTimeout(entry.timer);
+  entry.resolve(frame.ok ? frame.result : { error: frame.error, details: frame.details });
+}
+
+function requestMLServer(type, payload = {}) {
+  return new Promise((resolve) => {
+    const id = mlServer.nextId++;
+    const timer = setTimeout(() => {
+      mlServer.pending.delete(id);
+      resolve({ error: 'ML server timeout' });
+    }, ML_REQUEST_TIMEOUT);
+    mlServer.pending.set(id, { resolve, timer });
+    mlServer.proc.stdin.write(JSON.stringify({ id, type, ...payload }) + '\n');
+  });
+}
+
+// Per-train arrays come back as base64 (uint8 labels, float32 probabilities)
+// which is far smaller to send and parse than JSON number lists.
+function decodeMLResult(result) {
+  if (!result || result.error || result.encoding !== 'binary') return result;
+  const labels = Buffer.from(result.congestion_predictions_b64, 'base64');
+  const probs = Buffer.from(result.congestion_probabilities_b64, 'base64');
+  const probabilities = new Array(probs.length / 4);
+  for (let i = 0; i < probabilities.length; i++) probabilities[i] = probs.readFloatLE(i * 4);
+  const { congestion_predictions_b64, congestion_probabilities_b64, ...rest } = result;
+  return { ...rest, congestion_predictions: Array.from(labels), congestion_probabilities: probabilities };
+}
+
+// The interval tick and POST /api/ml/predict usually score the same cache.trains
+// snapshot; a call made while that snapshot is already in flight shares its promise.
+const mlInFlight = { trains: null, promise: null };
+
 function runMLPrediction(trains) {
+  if (mlInFlight.promise && mlInFlight.trains === trains) return mlInFlight.promise;
+  startMLServer();
+  const promise = mlServer.proc && mlServer.ready
+    ? requestMLServer('predict', { trains, encoding: 'binary', top_k: 50 }).then(decodeMLResult)
+    // Server still warming up (or restarting): fall back to a one-shot process
+    : runMLPredictionOnce(trains);
+  mlInFlight.trains = trains;
+  mlInFlight.promise = promise;
+  const clear = () => {
+    if (mlInFlight.promise === promise) {
+      mlInFlight.trains = null;
+      mlInFlight.promise = null;
+    }
+  };
+  promise.then(clear, clear);
+  return promise;
+}
+
+function runMLPredictionOnce(trains) {
   return new Promise((resolve, reject) => {
-    const mlScript = path.join(__dirname, '..', 'ML', 'ml_server_integration.py');
+    const mlScript = path.join(ML_DIR, 'ml_server_integration.py');
     const pythonProcess = spawn('python', [mlScript], {
-      cwd: path.join(__dirname, '..', 'ML'),
+      cwd: ML_DIR,
       stdio: ['pipe', 'pipe', 'pipe']
     });
 
@@ -345,6 +456,7 @@ function stepSimulation(dtSec = 1) {
 }
 
 if (SIMULATE) initSimulation();
+startMLServer();
 
 // ML Prediction loop (every 30 seconds)
 setInterval(async () => {
@@ -413,6 +525,25 @@ app.get('/api/ml/heatmap', (_req, res) => {
   });
 });
 
+app.get('/api/ml/health', async (_req, res) => {
+  startMLServer();
+  if (!mlServer.proc || !mlServer.ready) {
+    return res.json({ ok: false, status: mlServer.proc ? 'loading' : 'down' });
+  }
+  const health = await requestMLServer('health');
+  res.json({ ok: !health.error, ...health });
+});
+
+// Stage timings and counters from the persistent ML server
+app.get('/api/ml/metrics', async (_req, res) => {
+  startMLServer();
+  if (!mlServer.proc || !mlServer.ready) {
+    return res.json({ ok: false, status: mlServer.proc ? 'loading' : 'down' });
+  }
+  const metrics = await requestMLServer('metrics');
+  res.json({ ok: !metrics.error, ...metrics });
+});
+
 // Trigger ML prediction manually
 app.post('/api/ml/predict', async (_req, res) => {
   try {